@@ -0,0 +1,97 @@
+"""Peak memory and time of loading two chains from a large assembly: full parse versus chain index.
+
+Each mode runs in a fresh subprocess so its peak RSS is measured in isolation.
+
+Usage:
+    python benchmarks/bench_lazy_chains.py [--atoms 1000000] [--chains 60] [--select A,B]
+"""
+
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, "..", "server"))
+
+
+def peak_rss_mb() -> float:
+    """Peak resident set size of this process image in MB"""
+    # VmHWM is reset by exec, unlike ru_maxrss which inherits the parent's peak
+    try:
+        with open("/proc/self/status") as handle:
+            for line in handle:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def run_mode(mode: str, path: str, chains: list[str]) -> dict:
+    from pymolvis.chain_index import build_chain_index, load_chains
+    from pymolvis.structure import parse_structure
+
+    baseline = peak_rss_mb()
+    started = time.perf_counter()
+    if mode == "full":
+        structure = parse_structure(path)
+        selected = len(structure.select_chains(chains))
+    else:
+        index = build_chain_index(path)
+        indexed = time.perf_counter() - started
+        structure = load_chains(index, chains)
+        selected = len(structure)
+    result = {
+        "mode": mode,
+        "seconds": round(time.perf_counter() - started, 3),
+        "atoms_materialized": len(structure),
+        "atoms_selected": selected,
+        "peak_rss_mb": round(peak_rss_mb(), 1),
+        "rss_growth_mb": round(peak_rss_mb() - baseline, 1),
+    }
+    if mode == "lazy":
+        result["index_seconds"] = round(indexed, 3)
+    return result
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--atoms", type=int, default=1_000_000)
+    parser.add_argument("--chains", type=int, default=60)
+    parser.add_argument("--select", default="A,B", help="Comma-separated chains to load")
+    parser.add_argument("--data-dir", default=os.path.join(tempfile.gettempdir(), "pymolvis-bench"))
+    parser.add_argument("--mode", choices=("full", "lazy"), help=argparse.SUPPRESS)
+    parser.add_argument("--path", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+    chains = [chain.strip() for chain in args.select.split(",") if chain.strip()]
+
+    if args.mode:
+        print(json.dumps(run_mode(args.mode, args.path, chains)))
+        return 0
+
+    from synthetic import cached_complex
+
+    path = cached_complex(args.data_dir, args.atoms, args.chains, fmt="cif")
+    print(f"file: {path} ({os.path.getsize(path) / 1024 ** 2:.0f} MB, {args.atoms} atoms, {args.chains} chains)")
+    results = []
+    for mode in ("full", "lazy"):
+        output = subprocess.run(
+            [sys.executable, __file__, "--mode", mode, "--path", path, "--select", args.select],
+            check=True, capture_output=True, text=True,
+        ).stdout
+        results.append(json.loads(output))
+        print(json.dumps(results[-1]))
+
+    full, lazy = results
+    print(f"time: {full['seconds']:.2f} s -> {lazy['seconds']:.2f} s, "
+          f"memory growth: {full['rss_growth_mb']:.0f} MB -> {lazy['rss_growth_mb']:.0f} MB")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,68 @@
+"""Time to first image: level-of-detail draft versus full-quality render of synthetic complexes.
+
+Renders run in one warm in-process PyMOL (the same render_job the worker pool runs),
+so the numbers exclude process start-up and compare only draft and final settings.
+
+Usage:
+    python benchmarks/bench_lod.py [--atoms 20000,200000] [--chains 8] [--width 1200 --height 1200]
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, "..", "server"))
+
+
+def render_pair(path: str, n_atoms: int, width: int, height: int, output_dir: str) -> dict:
+    from pymolvis.lod import choose_tier, draft_size
+    from pymolvis.render_pool import render_job
+
+    commands = ["hide everything", "show cartoon", "show sticks, resi 1-20", "orient"]
+    scene = {"structure": path, "commands": commands, "width": width, "height": height,
+             "output": os.path.join(output_dir, "final.png")}
+    final = render_job(scene)
+    result = {"atoms": n_atoms, "final_seconds": final["seconds"]}
+
+    tier = choose_tier(n_atoms, width, height)
+    if tier.get("draft"):
+        draft_width, draft_height = draft_size(tier, width, height)
+        draft = render_job(dict(scene, preset=tier["draft"].get("preset", "draft"),
+                                width=draft_width, height=draft_height,
+                                output=os.path.join(output_dir, "draft.png")))
+        result.update(draft_seconds=draft["seconds"], draft_size=f"{draft_width}x{draft_height}",
+                      speedup=round(final["seconds"] / max(draft["seconds"], 1e-6), 1))
+    else:
+        result.update(draft_seconds=None, draft_size=None, speedup=1.0)
+    return result
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--atoms", default="20000,200000", help="Comma-separated atom counts")
+    parser.add_argument("--chains", type=int, default=8)
+    parser.add_argument("--width", type=int, default=1200)
+    parser.add_argument("--height", type=int, default=1200)
+    parser.add_argument("--data-dir", default=os.path.join(tempfile.gettempdir(), "pymolvis-bench"))
+    args = parser.parse_args(argv)
+
+    from pymolvis.render_pool import init_worker, pymol_available
+    from synthetic import cached_complex
+
+    if not pymol_available():
+        print("pymol2 is not installed, nothing to benchmark", file=sys.stderr)
+        return 1
+    init_worker()
+
+    with tempfile.TemporaryDirectory() as output_dir:
+        for n_atoms in (int(value) for value in args.atoms.split(",")):
+            path = cached_complex(args.data_dir, n_atoms, args.chains, fmt="pdb")
+            print(json.dumps(render_pair(path, n_atoms, args.width, args.height, output_dir)))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
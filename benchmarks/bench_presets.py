@@ -0,0 +1,67 @@
+"""Phase 4 latency: one run_pymol_command per setting versus a single batched preset call.
+
+Each tool call from the model costs one MCP round-trip to the PyMOL bridge on top
+of PyMOL's own execution time. The round-trip cost is modelled with a sleep
+(--round-trip-ms); execution uses a headless pymol2 instance when available.
+
+Usage:
+    python benchmarks/bench_presets.py [--round-trip-ms 250] [--repeat 5]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "server"))
+
+from pymolvis.presets import preset_command_line, preset_commands  # noqa: E402
+
+
+def make_executor():
+    """cmd.do of a headless PyMOL, or a no-op when PyMOL is not installed"""
+    try:
+        import pymol2
+    except ImportError:
+        return lambda command: None, "no-op (pymol2 not installed)"
+    instance = pymol2.PyMOL()
+    instance.start()
+    instance.cmd.feedback("disable", "all", "everything")
+    return lambda command: instance.cmd.do(command, echo=0), "pymol2"
+
+
+def run_calls(execute, calls: list[str], round_trip: float) -> float:
+    started = time.perf_counter()
+    for call in calls:
+        time.sleep(round_trip)
+        execute(call)
+    return time.perf_counter() - started
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--round-trip-ms", type=float, default=250.0, help="Modelled cost of one tool call")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    execute, backend = make_executor()
+    round_trip = args.round_trip_ms / 1000.0
+    separate = preset_commands(ray=False)
+    batched = [preset_command_line(ray=False)]
+
+    timings = {"separate": [], "batched": []}
+    for _ in range(args.repeat):
+        timings["separate"].append(run_calls(execute, separate, round_trip))
+        timings["batched"].append(run_calls(execute, batched, round_trip))
+
+    best_separate = min(timings["separate"])
+    best_batched = min(timings["batched"])
+    print(f"backend: {backend}, round-trip: {args.round_trip_ms:.0f} ms")
+    print(f"separate: {len(separate):2d} calls {best_separate * 1000:9.1f} ms")
+    print(f"batched:  {len(batched):2d} call  {best_batched * 1000:9.1f} ms")
+    print(f"saving:   {(best_separate - best_batched) * 1000:9.1f} ms ({best_separate / best_batched:.1f}x)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,75 @@
+"""Wall time of tiled ray tracing against one untiled render, for 1 to N render workers.
+
+Each worker count gets its own pool of single-threaded headless PyMOL processes
+rendering one tile per worker, so near-linear scaling shows up as a speedup close
+to the worker count. Workers are warmed up with a small render before timing.
+
+Usage:
+    python benchmarks/bench_tiled_render.py [--atoms 20000] [--width 3000 --height 3000] [--workers 1,2,4,8]
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, "..", "server"))
+
+
+def time_workers(scene: dict, workers: int, output_dir: str, repeat: int) -> dict:
+    from pymolvis.render_pool import RenderPool
+    from pymolvis.tiles import TiledRenderer
+
+    pool = RenderPool(workers, threads_per_job=1, output_dir=output_dir).start()
+    try:
+        pool.render_all([dict(scene, width=64, height=64, output=os.path.join(output_dir, f"warm{index}.png"))
+                         for index in range(workers)])
+        renderer = TiledRenderer(pool, workers)
+        runs = [renderer.render(dict(scene, output=os.path.join(output_dir, "tiled.png"))) for _ in range(repeat)]
+    finally:
+        pool.shutdown()
+    best = min(runs, key=lambda run: run["seconds"])
+    return {"workers": workers, "grid": best["grid"], "seconds": best["seconds"],
+            "max_seam_difference": best["max_seam_difference"]}
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--atoms", type=int, default=20000)
+    parser.add_argument("--chains", type=int, default=8)
+    parser.add_argument("--width", type=int, default=3000)
+    parser.add_argument("--height", type=int, default=3000)
+    parser.add_argument("--workers", default=None, help="Comma-separated worker counts (default: 1 to cpu_count)")
+    parser.add_argument("--repeat", type=int, default=1)
+    parser.add_argument("--data-dir", default=os.path.join(tempfile.gettempdir(), "pymolvis-bench"))
+    args = parser.parse_args(argv)
+
+    from pymolvis.render_pool import init_worker, pymol_available, render_job
+    from synthetic import cached_complex
+
+    if not pymol_available():
+        print("pymol2 is not installed, nothing to benchmark", file=sys.stderr)
+        return 1
+    init_worker()
+    counts = [int(value) for value in args.workers.split(",")] if args.workers else range(1, (os.cpu_count() or 1) + 1)
+
+    path = cached_complex(args.data_dir, args.atoms, args.chains, fmt="pdb")
+    scene = {"structure": path, "commands": ["hide everything", "show cartoon", "show sticks, resi 1-20", "orient",
+                                             "set orthoscopic, 1"],
+             "width": args.width, "height": args.height, "threads": 1}
+    with tempfile.TemporaryDirectory() as output_dir:
+        untiled = min(render_job(dict(scene, output=os.path.join(output_dir, "untiled.png")))["seconds"]
+                      for _ in range(args.repeat))
+        print(json.dumps({"workers": 1, "untiled": True, "seconds": untiled}))
+        for workers in counts:
+            result = time_workers(scene, workers, output_dir, args.repeat)
+            result.update(speedup=round(untiled / result["seconds"], 2),
+                          efficiency=round(untiled / result["seconds"] / workers, 2))
+            print(json.dumps(result))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,379 @@
+"""Benchmark suite: prompt generation, interface detection, buried surface area, chain contact screening,
+distance measurement, model superposition, shared structure memory and headless rendering.
+
+Every case runs in a fresh subprocess so its peak RSS is measured in isolation, on
+synthetic complexes generated locally (no network, no GPU). Results are written to a
+JSON file and compared against a stored baseline; a case slower or larger than the
+baseline by more than the tolerance fails the run.
+
+Usage:
+    python benchmarks/run_suite.py [--sizes 1000,10000,100000,1000000] [--resolutions 320,640,960]
+                                   [--output bench-results.json] [--baseline benchmarks/baseline.json]
+                                   [--update-baseline] [--only interface,sasa,contacts,superpose,shared,render]
+"""
+
+import argparse
+import asyncio
+import datetime
+import importlib.util
+import json
+import multiprocessing
+import os
+import pickle
+import platform
+import random
+import re
+import subprocess
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+SERVER_DIR = os.path.join(HERE, "..", "server")
+sys.path.insert(0, SERVER_DIR)
+
+from bench_lazy_chains import peak_rss_mb  # noqa: E402
+
+DEFAULT_BASELINE = os.path.join(HERE, "baseline.json")
+PROMPT_STRUCTURE_ATOMS = 1000
+RENDER_STRUCTURE_ATOMS = 2000
+DISTANCE_PAIRS = 1000
+SASA_MAX_ATOMS = 100000
+CONTACT_CHAINS = 64
+SUPERPOSE_MODELS = 8
+SHARED_WORKERS = 4
+
+
+def load_server():
+    """Import the server script, whose file name is not a module name"""
+    spec = importlib.util.spec_from_file_location("pymol_visualizer", os.path.join(SERVER_DIR, "804vis_en.py"))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def estimate_tokens(text: str) -> int:
+    """Model-independent token estimate: words and punctuation marks, counted offline"""
+    return len(re.findall(r"\w+|[^\w\s]", text))
+
+
+def timed(function, repeat: int) -> float:
+    """Best wall time of repeat calls, after one untimed warm-up call"""
+    function()
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def case_prompt(template: str, path: str, repeat: int) -> dict:
+    try:
+        server = load_server()
+    except ImportError as error:
+        return {"status": "skipped", "reason": f"server dependencies missing: {error}"}
+    arguments = {"structure": path, "key_residues": "A:5,A:12-20,B:7", "distance_pairs": "A:5:CA-B:7:CA"}
+    if template == server.MULTI_COMPONENT:
+        arguments = {"structure": path, "components": "receptor:A,ligand:B"}
+    calls = 50
+
+    def run():
+        for _ in range(calls):
+            asyncio.run(server.get_prompt(template, arguments))
+
+    seconds = timed(run, repeat) / calls
+    # Prompt size is tracked like any other cost: Phases 1-4 up front, Phases 5-7 on 'continue'
+    first = asyncio.run(server.get_prompt(template, arguments)).messages[0].content.text
+    second = asyncio.run(server.get_prompt(template + server.CONTINUE_SUFFIX, arguments)).messages[0].content.text
+    return {"seconds": seconds, "items": 1, "unit": "prompts", "tokens": estimate_tokens(first),
+            "continue_tokens": estimate_tokens(second), "characters": len(first) + len(second)}
+
+
+def case_interface(path: str, repeat: int) -> dict:
+    from pymolvis.interface import find_interface
+    from pymolvis.structure_cache import load_structure
+
+    structure = load_structure(path)
+    seconds = timed(lambda: find_interface(structure, ["A"], ["B"]), repeat)
+    return {"seconds": seconds, "items": len(structure), "unit": "atoms"}
+
+
+def case_sasa(path: str, repeat: int) -> dict:
+    from pymolvis.sasa import buried_surface
+    from pymolvis.structure_cache import load_structure
+
+    structure = load_structure(path)
+    seconds = timed(lambda: buried_surface(structure, ["A"], ["B"]), repeat)
+    return {"seconds": seconds, "items": len(structure), "unit": "atoms"}
+
+
+def case_contacts(path: str, repeat: int) -> dict:
+    from pymolvis.assembly import chain_contacts, suggest_components
+    from pymolvis.structure_cache import load_structure
+
+    structure = load_structure(path)
+    seconds = timed(lambda: suggest_components(chain_contacts(structure)), repeat)
+    return {"seconds": seconds, "items": len(structure), "unit": "atoms"}
+
+
+def case_superpose(path: str, repeat: int) -> dict:
+    from pymolvis.structure_cache import load_structure
+    from pymolvis.superpose import superpose_models
+
+    structure = load_structure(path)
+    models = [path] * SUPERPOSE_MODELS
+    seconds = timed(lambda: superpose_models(path, models, ["A"], atom_set="heavy"), repeat)
+    return {"seconds": seconds, "items": len(structure) * SUPERPOSE_MODELS, "unit": "atoms"}
+
+
+def private_mb() -> float:
+    """Memory mapped by this process alone (private pages) in MB, Linux only"""
+    total = 0
+    with open("/proc/self/smaps_rollup") as handle:
+        for line in handle:
+            if line.startswith(("Private_Clean:", "Private_Dirty:")):
+                total += int(line.split()[1])
+    return total / 1024
+
+
+def _structure_worker(path: str, connection, attached, results) -> None:
+    """Load a structure through the shared store, or receive a pickled copy, and report private memory growth"""
+    from pymolvis.structure_cache import load_structure
+
+    before = private_mb()
+    started = time.perf_counter()
+    structure = pickle.loads(connection.recv_bytes()) if connection else load_structure(path)
+    # Touch every array so all pages are mapped
+    checksum = sum(float(array.sum()) for array in structure.arrays().values())
+    seconds = time.perf_counter() - started
+    # Measure only while every worker maps the structure, shared pages are private otherwise
+    attached.wait()
+    results.put((private_mb() - before, seconds, checksum))
+    attached.wait()
+
+
+def _worker_memory(path: str, payload: bytes | None) -> tuple[float, float]:
+    """Summed private memory growth and slowest load of SHARED_WORKERS processes"""
+    context = multiprocessing.get_context("spawn")
+    attached, results = context.Barrier(SHARED_WORKERS), context.Queue()
+    workers, connections = [], []
+    for _ in range(SHARED_WORKERS):
+        receiver, sender = context.Pipe(duplex=False) if payload else (None, None)
+        workers.append(context.Process(target=_structure_worker, args=(path, receiver, attached, results)))
+        connections.append(sender)
+    for worker in workers:
+        worker.start()
+    for sender in connections:
+        if sender:
+            sender.send_bytes(payload)
+    reports = [results.get() for _ in workers]
+    for worker in workers:
+        worker.join()
+    return sum(report[0] for report in reports), max(report[1] for report in reports)
+
+
+def case_shared(path: str, repeat: int) -> dict:
+    """Worker processes attaching to one memory-mapped structure versus each receiving a pickled copy"""
+    from pymolvis.structure_cache import load_structure
+
+    if not os.path.isfile("/proc/self/smaps_rollup"):
+        return {"status": "skipped", "reason": "private memory is only measured on Linux"}
+    structure = load_structure(path)
+    shared_mb, seconds = _worker_memory(path, None)
+    copied_mb, copy_seconds = _worker_memory(path, pickle.dumps(structure, protocol=pickle.HIGHEST_PROTOCOL))
+    return {"seconds": seconds, "items": len(structure) * SHARED_WORKERS, "unit": "atoms",
+            "workers": SHARED_WORKERS, "copy_seconds": round(copy_seconds, 6),
+            "shared_private_mb": round(shared_mb, 1), "copied_private_mb": round(copied_mb, 1),
+            "saved_mb": round(copied_mb - shared_mb, 1)}
+
+
+def case_distances(path: str, repeat: int) -> dict:
+    from pymolvis.distances import measure_distances
+    from pymolvis.structure_cache import load_structure
+
+    structure = load_structure(path)
+    rng = random.Random(0)
+    pairs = []
+    for _ in range(DISTANCE_PAIRS):
+        first, second = (structure.atom(rng.randrange(len(structure))) for _ in range(2))
+        pairs.append(f"{first['chain']}:{first['resi']}:{first['name']}-{second['chain']}:{second['resi']}:{second['name']}")
+    distance_pairs = ",".join(pairs)
+    seconds = timed(lambda: measure_distances(structure, distance_pairs), repeat)
+    return {"seconds": seconds, "items": DISTANCE_PAIRS, "unit": "pairs"}
+
+
+def case_render(path: str, size: int, repeat: int) -> dict:
+    from pymolvis.render_pool import init_worker, pymol_available, render_job
+
+    if not pymol_available():
+        return {"status": "skipped", "reason": "pymol2 is not installed"}
+    init_worker()
+    with tempfile.TemporaryDirectory() as output_dir:
+        scene = {"structure": path, "commands": ["hide everything", "show cartoon", "orient"],
+                 "width": size, "height": size, "threads": 1, "output": os.path.join(output_dir, "render.png")}
+        seconds = timed(lambda: render_job(scene), repeat)
+    return {"seconds": seconds, "items": size * size / 1e6, "unit": "megapixels"}
+
+
+def run_case(case: str, path: str, param: str, repeat: int) -> dict:
+    baseline_rss = peak_rss_mb()
+    kind = case.split(".")[0]
+    if kind == "prompt":
+        result = case_prompt(param, path, repeat)
+    elif kind == "interface":
+        result = case_interface(path, repeat)
+    elif kind == "sasa":
+        result = case_sasa(path, repeat)
+    elif kind == "contacts":
+        result = case_contacts(path, repeat)
+    elif kind == "superpose":
+        result = case_superpose(path, repeat)
+    elif kind == "shared":
+        result = case_shared(path, repeat)
+    elif kind == "distances":
+        result = case_distances(path, repeat)
+    elif kind == "render":
+        result = case_render(path, int(param), repeat)
+    else:
+        raise ValueError(f"Unknown benchmark case: {case}")
+    if result.get("status") == "skipped":
+        return result
+    result["status"] = "ok"
+    result["seconds"] = round(result["seconds"], 6)
+    result["throughput"] = round(result["items"] / max(result["seconds"], 1e-9), 3)
+    result["peak_rss_mb"] = round(peak_rss_mb(), 1)
+    result["rss_growth_mb"] = round(peak_rss_mb() - baseline_rss, 1)
+    return result
+
+
+def plan(args) -> list[tuple[str, str, str]]:
+    """(case name, structure path, parameter) of every selected case"""
+    from pymolvis.arguments import TEMPLATES
+    from synthetic import cached_complex
+
+    only = set(args.only.split(",")) if args.only else None
+    cases = []
+    if not only or "prompt" in only:
+        path = cached_complex(args.data_dir, PROMPT_STRUCTURE_ATOMS, 2, fmt="pdb")
+        cases += [(f"prompt.{template}", path, template) for template in TEMPLATES]
+    for n_atoms in (int(value) for value in args.sizes.split(",")):
+        path = cached_complex(args.data_dir, n_atoms, 2, fmt="cif")
+        for kind in ("interface", "sasa", "superpose", "shared", "distances"):
+            # Shrake-Rupley on a million atoms would dominate the suite's run time
+            if (not only or kind in only) and (kind != "sasa" or n_atoms <= SASA_MAX_ATOMS):
+                cases.append((f"{kind}.{n_atoms}", path, ""))
+        if not only or "contacts" in only:
+            # Large assemblies, so the screen covers thousands of chain pairs
+            cases.append((f"contacts.{n_atoms}x{CONTACT_CHAINS}",
+                          cached_complex(args.data_dir, n_atoms, CONTACT_CHAINS, fmt="cif"), ""))
+    if not only or "render" in only:
+        path = cached_complex(args.data_dir, RENDER_STRUCTURE_ATOMS, 2, fmt="pdb")
+        cases += [(f"render.{size}x{size}", path, size) for size in args.resolutions.split(",")]
+    return cases
+
+
+def machine() -> dict:
+    import numpy
+
+    return {"platform": platform.platform(), "processor": platform.machine(), "cpus": os.cpu_count(),
+            "python": platform.python_version(), "numpy": numpy.__version__}
+
+
+def compare(results: dict, baseline: dict, tolerance: float, rss_tolerance: float,
+            min_delta: float = 0.0, token_tolerance: float = 0.1) -> list[str]:
+    """Regression messages for cases slower or larger than the baseline
+
+    Slowdowns smaller than min_delta seconds are timer noise on millisecond cases and pass.
+    """
+    regressions = []
+    for name, result in results["cases"].items():
+        reference = baseline.get("cases", {}).get(name)
+        if result.get("status") != "ok" or not reference or reference.get("status") != "ok":
+            continue
+        slowdown = result["seconds"] - reference["seconds"]
+        if slowdown > reference["seconds"] * tolerance and slowdown > min_delta:
+            regressions.append(f"{name}: {result['seconds']:.4f} s vs baseline {reference['seconds']:.4f} s")
+        if result["peak_rss_mb"] > reference["peak_rss_mb"] * (1 + rss_tolerance):
+            regressions.append(f"{name}: peak RSS {result['peak_rss_mb']:.0f} MB "
+                               f"vs baseline {reference['peak_rss_mb']:.0f} MB")
+        for key in ("tokens", "continue_tokens"):
+            if key in result and key in reference and result[key] > reference[key] * (1 + token_tolerance):
+                regressions.append(f"{name}: {key} {result[key]} vs baseline {reference[key]}")
+    return regressions
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", default="1000,10000,100000,1000000", help="Atom counts of the synthetic complexes")
+    parser.add_argument("--resolutions", default="320,640,960", help="Square render sizes in pixels")
+    parser.add_argument("--only", help="Comma-separated case kinds: prompt, interface, sasa, contacts, superpose, shared, distances, render")
+    parser.add_argument("--repeat", type=int, default=5, help="Timed repetitions per case, the best is kept")
+    parser.add_argument("--output", default="bench-results.json")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--update-baseline", action="store_true", help="Store these results as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=0.3, help="Allowed relative slowdown")
+    parser.add_argument("--min-delta-ms", type=float, default=10.0, help="Slowdowns below this always pass")
+    parser.add_argument("--token-tolerance", type=float, default=0.1, help="Allowed relative prompt size growth")
+    parser.add_argument("--rss-tolerance", type=float, default=0.15, help="Allowed relative peak RSS growth")
+    parser.add_argument("--data-dir", default=os.path.join(tempfile.gettempdir(), "pymolvis-bench"))
+    parser.add_argument("--case", help=argparse.SUPPRESS)
+    parser.add_argument("--path", help=argparse.SUPPRESS)
+    parser.add_argument("--param", default="", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.case:
+        print(json.dumps(run_case(args.case, args.path, args.param, args.repeat)))
+        return 0
+
+    # Structure caches of the runs stay out of the user's cache directory
+    env = dict(os.environ, PYMOL_VIS_CACHE_DIR=os.path.join(args.data_dir, "cache"), PYMOL_VIS_RENDER_WORKERS="0")
+    results = {"created": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+               "machine": machine(), "cases": {}}
+    for name, path, param in plan(args):
+        completed = subprocess.run(
+            [sys.executable, __file__, "--case", name, "--path", path, "--param", str(param),
+             "--repeat", str(args.repeat)],
+            capture_output=True, text=True, env=env,
+        )
+        if completed.returncode != 0:
+            result = {"status": "error", "reason": completed.stderr.strip().splitlines()[-1:]}
+        else:
+            result = json.loads(completed.stdout.strip().splitlines()[-1])
+        results["cases"][name] = result
+        if result["status"] == "ok":
+            tokens = f" {result['tokens']} + {result['continue_tokens']} tokens" if "tokens" in result else ""
+            print(f"{name:<40s} {result['seconds'] * 1000:10.2f} ms {result['throughput']:14.1f} "
+                  f"{result['unit']}/s {result['peak_rss_mb']:8.1f} MB{tokens}")
+        else:
+            print(f"{name:<40s} {result['status']}: {result['reason']}")
+
+    with open(args.output, "w") as handle:
+        json.dump(results, handle, indent=2)
+    print(f"results: {args.output}")
+
+    if args.update_baseline:
+        with open(args.baseline, "w") as handle:
+            json.dump(results, handle, indent=2)
+        print(f"baseline updated: {args.baseline}")
+        return 0
+    if not os.path.isfile(args.baseline):
+        print(f"no baseline at {args.baseline}, run with --update-baseline to create one")
+        return 0
+
+    with open(args.baseline) as handle:
+        baseline = json.load(handle)
+    if baseline.get("machine") != results["machine"]:
+        print("warning: baseline was recorded on a different machine or software versions")
+    regressions = compare(results, baseline, args.tolerance, args.rss_tolerance, args.min_delta_ms / 1000,
+                          args.token_tolerance)
+    errors = [name for name, result in results["cases"].items() if result["status"] == "error"]
+    for message in regressions:
+        print(f"REGRESSION {message}")
+    for name in errors:
+        print(f"ERROR {name}")
+    return 1 if regressions or errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
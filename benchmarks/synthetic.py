@@ -0,0 +1,89 @@
+"""Synthetic multi-chain complexes for offline benchmarks."""
+
+import os
+import string
+
+import numpy as np
+
+RESIDUE_ATOMS = ("N", "CA", "C", "O", "CB", "CG", "CD", "CE")
+RESIDUE_ELEMENTS = ("N", "C", "C", "O", "C", "C", "C", "C")
+RESIDUE_NAMES = ("ALA", "ARG", "ASP", "GLU", "LEU", "LYS", "PHE", "SER", "THR", "TYR", "VAL", "ASN")
+SINGLE_CHAIN_IDS = string.ascii_uppercase + string.ascii_lowercase + string.digits
+
+
+def chain_ids(count: int, single_char: bool) -> list[str]:
+    if single_char:
+        if count > len(SINGLE_CHAIN_IDS):
+            raise ValueError(f"PDB format supports at most {len(SINGLE_CHAIN_IDS)} chains")
+        return list(SINGLE_CHAIN_IDS[:count])
+    ids = list(string.ascii_uppercase)
+    ids += [a + b for a in string.ascii_uppercase for b in string.ascii_uppercase]
+    return ids[:count]
+
+
+def complex_coordinates(n_atoms: int, n_chains: int, seed: int = 0) -> np.ndarray:
+    """Residue-sized atom clusters along confined random walks, one box per chain
+
+    Neighbouring chain boxes touch so every adjacent chain pair forms an interface.
+    Atom density is close to that of a folded protein.
+    """
+    rng = np.random.default_rng(seed)
+    per_chain = -(-n_atoms // n_chains)
+    residues = -(-per_chain // len(RESIDUE_ATOMS))
+    box = (residues * len(RESIDUE_ATOMS) / 0.05) ** (1 / 3)
+    side = int(np.ceil(n_chains ** (1 / 3)))
+
+    chains = []
+    for chain in range(n_chains):
+        origin = np.array([chain % side, (chain // side) % side, chain // (side * side)]) * box
+        steps = rng.normal(scale=2.2, size=(residues, 3))
+        walk = np.cumsum(steps, axis=0)
+        # Fold the walk back into the chain's box
+        walk = np.abs((walk % (2 * box)) - box)
+        atoms = walk[:, None, :] + rng.uniform(-1.5, 1.5, size=(residues, len(RESIDUE_ATOMS), 3))
+        chains.append((origin + atoms).reshape(-1, 3))
+    return np.concatenate(chains)[: n_atoms].astype(np.float32)
+
+
+def write_complex(path: str, n_atoms: int, n_chains: int, seed: int = 0) -> str:
+    """Write a synthetic complex as PDB or mmCIF (chosen by extension)"""
+    is_cif = path.endswith(".cif")
+    coords = complex_coordinates(n_atoms, n_chains, seed)
+    ids = chain_ids(n_chains, single_char=not is_cif)
+    per_chain = -(-n_atoms // n_chains)
+    n_residue_atoms = len(RESIDUE_ATOMS)
+
+    lines = []
+    if is_cif:
+        lines.append("data_synthetic\nloop_")
+        for column in ("group_PDB", "id", "type_symbol", "label_atom_id", "label_alt_id", "label_comp_id",
+                       "label_asym_id", "label_seq_id", "pdbx_PDB_ins_code", "Cartn_x", "Cartn_y", "Cartn_z",
+                       "auth_seq_id", "auth_asym_id", "pdbx_PDB_model_num"):
+            lines.append(f"_atom_site.{column}")
+    for serial, (x, y, z) in enumerate(coords.tolist()):
+        chain = ids[serial // per_chain]
+        local = serial % per_chain
+        residue = local // n_residue_atoms + 1
+        slot = local % n_residue_atoms
+        resn = RESIDUE_NAMES[residue % len(RESIDUE_NAMES)]
+        name, element = RESIDUE_ATOMS[slot], RESIDUE_ELEMENTS[slot]
+        if is_cif:
+            lines.append(f"ATOM {serial + 1} {element} {name} . {resn} {chain} {residue} ? "
+                         f"{x:.3f} {y:.3f} {z:.3f} {residue} {chain} 1")
+        else:
+            lines.append(f"ATOM  {(serial + 1) % 100000:5d} {name:<4s} {resn} {chain}{residue % 10000:4d}    "
+                         f"{x:8.3f}{y:8.3f}{z:8.3f}  1.00  0.00          {element:>2s}")
+    lines.append("#" if is_cif else "END")
+
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "w") as handle:
+        handle.write("\n".join(lines) + "\n")
+    return path
+
+
+def cached_complex(directory: str, n_atoms: int, n_chains: int, fmt: str = "pdb", seed: int = 0) -> str:
+    """Path of a synthetic complex, generating it on first use"""
+    path = os.path.join(directory, f"synthetic_{n_atoms}_{n_chains}_{seed}.{fmt}")
+    if not os.path.isfile(path):
+        write_complex(path, n_atoms, n_chains, seed)
+    return path
@@ -1,7 +1,11 @@
 #!/usr/bin/env python3
 
 import asyncio
+import json
+import os
+import threading
 from mcp.server import Server
+from mcp.server.lowlevel.helper_types import ReadResourceContents
 from mcp.server.stdio import stdio_server
 from mcp.types import (
     GetPromptResult,
@@ -9,11 +13,50 @@ from mcp.types import (
     PromptArgument,
     TextContent,
     PromptMessage,
+    Resource,
+    ResourceTemplate,
+    Tool,
 )
 
+from pymolvis.assembly import DEFAULT_MIN_CONTACTS, chain_contacts, suggest_components
+from pymolvis.arguments import (
+    CONTINUE_SUFFIX,
+    MULTI_COMPONENT,
+    SINGLE_COMPONENT,
+    TEMPLATES,
+    parse_components,
+    split_chains,
+    split_prompt_name,
+    validate_arguments,
+)
+from pymolvis.chain_index import default_chain_loader
+from pymolvis.config import cache_dir
+from pymolvis.distances import measure_distances
+from pymolvis.fetch import default_fetch_cache, is_pdb_id, resolve_structure_path
+from pymolvis.interactions import INTERACTION_COLORS, classify_interactions
+from pymolvis.interface import DEFAULT_CUTOFF, DEFAULT_TOP_K, find_interface
+from pymolvis.lod import DEFAULT_HEIGHT, DEFAULT_WIDTH, ProgressiveRenderer, choose_tier, draft_render_command
+from pymolvis.presets import DEFAULT_PRESET, RENDER_PRESETS, preset_command_line, switch_preset_commands
+from pymolvis.render_cache import cached_render, default_render_cache
+from pymolvis.render_pool import WORKERS_ENV, default_render_pool, object_name, pymol_available
+from pymolvis.residues import compile_key_residues
+from pymolvis.sasa import DEFAULT_MIN_BURIED, DEFAULT_POINTS, buried_surface
+from pymolvis.sessions import default_session_pool
+from pymolvis.superpose import ATOM_SETS, DEFAULT_ATOM_SET, superpose_models
+from pymolvis.structure_cache import (
+    default_cache,
+    load_structure,
+    load_structure_chains,
+    load_structure_summary,
+    structure_atom_count,
+)
+from pymolvis.tiles import TiledRenderer, tile_count
+from pymolvis.tracing import default_tracer, span
+from pymolvis.trajectory import DEFAULT_MIN_OCCUPANCY, DEFAULT_SKIN, interface_occupancy, iter_frames
+
 server = Server("pymol-visualizer")
 
-# Concise system prompt
+# First-stage prompt: Phases 1-4, up to the pause point
 VISUALIZATION_PROMPT = """
 You are the PyMOL protein structure visualization expert. Intelligently perform visualization analysis based on user needs.
 
@@ -21,10 +64,10 @@ You are the PyMOL protein structure visualization expert. Intelligently perform
 # Analysis type: {analysis_type}
 # User specification: {user_input}
 
-# Execution strategy:
+# Execution strategy:{trace_instruction}
 
 ## Phase 1: Environment preparation and structure loading
-Launch PyMOL and establish a clean working environment. Load target structure (use fetch command to get PDB or load local file).
+Launch PyMOL and establish a clean working environment. {load_instruction}
 Basic cleanup: Remove solvent molecules, water molecules and other interfering substances.
 Set background: white and opaque.
 
@@ -33,43 +76,15 @@ Set background: white and opaque.
 
 ## Phase 3: Visualization scheme implementation
 Choose main representation method based on analysis goals: cartoon shows overall folding, surface displays molecular shape, sticks show atomic details.
-Stick mode displays key atoms
-Color key residues by element: run_pymol_command("util.cbaw key_residues")
-Only single component analysis requires this step (grayscale setting): Apply grayscale spectrum to all Cα atoms except key residues: run_pymol_command("spectrum count, white_gray70, name ca and not key_residues")
-Represent key residue Cα atoms as colored spheres with radius 0.3, each key residue's Cα atom uses different colors, distinguished from existing colors in structure and background color (avoid red, blue, gray)
-
+{visualization_instructions}
 Set initial viewing angle: Choose observation angle and zoom scale that can show the overall protein.
 
 ## Phase 4: Publication-quality rendering optimization
 
-Professional rendering settings:
-    - run_pymol_command("set ray_trace_mode, 1")
-    - run_pymol_command("set ray_trace_gain, 0.05")
-    - run_pymol_command("set ray_trace_depth_factor, 1")
-    - run_pymol_command("set ray_trace_disco_factor, 1")
-    - run_pymol_command("set specular, 0")
-    - run_pymol_command("set ambient, 0.8")
-    - run_pymol_command("set cartoon_side_chain_helper, on")
-    - run_pymol_command("set valence, off")
-    - run_pymol_command("set ray_shadow, off")
-    - run_pymol_command("set reflect, 0.5")
-    - run_pymol_command("set stick_radius, 0.25")
-    - run_pymol_command("hide labels")
-    - run_pymol_command("ray")
+{render_instructions}
 
 🛑 **Pause point**: Rendering optimization and ray completed, tell user they can save the first basic visualization image, then input 'continue' to proceed with detailed scientific analysis.
-
-## Phase 5: In-depth scientific analysis (continue after user confirmation)
-{analysis_focus}
-
-## Phase 6: Measurement and annotation
-If single component analysis: Only show key residues, protein backbone transparency set to 65%
-If multi-component analysis: Show interface residues, hide all surface display, cartoon protein backbone transparency set to 85%
-*If user performed distance measurement, display residues at both ends of distance in stick mode
-
-## Phase 7: Final optimization and output
-Adjust to optimal display angle: Consider symmetry and visibility of important features.
-Perform final quality check: Ensure all key information is clearly visible, color scheme is reasonable, no technical errors.
+When the user inputs 'continue', call continue_visualization({continue_arguments}) once and follow the Phase 5-7 instructions it returns.
 
 # Important principles:
 - Strictly execute according to user-specified residues/chains, do not speculate on your own
@@ -90,63 +105,190 @@ Perform final quality check: Ensure all key information is clearly visible, colo
 
 """
 
+# Second-stage prompt: Phases 5-7, served on 'continue' so the first stage stays compact
+CONTINUE_PROMPT = """
+Continue the PyMOL visualization of {structure} ({analysis_type}) from the pause point. Objects, selections and colors from Phases 1-4 are already in place; keep following the principles and error handling strategy given at the start.{trace_instruction}
+
+## Phase 5: In-depth scientific analysis
+{analysis_focus}
+
+## Phase 6: Measurement and annotation
+{measurement_instructions}
+
+## Phase 7: Final optimization and output
+Adjust to optimal display angle: Consider symmetry and visibility of important features.
+Perform final quality check: Ensure all key information is clearly visible, color scheme is reasonable, no technical errors.
+
+"""
+
+# Conditional prompt lines, included only when they apply to the template and arguments
+STICK_DISPLAY = "Stick mode displays key atoms"
+KEY_RESIDUE_COLORING = 'Color key residues by element: run_pymol_command("util.cbaw {key_residues}")'
+GRAYSCALE_INSTRUCTION = 'Apply grayscale spectrum to all Cα atoms except key residues: run_pymol_command("spectrum count, white_gray70, {structure_object} and name ca and not {key_residues}")'
+KEY_RESIDUE_SPHERES = "Represent key residue Cα atoms as colored spheres with radius 0.3, each key residue's Cα atom uses different colors, distinguished from existing colors in structure and background color (avoid red, blue, gray)"
+DISTANCE_STICKS_INSTRUCTION = "Display residues at both ends of each measured distance in stick mode"
+
+def join_lines(*lines: str) -> str:
+    """Lines of a prompt section, leaving out conditional lines that are empty"""
+    return "\n".join(line for line in lines if line)
+
+SINGLE_COMPONENT_ARGUMENTS = [
+    PromptArgument(name="structure", description="PDB ID or file path", required=True),
+    PromptArgument(name="key_residues", description="Key residues (e.g., 57,102 or A:57,B:102, optional)", required=False),
+    PromptArgument(name="distance_pairs", description="Distance pairs (e.g., 57:CA-102:CA)", required=False)
+]
+
+MULTI_COMPONENT_ARGUMENTS = [
+    PromptArgument(name="structure", description="PDB ID or file path", required=True),
+    PromptArgument(name="key_residues", description="Key residues (e.g., 57,102 or A:57,B:102, optional)", required=False),
+    PromptArgument(name="components", description="Component definition (e.g., receptor:A+B+C,ligand:D+E; the suggest_components tool proposes one)", required=True),
+    PromptArgument(name="distance_pairs", description="Distance pairs (e.g., 57:CA-102:CA)", required=False)
+]
+
 @server.list_prompts()
 async def list_prompts() -> list[Prompt]:
-    """Available analysis templates"""
+    """Available analysis templates, each with a _continue prompt for Phases 5-7"""
     return [
         Prompt(
-            name="single_component_analysis",
+            name=SINGLE_COMPONENT,
             description="Single component residue analysis",
-            arguments=[
-                PromptArgument(name="structure", description="PDB ID or file path", required=True),
-                PromptArgument(name="key_residues", description="Key residues (e.g., 57,102 or A:57,B:102, optional)", required=False),
-                PromptArgument(name="distance_pairs", description="Distance pairs (e.g., 57:CA-102:CA)", required=False)
-            ]
+            arguments=SINGLE_COMPONENT_ARGUMENTS
         ),
         Prompt(
-            name="multi_component_analysis", 
+            name=MULTI_COMPONENT,
             description="Receptor-ligand interaction analysis",
-            arguments=[
-                PromptArgument(name="structure", description="PDB ID or file path", required=True),
-                PromptArgument(name="key_residues", description="Key residues (e.g., 57,102 or A:57,B:102, optional)", required=False),
-                PromptArgument(name="components", description="Component definition (e.g., receptor:A+B+C,ligand:D+E)", required=True),
-                PromptArgument(name="distance_pairs", description="Distance pairs (e.g., 57:CA-102:CA)", required=False)
-            ]
+            arguments=MULTI_COMPONENT_ARGUMENTS
+        ),
+        Prompt(
+            name=SINGLE_COMPONENT + CONTINUE_SUFFIX,
+            description="Single component residue analysis, Phases 5-7 after the pause point",
+            arguments=SINGLE_COMPONENT_ARGUMENTS
+        ),
+        Prompt(
+            name=MULTI_COMPONENT + CONTINUE_SUFFIX,
+            description="Receptor-ligand interaction analysis, Phases 5-7 after the pause point",
+            arguments=MULTI_COMPONENT_ARGUMENTS
         )
     ]
 
-@server.get_prompt()
-async def get_prompt(name: str, arguments: dict | None = None) -> GetPromptResult:
-    """Generate visualization prompt"""
+async def load_instruction(structure: str) -> str:
+    """Phase 1 loading step, served from the local fetch cache for PDB IDs"""
+    if not is_pdb_id(structure):
+        return f"Load target structure from local file: run_pymol_command(\"load {structure}\")"
     
-    if name == "single_component_analysis":
-        structure = arguments.get("structure", "")
-        key_residues = arguments.get("key_residues", "")
-        distance_pairs = arguments.get("distance_pairs", "")
-        
-        if not key_residues:
-            raise ValueError("Single component analysis requires key_residues parameter")
-        
-        # Build user input description
-        user_specs = [f"Key residues: {key_residues}"]
-        if distance_pairs:
-            user_specs.append(f"Distance measurement: {distance_pairs}")
-        
-        user_input = ", ".join(user_specs)
-        
-        user_instructions = f"""Identify and select user-specified key residues: {key_residues}.
-Create selection set named 'key_residues' containing all specified residues.
-Support cross-chain format (e.g., A:57 means residue 57 on chain A) and same-chain format (e.g., 57,102,195).
+    try:
+        path = await asyncio.to_thread(default_fetch_cache().resolve, structure)
+    except (OSError, ValueError):
+        # Mirror and download both unavailable, leave fetching to PyMOL
+        return "Load target structure (use fetch command to get PDB)."
+    
+    return f"Load target structure from the local structure cache (do not use fetch): run_pymol_command(\"load {path}, {structure}\")"
+
+async def render_instructions(structure: str) -> str:
+    """Phase 4 rendering step, a draft plus background final render for large structures"""
+    full = f"""Professional rendering settings, applied together with ray in a single call (do not split it into separate commands):
+    - run_pymol_command("{preset_command_line()}")"""
+    
+    try:
+        atom_count = await asyncio.to_thread(structure_atom_count, structure)
+    except (OSError, ValueError):
+        return full
+    tier = choose_tier(atom_count)
+    if not tier.get("draft"):
+        return full
+    
+    session = os.path.join(cache_dir("sessions"), f"{object_name(structure)}_phase4.pse")
+    return f"""Large structure ({atom_count} atoms): show a fast draft first, the publication-quality image is ray traced in the background.
+Draft settings and draft render in a single call (do not split it into separate commands):
+    - run_pymol_command("{preset_command_line('draft', draft_render_command(tier))}")
+Put the professional settings back before saving, so neither the background render nor the later phases use draft settings, then hand the scene to a background render worker:
+    - run_pymol_command("{'; '.join(switch_preset_commands('draft'))}")
+    - run_pymol_command("save {session}")
+    - render_scene(input_session="{session}", width={DEFAULT_WIDTH}, height={DEFAULT_HEIGHT}, background=true)
+Do not wait for it; at the pause point call render_status with the returned final_job id and give the user the final image path once it is done."""
+
+def analysis_prefix(structure: str) -> str:
+    """Prefix of the objects and selections a prompt creates in the shared PyMOL session
+
+    Analyses of different structures run through the same run_pymol_command session,
+    fixed names like key_residues would make each one overwrite the previous one's.
+    """
+    return f"{object_name(structure)}_"
+
+async def key_residue_batch(structure: str, key_residues: str, scope: str | None = None) -> dict:
+    """Compiled key residue selection, checked against the structure when it can be loaded"""
+    def run():
+        try:
+            parsed = load_structure(structure)
+        except (OSError, ValueError):
+            parsed = None
+        return compile_key_residues(key_residues, parsed, scope, f"{analysis_prefix(structure)}key_residues")
+
+    return await asyncio.to_thread(run)
+
+def key_residue_instruction(key_residues: str, batch: dict, selection_name: str) -> str:
+    """Phase 2 key residue step running the precompiled selection batch in a single call"""
+    notes = []
+    if batch["missing_count"]:
+        notes.append(f"- Not found in the structure, leave out and tell the user: {', '.join(batch['missing'])}"
+                     + (f" and {batch['missing_count'] - len(batch['missing'])} more" if batch["missing_count"] > len(batch["missing"]) else ""))
+    if batch["ambiguous"]:
+        notes.append(f"- Residues without a chain found on several chains (selected on all of them, tell the user): {', '.join(batch['ambiguous'])}")
+    return join_lines(
+        f"Select user-specified key residues ({key_residues}) with the precompiled batch, in a single call (do not rebuild the selection residue by residue):",
+        f"    - run_pymol_command(\"{batch['script']}\")",
+        f"The batch creates selection set '{selection_name}' with per-chain residue ranges, shows it as sticks colored by atom type and its Cα atoms as 0.3 radius spheres.",
+        *notes,
+        f"- If '{selection_name}' is reported as an invalid selection later, recreate it with: run_pymol_command(\"{batch['commands'][0]}\")"
+    )
+
+def trace_instruction(structure: str, stage: int) -> str:
+    """Phase boundary reporting, only while tracing is enabled"""
+    if not default_tracer().enabled:
+        return ""
+    ending = 'with phase="paused" at the pause point' if stage == 1 else 'and phase="done" after Phase 7'
+    return f"""
+Timing trace is on: call trace_phase(structure="{structure}", phase=N) when starting each Phase N below, {ending}."""
+
+def distance_instruction(structure: str, distance_pairs: str) -> str:
+    """Phase 5 distance measurement step for the user's distance pairs"""
+    if not distance_pairs:
+        return ""
+    return (f"Measure all user distance pairs with one measure_distances tool call: "
+            f"measure_distances(structure=\"{structure}\", distance_pairs=\"{distance_pairs}\", object=\"{object_name(structure)}\"). "
+            f"Draw every measured pair with a single run_pymol_command of the returned script, do not issue one distance command per pair. "
+            f"Report pairs returned with an error (e.g. ambiguous chain) to the user instead of guessing the chain.")
+
+def continue_arguments(template: str, values: dict) -> str:
+    """continue_visualization call arguments repeating the user's template arguments"""
+    arguments = [f'template="{template}"']
+    arguments += [f'{key}="{values[key]}"' for key in ("structure", "components", "key_residues", "distance_pairs")
+                  if values.get(key)]
+    return ", ".join(arguments)
+
+def single_component_sections(values: dict) -> dict:
+    """Template sections of the single component analysis"""
+    structure = values["structure"]
+    key_residues = values["key_residues"]
+    distance_pairs = values["distance_pairs"]
+    selection = f"{analysis_prefix(structure)}key_residues"
+
+    # Build user input description
+    user_specs = [f"Key residues: {key_residues}"]
+    if distance_pairs:
+        user_specs.append(f"Distance measurement: {distance_pairs}")
+
+    user_instructions = f"""Execute hide everything to ensure clean starting state.
+{key_residue_instruction(key_residues, values["key_residue_batch"], selection)}
 
 Important display control:
-- Execute hide everything to ensure clean starting state
-- Only show key residues: show sticks, key_residues
-- First color key residues by atom type: util.cbaw key_residues
-- Then assign unique colors to C atoms of each key residue (e.g., forest, deeppurple, gold, teal, etc., avoid conflicts with red and blue)
+- Only show key residues
+- Assign unique colors to C atoms of each key residue (e.g., forest, deeppurple, gold, teal, etc., avoid conflicts with red and blue)
 - Ensure O=red, N=blue, S=yellow and other standard atom colors remain unchanged
-- Each key residue's Cα atom represented as 0.3 radius sphere, color consistent with that residue's C atom color."""
-        
-        analysis_focus = f"""Focus on structural features and interactions of key residues:
+- Each key residue's Cα sphere color consistent with that residue's C atom color."""
+
+    analysis_focus = join_lines(
+        f"""Focus on structural features and interactions of key residues:
 
 **Protein backbone optimized display** (execute after pause point):
 - Set protein backbone to uniform dark gray: color gray40, {structure}
@@ -156,137 +298,754 @@ Strictly control displayed content:
 - Protein backbone transparency set to 65%, color as gray40
 - Key residues use high contrast, aesthetically pleasing color scheme
 - Ensure each residue is completely visually distinguishable
-- Ensure key residues are completely visible: set transparency, 0.0, key_residues
-If user provided distance measurement pairs, perform precise inter-atomic distance measurements.
-Note: Do not display hydrogen bonds and hydrogen bond distance labels, also do not display residue labels."""
-        
-        system_content = VISUALIZATION_PROMPT.format(
-            structure=structure,
-            analysis_type="Single component residue analysis",
-            user_input=user_input,
-            user_instructions=user_instructions,
-            analysis_focus=analysis_focus
-        )
-        
-        return GetPromptResult(
-            description=f"PyMOL single component analysis: {structure}",
-            messages=[PromptMessage(role="user", content=TextContent(type="text", text=system_content))]
+- Ensure key residues are completely visible: set transparency, 0.0, {selection}""",
+        distance_instruction(structure, distance_pairs),
+        "Note: Do not display hydrogen bonds and hydrogen bond distance labels, also do not display residue labels."
+    )
+
+    return {
+        "analysis_type": "Single component residue analysis",
+        "description": "single component analysis",
+        "user_input": ", ".join(user_specs),
+        "user_instructions": user_instructions,
+        "visualization_instructions": join_lines(
+            STICK_DISPLAY,
+            KEY_RESIDUE_COLORING.format(key_residues=selection),
+            GRAYSCALE_INSTRUCTION.format(key_residues=selection, structure_object=object_name(structure)),
+            KEY_RESIDUE_SPHERES
+        ),
+        "analysis_focus": analysis_focus,
+        "measurement_instructions": join_lines(
+            "Only show key residues, protein backbone transparency set to 65%",
+            DISTANCE_STICKS_INSTRUCTION if distance_pairs else ""
         )
-    
-    elif name == "multi_component_analysis":
-        structure = arguments.get("structure", "")
-        key_residues = arguments.get("key_residues", "")
-        components = arguments.get("components", "")
-        distance_pairs = arguments.get("distance_pairs", "")
-        
-        if not components:
-            raise ValueError("Multi-component analysis requires components parameter")
-        
-        # Validate receptor and ligand format
-        if "receptor:" not in components or "ligand:" not in components:
-            raise ValueError("Component definition must use receptor:chains,ligand:chains format")
-        
-        # Build user input description
-        user_specs = [f"Component division: {components}"]
-        if key_residues:
-            user_specs.append(f"Key residues: {key_residues}")
-        if distance_pairs:
-            user_specs.append(f"Distance measurement: {distance_pairs}")
-        
-        user_input = ", ".join(user_specs)
-        
-        # Parse receptor ligand components
-        comp_parts = components.split(',')
-        receptor_chains = ""
-        ligand_chains = ""
-        
-        for comp_def in comp_parts:
-            if ':' in comp_def:
-                comp_name, chains = comp_def.split(':', 1)
-                comp_name = comp_name.strip()
-                if comp_name == "receptor":
-                    receptor_chains = chains.strip()
-                elif comp_name == "ligand":
-                    ligand_chains = chains.strip()
-        
-        user_instructions = f"""Divide receptor-ligand components according to user specification:
+    }
+
+def multi_component_sections(values: dict) -> dict:
+    """Template sections of the receptor-ligand interaction analysis"""
+    structure = values["structure"]
+    key_residues = values["key_residues"]
+    distance_pairs = values["distance_pairs"]
+    components = values["components"]
+    receptor_chains = values["receptor_chains"]
+    ligand_chains = values["ligand_chains"]
+    prefix = analysis_prefix(structure)
+    receptor, ligand = f"{prefix}receptor", f"{prefix}ligand"
+    receptor_interface, ligand_interface = f"{prefix}receptor_interface", f"{prefix}ligand_interface"
+
+    # Build user input description
+    user_specs = [f"Component division: {components}"]
+    if key_residues:
+        user_specs.append(f"Key residues: {key_residues}")
+    if distance_pairs:
+        user_specs.append(f"Distance measurement: {distance_pairs}")
+
+    if key_residues:
+        key_residue_instructions = f"""{key_residue_instruction(key_residues, values["key_residue_batch"], f"{prefix}key_residues")}
+
+Key residue special coloring:
+- Assign unique colors to C atoms of each key residue (avoid conflicts with interface residue cyan/lightorange)
+- Maintain O=red, N=blue, S=yellow and other standard atom colors unchanged
+- Each key residue's Cα sphere color consistent with that residue's C atom color."""
+    else:
+        key_residue_instructions = "Focus on interface interaction analysis, emphasize precise atomic-level PPI interface regions between receptor and ligand."
+
+    user_instructions = f"""Divide receptor-ligand components according to user specification:
 Create receptor component containing chains {receptor_chains}, color with marine
 Create ligand component containing chains {ligand_chains}, color with orange
 Create independent PyMOL objects for each component, use different colors to distinguish.
 Show semi-transparent surface for each component: execute show surface command, then set transparency to 0.85.
 
-Use precise cmd.iterate_state method to identify interface interaction residues:
-1. Use cmd.iterate_state to get all atomic coordinates and information of receptor and ligand into dictionaries:
-   - Create receptor_atoms and ligand_atoms dictionaries to store atomic information
-   - Use cmd.iterate_state(1, "receptor", "store_receptor_atom(model, chain, resi, name, x, y, z)")
-   - Use cmd.iterate_state(1, "ligand", "store_ligand_atom(model, chain, resi, name, x, y, z)")
-
-2. Calculate distances between all receptor-ligand atom pairs:
-   - Iterate through all receptor atom and ligand atom pairs
-   - Calculate Euclidean distance: sqrt((x1-x2)² + (y1-y2)² + (z1-z2)²)
-   - Store distance information including residue number, atom name, chain information
-
-3. Identify closest residue and atom pairs:
-   - Sort all atom pairs by distance
-   - Select top 10 closest atom pairs
-   - Extract involved residue numbers to receptor_interface_resi and ligand_interface_resi lists
+Identify interface interaction residues with the server-side find_interface tool (do not compute atom-pair distances in a PyMOL Python loop):
+1. Name the component objects exactly {receptor} and {ligand}.
 
-4. Create precise interface residue selection sets:
-   - Use "chain X and resi Y" format instead of simple resi numbers to precisely select interface residues
-   - Avoid selecting same-numbered residues on other chains
+2. Call the find_interface tool once:
+   - find_interface(structure="{structure}", components="{components}", prefix="{prefix}")
+   - The tool returns the closest receptor-ligand atom pairs, the receptor and ligand interface residue sets, and a ready-made commands list
 
-5. Draw distance lines between closest atom pairs:
-   - Use cmd.distance() to draw distance lines for top 10 closest atom pairs
-   - Complete all operations in the same Python script block to avoid variable scope issues
+3. Run every entry of the returned commands list with run_pymol_command, in order:
+   - The select commands create {receptor_interface} and {ligand_interface} using "chain X and resi Y" selections scoped to each object
+   - The distance commands draw distance lines for the closest atom pairs
 
 Important technical points:
-- **Precise residue selection**: Use "chain X and resi Y" format instead of simple resi numbers, avoid selecting same-numbered residues on other chains
-- **Variable persistence**: Must complete all operations (atom extraction, distance calculation, selection set creation, distance line drawing) in the same Python script block to avoid variable scope loss issues
+- **Precise residue selection**: Use the chain-qualified selections returned by the tool unchanged, do not rewrite them as simple resi numbers
+- **Selection recovery**: If {receptor_interface} or {ligand_interface} is lost, re-run the returned select commands instead of recomputing distances
+- **Large or flat interfaces**: When the closest pairs cover only part of the interface, call buried_surface(structure="{structure}", components="{components}", prefix="{prefix}") and run its returned select commands, which select residues by buried surface area (ΔSASA) instead of contact distance
+- **Ensembles and trajectories**: If the structure has multiple states (e.g. an NMR ensemble) or the user provides an MD trajectory, call interface_occupancy(structure="{structure}", components="{components}", prefix="{prefix}") instead (add trajectory="..." for a DCD file) and run its returned select commands, which keep residues in contact in at least half of the frames
 
 Interface residues displayed as sticks, colored by atom type, receptor C atoms=cyan, ligand C atoms=lightorange
 
 Receptor-ligand interface residue differentiation coloring scheme:
-- First color all interface residues by atom type: util.cbaw receptor_interface and util.cbaw ligand_interface
+- First color all interface residues by atom type: util.cbaw {receptor_interface} and util.cbaw {ligand_interface}
 - Then separately modify carbon atom colors to distinguish receptor-ligand:
   - Receptor interface residue C atoms: cyan
   - Ligand interface residue C atoms: lightorange
 - Maintain standard colors for other atoms: N=blue, O=red, S=yellow, etc.
-{('Then identify and select user-specified key residues: ' + key_residues + '.' if key_residues else '')}
-{('Create selection set named \'key_residues\' containing all specified residues.' if key_residues else '')}
-{('Support cross-chain format (e.g., A:57 means residue 57 on chain A) and same-chain format (e.g., 57,102,195).' if key_residues else '')}
-{('\nKey residue special coloring:\n- First color key residues by atom type: util.cbaw key_residues\n- Then assign unique colors to C atoms of each key residue (avoid conflicts with interface residue cyan/lightorange)\n- Maintain O=red, N=blue, S=yellow and other standard atom colors unchanged\n- Each key residue\'s Cα atom represented as 0.3 radius sphere, color consistent with that residue\'s C atom color.' if key_residues else '')}
-{('Focus on interface interaction analysis, emphasize precise atomic-level PPI interface regions between receptor and ligand.' if not key_residues else '')}"""
-        
-        analysis_focus = f"""Receptor-ligand interaction PPI analysis:
-Show overall structure of receptor and ligand: each component uses cartoon representation.
-Set background structure transparency to 85% to highlight interface regions.
-{('Highlight key residues: use sticks representation to show key residue side chains, spheres to represent Cα atoms.' if key_residues else '')}
-Set transparency of structural parts except {('key residues and ' if key_residues else '')}interface interaction residues to 85% to highlight key regions.
-Transparency of interface interaction residues is not adjusted, kept fully visible.
-Analyze receptor-ligand interactions: focus on analyzing interface interaction patterns between receptor binding pocket and ligand.
-Show precise inter-atomic distances: display distance lines between the closest 10 atom pairs, providing quantitative interaction information.
-Measure important distances: pay special attention to distances between receptor-ligand interface residues, identify key interactions.
-If user provided distance measurement pairs, perform precise inter-atomic distance measurements, especially cross receptor-ligand measurements.
-Note: Hide all labels."""
-        
-        system_content = VISUALIZATION_PROMPT.format(
+{key_residue_instructions}"""
+
+    analysis_focus = join_lines(
+        "Receptor-ligand interaction PPI analysis:",
+        "Show overall structure of receptor and ligand: each component uses cartoon representation.",
+        "Set background structure transparency to 85% to highlight interface regions.",
+        "Highlight key residues: use sticks representation to show key residue side chains, spheres to represent Cα atoms." if key_residues else "",
+        f"Set transparency of structural parts except {'key residues and ' if key_residues else ''}interface interaction residues to 85% to highlight key regions.",
+        "Transparency of interface interaction residues is not adjusted, kept fully visible.",
+        "Analyze receptor-ligand interactions: focus on analyzing interface interaction patterns between receptor binding pocket and ligand.",
+        "Show precise inter-atomic distances: display distance lines between the closest atom pairs returned by find_interface, providing quantitative interaction information.",
+        "Measure important distances: pay special attention to distances between receptor-ligand interface residues, identify key interactions.",
+        f"Classify interface interactions with one classify_interactions(structure=\"{structure}\", components=\"{components}\", prefix=\"{prefix}\") call and run its returned script in a single run_pymol_command; "
+        f"it draws hydrogen bonds ({INTERACTION_COLORS['hydrogen_bond']}), salt bridges ({INTERACTION_COLORS['salt_bridge']}), hydrophobic contacts ({INTERACTION_COLORS['hydrophobic']}), "
+        f"π stacking ({INTERACTION_COLORS['pi_stacking']}) and cation-π contacts ({INTERACTION_COLORS['cation_pi']}) as separate objects. Summarize its counts for the user.",
+        distance_instruction(structure, distance_pairs),
+        "Note: Hide all labels."
+    )
+
+    return {
+        "analysis_type": "Receptor-ligand interaction analysis",
+        "description": "receptor-ligand analysis",
+        "user_input": ", ".join(user_specs),
+        "user_instructions": user_instructions,
+        "visualization_instructions": join_lines(
+            STICK_DISPLAY,
+            KEY_RESIDUE_COLORING.format(key_residues=f"{prefix}key_residues") if key_residues else "",
+            KEY_RESIDUE_SPHERES if key_residues else ""
+        ),
+        "analysis_focus": analysis_focus,
+        "measurement_instructions": join_lines(
+            "Show interface residues, hide all surface display, cartoon protein backbone transparency set to 85%",
+            DISTANCE_STICKS_INSTRUCTION if distance_pairs else ""
+        )
+    }
+
+TEMPLATE_SECTIONS = {
+    SINGLE_COMPONENT: single_component_sections,
+    MULTI_COMPONENT: multi_component_sections,
+}
+
+async def build_prompt(template: str, stage: int, values: dict) -> tuple[str, str]:
+    """Description and text of the Phase 1-4 (stage 1) or Phase 5-7 (stage 2) prompt"""
+    structure = values["structure"]
+    if values.get("key_residues"):
+        # The single component analysis loads the whole structure as one object, components are created from it
+        scope = object_name(structure) if template == SINGLE_COMPONENT else None
+        values = {**values, "key_residue_batch": await key_residue_batch(structure, values["key_residues"], scope)}
+    sections = TEMPLATE_SECTIONS[template](values)
+    description = f"PyMOL {sections['description']}: {structure}"
+
+    if stage == 2:
+        text = CONTINUE_PROMPT.format(
             structure=structure,
-            analysis_type="Receptor-ligand interaction analysis",
-            user_input=user_input,
-            user_instructions=user_instructions,
-            analysis_focus=analysis_focus
+            analysis_type=sections["analysis_type"],
+            trace_instruction=trace_instruction(structure, stage),
+            analysis_focus=sections["analysis_focus"],
+            measurement_instructions=sections["measurement_instructions"]
+        )
+        return f"{description} (Phases 5-7)", text
+
+    text = VISUALIZATION_PROMPT.format(
+        structure=structure,
+        load_instruction=await load_instruction(structure),
+        render_instructions=await render_instructions(structure),
+        analysis_type=sections["analysis_type"],
+        user_input=sections["user_input"],
+        trace_instruction=trace_instruction(structure, stage),
+        user_instructions=sections["user_instructions"],
+        visualization_instructions=sections["visualization_instructions"],
+        continue_arguments=continue_arguments(template, values)
+    )
+    return description, text
+
+@server.get_prompt()
+async def get_prompt(name: str, arguments: dict | None = None) -> GetPromptResult:
+    """Generate visualization prompt, Phases 5-7 for the _continue prompts"""
+    template, stage = split_prompt_name(name)
+    values = validate_arguments(template, arguments)
+    description, text = await build_prompt(template, stage, values)
+    return GetPromptResult(
+        description=description,
+        messages=[PromptMessage(role="user", content=TextContent(type="text", text=text))]
+    )
+
+def final_render(scene: dict) -> dict:
+    """Full-quality render through the render cache, split into tiles across the pool when the scene asks for it"""
+    pool = default_render_pool()
+    renderer = TiledRenderer(pool, scene["tiles"]) if scene.get("tiles") else pool
+    return cached_render(renderer, default_render_cache(), scene)
+
+_progressive_renderer = None
+
+def progressive_renderer() -> ProgressiveRenderer:
+    """Draft renders go straight to the pool, final renders through the render cache"""
+    global _progressive_renderer
+    if _progressive_renderer is None:
+        pool = default_render_pool()
+        _progressive_renderer = ProgressiveRenderer(
+            pool.render,
+            final_render
+        )
+    return _progressive_renderer
+
+@server.list_tools()
+async def list_tools() -> list[Tool]:
+    """Server-side analysis tools"""
+    return [
+        Tool(
+            name="continue_visualization",
+            description="Phase 5-7 instructions of a visualization, fetched when the user inputs 'continue' at the pause point",
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "template": {"type": "string", "enum": list(TEMPLATES), "description": "Analysis template of the first stage"},
+                    "structure": {"type": "string", "description": "PDB ID or file path"},
+                    "components": {"type": "string", "description": "Component definition (multi-component analysis)"},
+                    "key_residues": {"type": "string", "description": "Key residues"},
+                    "distance_pairs": {"type": "string", "description": "Distance pairs"}
+                },
+                "required": ["template", "structure"]
+            }
+        ),
+        Tool(
+            name="find_interface",
+            description="Find receptor-ligand interface residues and closest atom pairs with a spatial grid",
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "structure": {"type": "string", "description": "PDB ID or file path"},
+                    "components": {"type": "string", "description": "Component definition (e.g., receptor:A+B+C,ligand:D+E)"},
+                    "cutoff": {"type": "number", "description": f"Contact distance cutoff in Angstrom (default {DEFAULT_CUTOFF})"},
+                    "top_k": {"type": "integer", "description": f"Number of closest atom pairs to return (default {DEFAULT_TOP_K})"},
+                    "prefix": {"type": "string", "description": "Prefix of the receptor/ligand objects and the selections in the returned commands, keeping analyses in one PyMOL session apart (default: none)"}
+                },
+                "required": ["structure", "components"]
+            }
+        ),
+        Tool(
+            name="classify_interactions",
+            description="Classify all receptor-ligand interface contacts in one pass (hydrogen bonds by donor/acceptor geometry, salt bridges, hydrophobic, pi stacking and cation-pi) and return a table plus one script drawing each class in its own color",
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "structure": {"type": "string", "description": "PDB ID or file path"},
+                    "components": {"type": "string", "description": "Component definition (e.g., receptor:A+B+C,ligand:D+E)"},
+                    "prefix": {"type": "string", "description": "Prefix of the receptor/ligand objects and the selections in the returned commands, keeping analyses in one PyMOL session apart (default: none)"}
+                },
+                "required": ["structure", "components"]
+            }
+        ),
+        Tool(
+            name="suggest_components",
+            description="Screen every chain pair for contacts in one spatial grid pass and propose receptor/ligand components for multi_component_analysis",
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "structure": {"type": "string", "description": "PDB ID or file path"},
+                    "cutoff": {"type": "number", "description": f"Contact distance cutoff in Angstrom (default {DEFAULT_CUTOFF})"},
+                    "min_contacts": {"type": "integer", "description": f"Atom contacts below which a chain pair is not an interface (default {DEFAULT_MIN_CONTACTS})"}
+                },
+                "required": ["structure"]
+            }
+        ),
+        Tool(
+            name="buried_surface",
+            description="Compute Shrake-Rupley SASA of receptor, ligand and complex and select interface residues by buried surface area (ΔSASA)",
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "structure": {"type": "string", "description": "PDB ID or file path"},
+                    "components": {"type": "string", "description": "Component definition (e.g., receptor:A+B+C,ligand:D+E)"},
+                    "min_buried": {"type": "number", "description": f"Minimum buried area in square Angstrom for an interface residue (default {DEFAULT_MIN_BURIED})"},
+                    "points": {"type": "integer", "description": f"Sphere points per atom (default {DEFAULT_POINTS})"},
+                    "prefix": {"type": "string", "description": "Prefix of the receptor/ligand objects and the selections in the returned commands, keeping analyses in one PyMOL session apart (default: none)"}
+                },
+                "required": ["structure", "components"]
+            }
+        ),
+        Tool(
+            name="superpose_models",
+            description="Superpose a list of models on the receptor chains of a reference structure with one batched Kabsch fit and return per-model RMSDs, transformation matrices and the commands applying them, plus a shared set_view for rendering every model from the same camera",
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "reference": {"type": "string", "description": "PDB ID or file path of the reference structure"},
+                    "models": {"type": "array", "items": {"type": "string"}, "description": "PDB IDs or file paths of the models to superpose"},
+                    "receptor_chains": {"type": "string", "description": "Receptor chains of the reference fitted on (e.g., A+B)"},
+                    "model_chains": {"type": "string", "description": "Matching receptor chains of the models, in the same order (default: receptor_chains)"},
+                    "atoms": {"type": "string", "enum": list(ATOM_SETS), "description": f"Atoms fitted, matched by residue number and atom name (default {DEFAULT_ATOM_SET})"}
+                },
+                "required": ["reference", "models", "receptor_chains"]
+            }
+        ),
+        Tool(
+            name="interface_occupancy",
+            description="Stream all models of an ensemble or the frames of a DCD trajectory and report per-residue receptor-ligand contact occupancy",
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "structure": {"type": "string", "description": "PDB ID or file path (topology, and the frames when no trajectory is given)"},
+                    "components": {"type": "string", "description": "Component definition (e.g., receptor:A+B+C,ligand:D+E)"},
+                    "trajectory": {"type": "string", "description": "Optional DCD or multi-model PDB/mmCIF file with the same atom order"},
+                    "cutoff": {"type": "number", "description": f"Contact distance cutoff in Angstrom (default {DEFAULT_CUTOFF})"},
+                    "skin": {"type": "number", "description": f"Neighbor list skin in Angstrom (default {DEFAULT_SKIN})"},
+                    "stride": {"type": "integer", "description": "Analyse every n-th frame (default 1)"},
+                    "max_frames": {"type": "integer", "description": "Stop after this many analysed frames"},
+                    "min_occupancy": {"type": "number", "description": f"Occupancy for a residue to enter the interface selections (default {DEFAULT_MIN_OCCUPANCY})"},
+                    "prefix": {"type": "string", "description": "Prefix of the receptor/ligand objects and the selections in the returned commands, keeping analyses in one PyMOL session apart (default: none)"}
+                },
+                "required": ["structure", "components"]
+            }
+        ),
+        Tool(
+            name="measure_distances",
+            description="Measure all distance_pairs against the structure coordinates in one pass, returns a distance table and one command line that draws every pair",
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "structure": {"type": "string", "description": "PDB ID or file path"},
+                    "distance_pairs": {"type": "string", "description": "Distance pairs (e.g., 57:CA-102:CA or A:57:CA-B:102:CA)"},
+                    "object": {"type": "string", "description": "PyMOL object to scope the drawn distances to (e.g., the structure object)"}
+                },
+                "required": ["structure", "distance_pairs"]
+            }
+        ),
+        Tool(
+            name="select_key_residues",
+            description="Compile key_residues into a minimal per-chain selection checked against the structure, returns missing residues and one command line that selects and displays them",
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "structure": {"type": "string", "description": "PDB ID or file path"},
+                    "key_residues": {"type": "string", "description": "Key residues (e.g., 57,102 or A:57,B:102 or A:10-45)"},
+                    "object": {"type": "string", "description": "PyMOL object to scope the selection to (e.g., the structure object)"}
+                },
+                "required": ["structure", "key_residues"]
+            }
+        ),
+        Tool(
+            name="render_scene",
+            description="Ray trace a scene in a headless PyMOL worker without blocking the interactive session, returns the PNG and session paths (cached renders are returned immediately)",
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "structure": {"type": "string", "description": "PDB ID or file path to load"},
+                    "object": {"type": "string", "description": "Object name for the loaded structure (default: PDB ID or file name)"},
+                    "commands": {"type": "array", "items": {"type": "string"}, "description": "PyMOL commands that build the scene after loading"},
+                    "view": {"type": "array", "items": {"type": "number"}, "description": "18-value view matrix from get_view"},
+                    "preset": {"type": "string", "enum": list(RENDER_PRESETS), "description": f"Render preset (default {DEFAULT_PRESET})"},
+                    "width": {"type": "integer", "description": "Image width in pixels (default 1200)"},
+                    "height": {"type": "integer", "description": "Image height in pixels (default 1200)"},
+                    "output": {"type": "string", "description": "PNG output path (default: server render cache)"},
+                    "input_session": {"type": "string", "description": "PyMOL session (.pse) to load as the scene instead of or before the structure"},
+                    "tiled": {"type": "boolean", "description": "Split the image into tiles ray traced in parallel across the render workers and stitch them (for poster-size images; uses an orthoscopic camera)"},
+                    "tiles": {"type": "integer", "description": "Number of tiles for a tiled render (default: one per render worker, more above 2048x2048 pixels per tile)"},
+                    "progressive": {"type": "boolean", "description": "Return a draft render sized by the level-of-detail policy immediately and finish the full-quality image in the background"},
+                    "background": {"type": "boolean", "description": "Return immediately with a final_job id, poll render_status for the image"},
+                    "arguments": {"type": "object", "description": "Template arguments of the analysis, part of the render cache key"},
+                    "selections": {"type": "object", "description": "Resolved selection sets by name, part of the render cache key"}
+                },
+                "anyOf": [{"required": ["structure"]}, {"required": ["input_session"]}]
+            }
+        ),
+        Tool(
+            name="render_status",
+            description="State of a background render started by render_scene, with the image path once done",
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "job": {"type": "string", "description": "final_job id returned by render_scene"}
+                },
+                "required": ["job"]
+            }
+        ),
+        Tool(
+            name="open_session",
+            description="Lease an isolated headless PyMOL process for one analysis, so concurrent analyses never share selections or objects. Optionally loads a structure into it",
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "structure": {"type": "string", "description": "Structure file path or PDB ID to load into the session"},
+                    "object": {"type": "string", "description": "Object name for the structure (default: file name)"}
+                }
+            }
+        ),
+        Tool(
+            name="session_command",
+            description="Run PyMOL commands in order in a session opened with open_session, returning the printed output (including errors) per command and the current objects and selections",
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "session": {"type": "string", "description": "Session id returned by open_session"},
+                    "commands": {"type": "array", "items": {"type": "string"}, "description": "PyMOL commands"}
+                },
+                "required": ["session", "commands"]
+            }
+        ),
+        Tool(
+            name="session_render",
+            description="Ray trace the current scene of a session to a PNG",
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "session": {"type": "string", "description": "Session id returned by open_session"},
+                    "preset": {"type": "string", "enum": list(RENDER_PRESETS), "description": f"Render preset (default {DEFAULT_PRESET})"},
+                    "width": {"type": "integer", "description": "Image width in pixels (default 1200)"},
+                    "height": {"type": "integer", "description": "Image height in pixels (default 1200)"},
+                    "output": {"type": "string", "description": "PNG output path (default: server session output directory)"}
+                },
+                "required": ["session"]
+            }
+        ),
+        Tool(
+            name="close_session",
+            description="End a session; its PyMOL process is reset and kept warm for the next open_session",
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "session": {"type": "string", "description": "Session id returned by open_session"}
+                },
+                "required": ["session"]
+            }
+        ),
+        Tool(
+            name="trace_phase",
+            description="Report the start of a workflow phase so its duration is recorded in the timing trace",
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "structure": {"type": "string", "description": "Structure being visualized"},
+                    "phase": {"type": "string", "description": "Phase number 1-7, 'paused' at the pause point or 'done' at the end"}
+                },
+                "required": ["structure", "phase"]
+            }
+        ),
+        Tool(
+            name="cache_stats",
+            description="Hit/miss statistics and occupancy of the server's structure caches",
+            inputSchema={"type": "object", "properties": {}}
         )
+    ]
+
+@server.call_tool()
+async def call_tool(name: str, arguments: dict | None = None) -> list[TextContent]:
+    """Run a server-side analysis tool, timed as a trace span"""
+    arguments = arguments or {}
+    with span(f"tool.{name}", structure=arguments.get("structure")):
+        return await run_tool(name, arguments)
+
+async def run_tool(name: str, arguments: dict) -> list[TextContent]:
+    if name == "continue_visualization":
+        template = arguments.get("template", "")
+        _, text = await build_prompt(template, 2, validate_arguments(template, arguments))
+        return [TextContent(type="text", text=text)]
+    
+    elif name == "find_interface":
+        structure = arguments.get("structure", "")
+        receptor_chains, ligand_chains = parse_components(arguments.get("components", ""))
+        cutoff = float(arguments.get("cutoff", DEFAULT_CUTOFF))
+        top_k = int(arguments.get("top_k", DEFAULT_TOP_K))
+        
+        def run():
+            receptor, ligand = split_chains(receptor_chains), split_chains(ligand_chains)
+            parsed = load_structure_chains(structure, receptor + ligand)
+            with span("interface.search", atoms=len(parsed)) as traced:
+                result = find_interface(parsed, receptor, ligand, cutoff=cutoff, top_k=top_k,
+                                        prefix=arguments.get("prefix", ""))
+                traced.set(contacts=result["contact_count"])
+            return result
+        
+        result = await asyncio.to_thread(run)
+        result["structure"] = structure
+        return [TextContent(type="text", text=json.dumps(result, indent=2))]
+    
+    elif name == "classify_interactions":
+        structure = arguments.get("structure", "")
+        receptor_chains, ligand_chains = parse_components(arguments.get("components", ""))
+        
+        def run():
+            receptor, ligand = split_chains(receptor_chains), split_chains(ligand_chains)
+            parsed = load_structure_chains(structure, receptor + ligand)
+            with span("interface.interactions", atoms=len(parsed)) as traced:
+                result = classify_interactions(parsed, receptor, ligand, arguments.get("prefix", ""))
+                traced.set(interactions=len(result["interactions"]))
+            return result
         
-        return GetPromptResult(
-            description=f"PyMOL receptor-ligand analysis: {structure}",
-            messages=[PromptMessage(role="user", content=TextContent(type="text", text=system_content))]
+        result = await asyncio.to_thread(run)
+        result["structure"] = structure
+        return [TextContent(type="text", text=json.dumps(result, indent=2))]
+    
+    elif name == "suggest_components":
+        structure = arguments.get("structure", "")
+        
+        def run():
+            parsed = load_structure(structure)
+            with span("interface.chain_contacts", atoms=len(parsed)) as traced:
+                result = chain_contacts(parsed, float(arguments.get("cutoff", DEFAULT_CUTOFF)))
+                result["suggestions"] = suggest_components(
+                    result, int(arguments.get("min_contacts", DEFAULT_MIN_CONTACTS)))
+                traced.set(chains=len(result["chains"]), pairs=len(result["pairs"]))
+            return result
+        
+        result = await asyncio.to_thread(run)
+        result["structure"] = structure
+        return [TextContent(type="text", text=json.dumps(result, indent=2))]
+    
+    elif name == "buried_surface":
+        structure = arguments.get("structure", "")
+        receptor_chains, ligand_chains = parse_components(arguments.get("components", ""))
+        
+        def run():
+            receptor, ligand = split_chains(receptor_chains), split_chains(ligand_chains)
+            parsed = load_structure_chains(structure, receptor + ligand)
+            with span("interface.sasa", atoms=len(parsed)) as traced:
+                result = buried_surface(
+                    parsed,
+                    receptor,
+                    ligand,
+                    n_points=int(arguments.get("points", DEFAULT_POINTS)),
+                    min_buried=float(arguments.get("min_buried", DEFAULT_MIN_BURIED)),
+                    prefix=arguments.get("prefix", "")
+                )
+                traced.set(buried=result["buried_surface_area"])
+            return result
+        
+        result = await asyncio.to_thread(run)
+        result["structure"] = structure
+        return [TextContent(type="text", text=json.dumps(result, indent=2))]
+    
+    elif name == "superpose_models":
+        reference = arguments.get("reference", "")
+        models = list(arguments.get("models") or [])
+        receptor = split_chains(arguments.get("receptor_chains", ""))
+        if not receptor:
+            raise ValueError("receptor_chains is required (e.g., A+B)")
+        
+        def run():
+            with span("superpose.batch", models=len(models)) as traced:
+                result = superpose_models(
+                    reference,
+                    models,
+                    receptor,
+                    split_chains(arguments.get("model_chains", "")) or None,
+                    arguments.get("atoms", DEFAULT_ATOM_SET)
+                )
+                traced.set(superposed=result["superposed"], failed=result["failed"])
+            return result
+        
+        result = await asyncio.to_thread(run)
+        return [TextContent(type="text", text=json.dumps(result, indent=2))]
+    
+    elif name == "interface_occupancy":
+        structure = arguments.get("structure", "")
+        receptor_chains, ligand_chains = parse_components(arguments.get("components", ""))
+        
+        def run():
+            parsed = load_structure(structure)
+            frames = iter_frames(resolve_structure_path(structure), arguments.get("trajectory"), len(parsed))
+            with span("interface.occupancy", atoms=len(parsed)) as traced:
+                result = interface_occupancy(
+                    parsed,
+                    frames,
+                    split_chains(receptor_chains),
+                    split_chains(ligand_chains),
+                    cutoff=float(arguments.get("cutoff", DEFAULT_CUTOFF)),
+                    skin=float(arguments.get("skin", DEFAULT_SKIN)),
+                    stride=max(1, int(arguments.get("stride", 1))),
+                    max_frames=int(arguments["max_frames"]) if arguments.get("max_frames") else None,
+                    min_occupancy=float(arguments.get("min_occupancy", DEFAULT_MIN_OCCUPANCY)),
+                    prefix=arguments.get("prefix", "")
+                )
+                traced.set(frames=result["frames"])
+            return result
+        
+        result = await asyncio.to_thread(run)
+        result["structure"] = structure
+        return [TextContent(type="text", text=json.dumps(result, indent=2))]
+    
+    elif name == "measure_distances":
+        structure = arguments.get("structure", "")
+        distance_pairs = arguments.get("distance_pairs", "")
+        
+        def run():
+            parsed = load_structure(structure)
+            with span("distances.measure", atoms=len(parsed)) as traced:
+                result = measure_distances(parsed, distance_pairs, arguments.get("object"))
+                traced.set(pairs=result["measured"])
+            return result
+        
+        result = await asyncio.to_thread(run)
+        result["structure"] = structure
+        return [TextContent(type="text", text=json.dumps(result, indent=2))]
+    
+    elif name == "select_key_residues":
+        structure = arguments.get("structure", "")
+        
+        def run():
+            parsed = load_structure(structure)
+            with span("residues.compile", atoms=len(parsed)) as traced:
+                result = compile_key_residues(arguments.get("key_residues", ""), parsed, arguments.get("object"))
+                traced.set(residues=result["residues"])
+            return result
+        
+        result = await asyncio.to_thread(run)
+        result["structure"] = structure
+        return [TextContent(type="text", text=json.dumps(result, indent=2))]
+    
+    elif name == "render_scene":
+        scene = {key: arguments[key] for key in
+                 ("input_session", "structure", "object", "commands", "view", "preset", "width", "height",
+                  "output", "arguments", "selections")
+                 if arguments.get(key) is not None}
+        pool = default_render_pool()
+        renderer = progressive_renderer()
+        if arguments.get("tiled") or arguments.get("tiles"):
+            scene["tiles"] = int(arguments.get("tiles") or tile_count(
+                int(scene.get("width", 1200)), int(scene.get("height", 1200)), pool.workers))
+        
+        if arguments.get("background"):
+            result = {"final_job": renderer.submit_final(scene), "status": "running"}
+        elif arguments.get("progressive") and scene.get("structure"):
+            atom_count = await asyncio.to_thread(structure_atom_count, scene["structure"])
+            result = await asyncio.to_thread(renderer.render, scene, atom_count)
+        else:
+            result = await asyncio.to_thread(final_render, scene)
+        result["pool"] = pool.summary()
+        return [TextContent(type="text", text=json.dumps(result, indent=2))]
+    
+    elif name == "render_status":
+        result = progressive_renderer().status(arguments.get("job", ""))
+        return [TextContent(type="text", text=json.dumps(result, indent=2))]
+    
+    elif name == "open_session":
+        sessions = default_session_pool()
+        session = await asyncio.to_thread(sessions.open)
+        result = {"session": session}
+        if arguments.get("structure"):
+            try:
+                result.update(await asyncio.to_thread(
+                    sessions.load, session, arguments["structure"], arguments.get("object")))
+            except Exception:
+                await asyncio.to_thread(sessions.close, session)
+                raise
+        result["sessions"] = sessions.summary()
+        return [TextContent(type="text", text=json.dumps(result, indent=2))]
+    
+    elif name == "session_command":
+        result = await asyncio.to_thread(
+            default_session_pool().run, arguments.get("session", ""), arguments.get("commands", []))
+        return [TextContent(type="text", text=json.dumps(result, indent=2))]
+    
+    elif name == "session_render":
+        result = await asyncio.to_thread(
+            default_session_pool().render,
+            arguments.get("session", ""),
+            int(arguments.get("width", 1200)),
+            int(arguments.get("height", 1200)),
+            arguments.get("preset", DEFAULT_PRESET),
+            arguments.get("output")
         )
+        return [TextContent(type="text", text=json.dumps(result, indent=2))]
+    
+    elif name == "close_session":
+        sessions = default_session_pool()
+        await asyncio.to_thread(sessions.close, arguments.get("session", ""))
+        result = {"closed": arguments.get("session"), "sessions": sessions.summary()}
+        return [TextContent(type="text", text=json.dumps(result, indent=2))]
+    
+    elif name == "trace_phase":
+        structure = arguments.get("structure", "")
+        phase = str(arguments.get("phase", ""))
+        next_span = None if phase == "done" else f"phase.{phase}"
+        ended = default_tracer().mark(object_name(structure), next_span, structure=structure)
+        result = {"tracing": default_tracer().enabled, "started": next_span, "ended": ended}
+        return [TextContent(type="text", text=json.dumps(result, indent=2))]
+    
+    elif name == "cache_stats":
+        stats = {
+            "fetch": default_fetch_cache().summary(),
+            "render": default_render_cache().summary(),
+            "structures": default_cache().stats(),
+            "chain_subsets": default_chain_loader().summary(),
+            "sessions": default_session_pool().summary()
+        }
+        return [TextContent(type="text", text=json.dumps(stats, indent=2))]
     
     else:
-        raise ValueError(f"Unknown prompt: {name}")
+        raise ValueError(f"Unknown tool: {name}")
+
+STRUCTURE_SCHEME = "structure://"
+SUMMARY_SUFFIX = "/summary"
+
+@server.list_resources()
+async def list_resources() -> list[Resource]:
+    """Timing trace of tool calls and workflow phases, and a summary of every loaded structure"""
+    resources = [
+        Resource(
+            uri="trace://spans",
+            name="Trace spans",
+            description="Most recent timing spans (tool calls, workflow phases, fetch, parsing, interface search, ray tracing) with atom counts and cache hits",
+            mimeType="application/json"
+        ),
+        Resource(
+            uri="trace://summary",
+            name="Trace summary",
+            description="Count, total, mean and max duration per span name",
+            mimeType="application/json"
+        )
+    ]
+    for digest, path in sorted(default_cache().loaded().items(), key=lambda item: item[1]):
+        resources.append(Resource(
+            uri=f"{STRUCTURE_SCHEME}{digest}{SUMMARY_SUFFIX}",
+            name=f"{os.path.basename(path)} summary",
+            description=f"Chains, residue ranges, numbering gaps, hetero groups, atom count and bounding box of {path}",
+            mimeType="application/json"
+        ))
+    return resources
+
+@server.list_resource_templates()
+async def list_resource_templates() -> list[ResourceTemplate]:
+    """Structure summaries by PDB ID, for structures not loaded yet"""
+    return [
+        ResourceTemplate(
+            uriTemplate=f"{STRUCTURE_SCHEME}{{structure}}{SUMMARY_SUFFIX}",
+            name="Structure summary",
+            description="Chains, residue ranges, numbering gaps, hetero groups, atom count and bounding box of a PDB ID (or the content digest of a loaded structure), read before choosing key_residues or components",
+            mimeType="application/json"
+        )
+    ]
+
+def structure_summary_resource(structure: str) -> dict:
+    """Summary of a loaded structure by content digest, or of a PDB ID loaded on first use"""
+    cache = default_cache()
+    path = cache.source(structure)
+    if path is not None:
+        summary = cache.summary(structure)
+    else:
+        path = resolve_structure_path(structure)
+        summary = load_structure_summary(path)
+    return {"structure": path, **summary}
+
+@server.read_resource()
+async def read_resource(uri) -> list[ReadResourceContents]:
+    """Serve the timing trace and structure summary resources"""
+    tracer = default_tracer()
+    uri = str(uri)
+    if uri == "trace://spans":
+        content = {"enabled": tracer.enabled, "spans": tracer.spans()}
+    elif uri == "trace://summary":
+        content = tracer.summary()
+    elif uri.startswith(STRUCTURE_SCHEME) and uri.endswith(SUMMARY_SUFFIX):
+        structure = uri[len(STRUCTURE_SCHEME):-len(SUMMARY_SUFFIX)]
+        with span("resource.structure_summary", structure=structure):
+            content = await asyncio.to_thread(structure_summary_resource, structure)
+    else:
+        raise ValueError(f"Unknown resource: {uri}")
+    return [ReadResourceContents(content=json.dumps(content, indent=2), mime_type="application/json")]
 
 async def main():
     """Start MCP server"""
+    # Warm the render workers in the background so the first render does not pay PyMOL startup
+    if pymol_available() and int(os.environ.get(WORKERS_ENV, "1")) > 0:
+        threading.Thread(target=default_render_pool().start, daemon=True).start()
+    
     async with stdio_server() as (read_stream, write_stream):
         await server.run(read_stream, write_stream, server.create_initialization_options())
 
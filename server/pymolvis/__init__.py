@@ -0,0 +1 @@
+"""Server-side structure analysis helpers for the PyMOL visualization server."""
@@ -0,0 +1,75 @@
+"""Validation of the analysis template arguments shared by prompts, tools and batch runs."""
+
+from .distances import parse_distance_pairs
+from .residues import parse_key_residues
+
+SINGLE_COMPONENT = "single_component_analysis"
+MULTI_COMPONENT = "multi_component_analysis"
+TEMPLATES = (SINGLE_COMPONENT, MULTI_COMPONENT)
+# Second-stage prompts (Phases 5-7, fetched after the pause point) are named <template>_continue
+CONTINUE_SUFFIX = "_continue"
+
+
+def parse_components(components: str) -> tuple[str, str]:
+    """Split a receptor:chains,ligand:chains definition into its chain lists"""
+    if not components:
+        raise ValueError("Multi-component analysis requires components parameter (the suggest_components tool proposes one)")
+
+    # Validate receptor and ligand format
+    if "receptor:" not in components or "ligand:" not in components:
+        raise ValueError("Component definition must use receptor:chains,ligand:chains format")
+
+    receptor_chains = ""
+    ligand_chains = ""
+
+    for comp_def in components.split(','):
+        if ':' in comp_def:
+            comp_name, chains = comp_def.split(':', 1)
+            comp_name = comp_name.strip()
+            if comp_name == "receptor":
+                receptor_chains = chains.strip()
+            elif comp_name == "ligand":
+                ligand_chains = chains.strip()
+
+    return receptor_chains, ligand_chains
+
+
+def split_chains(chains: str) -> list[str]:
+    """Chain list such as A+B+C as individual chain identifiers"""
+    return [chain.strip() for chain in chains.split('+') if chain.strip()]
+
+
+def split_prompt_name(name: str) -> tuple[str, int]:
+    """Template and stage of a prompt name: 1 for Phases 1-4, 2 for Phases 5-7"""
+    if name.endswith(CONTINUE_SUFFIX):
+        return name[: -len(CONTINUE_SUFFIX)], 2
+    return name, 1
+
+
+def validate_arguments(name: str, arguments: dict | None) -> dict:
+    """Check template arguments and return them normalized, raising ValueError on bad input"""
+    arguments = arguments or {}
+    values = {
+        "structure": (arguments.get("structure") or "").strip(),
+        "key_residues": (arguments.get("key_residues") or "").strip(),
+        "distance_pairs": (arguments.get("distance_pairs") or "").strip(),
+        "components": (arguments.get("components") or "").strip(),
+    }
+
+    if name not in TEMPLATES:
+        raise ValueError(f"Unknown prompt: {name}")
+    if not values["structure"]:
+        raise ValueError("Analysis requires structure parameter")
+
+    if name == SINGLE_COMPONENT:
+        if not values["key_residues"]:
+            raise ValueError("Single component analysis requires key_residues parameter")
+    else:
+        values["receptor_chains"], values["ligand_chains"] = parse_components(values["components"])
+
+    if values["key_residues"]:
+        parse_key_residues(values["key_residues"])
+    if values["distance_pairs"]:
+        parse_distance_pairs(values["distance_pairs"])
+
+    return values
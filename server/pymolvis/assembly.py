@@ -0,0 +1,141 @@
+"""Chain-by-chain contact screening of multi-chain assemblies and component suggestions."""
+
+import numpy as np
+
+from .interface import DEFAULT_CUTOFF
+from .spatial import CellGrid
+from .structure import WATER_RESIDUES, Structure
+
+DEFAULT_MIN_CONTACTS = 10
+DEFAULT_SUGGESTIONS = 3
+
+# Query atoms per grid pass block, bounds the temporary pair arrays
+_ATOM_BLOCK = 65536
+
+
+def chain_contacts(structure: Structure, cutoff: float = DEFAULT_CUTOFF) -> dict:
+    """Atom contacts and interface residue counts of every chain pair, from one grid pass over all atoms"""
+    atoms = np.nonzero(~np.isin(structure.resn_codes, structure.codes_for("resn_table", WATER_RESIDUES)))[0]
+    coords = structure.coords[atoms]
+    chains = structure.chain_codes[atoms].astype(np.int64)
+    residue_of, first_atoms = structure.residue_index()
+    residues = residue_of[atoms].astype(np.int64)
+    n_chains, n_residues = len(structure.chain_table), len(first_atoms)
+
+    grid = CellGrid(coords, cutoff)
+    pair_keys, residue_keys = [], []
+    for start in range(0, len(atoms), _ATOM_BLOCK):
+        i, j, _ = grid.query(coords[start:start + _ATOM_BLOCK], cutoff)
+        i += start
+        # Each cross-chain contact once, lower chain code first
+        keep = chains[i] < chains[j]
+        i, j = i[keep], j[keep]
+        pair = chains[i] * n_chains + chains[j]
+        pair_keys.append(pair)
+        residue_keys.append(np.unique(np.concatenate([pair * n_residues + residues[i], pair * n_residues + residues[j]])))
+
+    atom_counts = np.bincount(chains, minlength=n_chains)
+    present = np.flatnonzero(atom_counts)
+    result = {
+        "cutoff": cutoff,
+        "atom_count": int(len(atoms)),
+        "chains": {structure.chain_table[code]: int(atom_counts[code]) for code in present.tolist()},
+        "pairs": [],
+    }
+    if not pair_keys or not sum(len(keys) for keys in pair_keys):
+        return result
+
+    pairs, contacts = np.unique(np.concatenate(pair_keys), return_counts=True)
+    residue_keys = np.unique(np.concatenate(residue_keys))
+    residue_pairs = residue_keys // n_residues
+    # Interface residues of the lower-coded chain of the pair, the rest belong to the other chain
+    residue_chains = structure.chain_codes[first_atoms[residue_keys % n_residues]]
+    first_side = np.searchsorted(pairs, residue_pairs[residue_chains == residue_pairs // n_chains])
+    both_sides = np.searchsorted(pairs, residue_pairs)
+    first_counts = np.bincount(first_side, minlength=len(pairs))
+    second_counts = np.bincount(both_sides, minlength=len(pairs)) - first_counts
+
+    order = np.argsort(-contacts, kind="stable")
+    for position in order.tolist():
+        first, second = divmod(int(pairs[position]), n_chains)
+        first, second = structure.chain_table[first], structure.chain_table[second]
+        result["pairs"].append({
+            "chains": [first, second],
+            "contacts": int(contacts[position]),
+            "residues": {first: int(first_counts[position]), second: int(second_counts[position])},
+        })
+    return result
+
+
+def _find(parent: dict, chain: str) -> str:
+    while parent[chain] != chain:
+        parent[chain] = parent[parent[chain]]
+        chain = parent[chain]
+    return chain
+
+
+def _groups(chains, edges) -> list[list[str]]:
+    """Connected groups of chains joined by the given (first, second) edges"""
+    parent = {chain: chain for chain in chains}
+    for first, second in edges:
+        parent[_find(parent, first)] = _find(parent, second)
+    groups = {}
+    for chain in chains:
+        groups.setdefault(_find(parent, chain), []).append(chain)
+    return list(groups.values())
+
+
+def _suggestion(receptor: list[str], ligand: list[str], atoms: dict, contacts: dict, reason: str) -> dict:
+    # The larger group is the receptor
+    if sum(atoms[chain] for chain in ligand) > sum(atoms[chain] for chain in receptor):
+        receptor, ligand = ligand, receptor
+    receptor_set, ligand_set = set(receptor), set(ligand)
+    crossing = sum(count for (first, second), count in contacts.items()
+                   if (first in receptor_set and second in ligand_set) or (first in ligand_set and second in receptor_set))
+    return {
+        "components": f"receptor:{'+'.join(receptor)},ligand:{'+'.join(ligand)}",
+        "receptor_chains": receptor,
+        "ligand_chains": ligand,
+        "interface_contacts": crossing,
+        "reason": reason,
+    }
+
+
+def suggest_components(screen: dict, min_contacts: int = DEFAULT_MIN_CONTACTS,
+                       limit: int = DEFAULT_SUGGESTIONS) -> list[dict]:
+    """Receptor/ligand splits for multi_component_analysis, from a chain_contacts screen
+
+    Chains are joined along a maximum spanning tree of the contact graph (pairs with
+    fewer than min_contacts contacts are ignored); cutting its weakest links separates
+    tightly packed chain groups along their weakest interface. The largest single
+    chain-chain interfaces follow.
+    """
+    atoms = screen["chains"]
+    contacts = {tuple(pair["chains"]): pair["contacts"] for pair in screen["pairs"]
+                if pair["contacts"] >= min_contacts}
+
+    # Kruskal on descending contact counts
+    parent = {chain: chain for chain in atoms}
+    tree = []
+    for (first, second), count in sorted(contacts.items(), key=lambda item: -item[1]):
+        root_first, root_second = _find(parent, first), _find(parent, second)
+        if root_first != root_second:
+            parent[root_first] = root_second
+            tree.append(((first, second), count))
+
+    suggestions, seen = [], set()
+
+    def add(receptor, ligand, reason):
+        key = frozenset([frozenset(receptor), frozenset(ligand)])
+        if key not in seen and len(suggestions) < 2 * limit:
+            seen.add(key)
+            suggestions.append(_suggestion(receptor, ligand, atoms, contacts, reason))
+
+    for cut, count in sorted(tree, key=lambda item: item[1])[:limit]:
+        kept = [edge for edge, _ in tree if edge != cut]
+        component = next(group for group in _groups(atoms, [edge for edge, _ in tree]) if cut[0] in group)
+        sides = _groups(component, [edge for edge in kept if edge[0] in component])
+        add(*sides, f"weakest link ({count} contacts) between tightly packed chain groups")
+    for (first, second), count in sorted(contacts.items(), key=lambda item: -item[1])[:limit]:
+        add([first], [second], f"chain pair interface with {count} contacts")
+    return suggestions
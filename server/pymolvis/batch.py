@@ -0,0 +1,231 @@
+"""Batch analysis of many structures from a manifest using a pool of headless PyMOL workers.
+
+Usage:
+    python -m pymolvis.batch manifest.jsonl --output results.jsonl [--workers 8] [--no-render]
+
+The manifest is CSV (with a header row) or JSONL with the columns structure,
+components, key_residues and distance_pairs. Rows with components run the
+multi-component analysis, other rows the single-component analysis.
+"""
+
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+
+from .arguments import (
+    MULTI_COMPONENT,
+    SINGLE_COMPONENT,
+    split_chains,
+    validate_arguments,
+)
+from .distances import measure_distances
+from .fetch import resolve_structure_path
+from .interface import find_interface
+from .presets import apply_preset
+from .render_pool import init_worker, object_name, worker_cmd
+from .residues import compile_key_residues
+from .structure_cache import load_structure
+
+MANIFEST_FIELDS = ("structure", "components", "key_residues", "distance_pairs")
+
+def read_manifest(path: str) -> list[dict]:
+    """Rows of a CSV or JSONL manifest"""
+    with open(path, newline="") as handle:
+        if path.lower().endswith((".jsonl", ".json")):
+            rows = [json.loads(line) for line in handle if line.strip()]
+        else:
+            rows = list(csv.DictReader(handle))
+    return [{field: (row.get(field) or "").strip() for field in MANIFEST_FIELDS} for row in rows]
+
+
+def template_for(row: dict) -> str:
+    return MULTI_COMPONENT if row.get("components") else SINGLE_COMPONENT
+
+
+def _render(values: dict, template: str, path: str, interface: dict | None, key_residues: dict | None,
+            distances: dict | None, image_path: str, width: int, height: int) -> None:
+    cmd = worker_cmd()
+    name = object_name(values["structure"])
+    cmd.reinitialize()
+    cmd.load(path, name)
+    cmd.remove("solvent")
+    cmd.bg_color("white")
+    cmd.set("ray_opaque_background", 1)
+    cmd.hide("everything")
+    cmd.show("cartoon", name)
+
+    if template == MULTI_COMPONENT:
+        cmd.create("receptor", f"{name} and chain {'+'.join(split_chains(values['receptor_chains']))}")
+        cmd.create("ligand", f"{name} and chain {'+'.join(split_chains(values['ligand_chains']))}")
+        cmd.disable(name)
+        cmd.color("marine", "receptor")
+        cmd.color("orange", "ligand")
+        for command in interface["commands"]:
+            cmd.do(command, echo=0)
+        cmd.show("sticks", "receptor_interface or ligand_interface")
+        cmd.util.cbaw("receptor_interface or ligand_interface", _self=cmd)
+        cmd.color("cyan", "receptor_interface and elem C")
+        cmd.color("lightorange", "ligand_interface and elem C")
+        cmd.hide("labels")
+    if key_residues:
+        cmd.select("key_residues", key_residues["selection"])
+        cmd.show("sticks", "key_residues")
+        cmd.util.cbaw("key_residues", _self=cmd)
+        if template == SINGLE_COMPONENT:
+            cmd.spectrum("count", "white_gray70", f"{name} and name ca and not key_residues")
+
+    if distances and distances["script"]:
+        cmd.do(distances["script"], echo=0)
+
+    apply_preset(cmd)
+    cmd.orient()
+    cmd.png(image_path, width=width, height=height, ray=1)
+
+
+def analyse(index: int, row: dict, image_dir: str | None, width: int, height: int) -> dict:
+    """Analyse and optionally render one manifest row, never raises"""
+    started = time.perf_counter()
+    record = {"index": index, "structure": row.get("structure", "")}
+    try:
+        template = template_for(row)
+        values = validate_arguments(template, row)
+        record["template"] = template
+        path = resolve_structure_path(values["structure"])
+
+        structure = load_structure(path)
+        interface = None
+        if template == MULTI_COMPONENT:
+            interface = find_interface(
+                structure,
+                split_chains(values["receptor_chains"]),
+                split_chains(values["ligand_chains"]),
+            )
+            record["interface"] = {
+                key: interface[key] for key in
+                ("contact_count", "closest_pairs", "receptor_interface", "ligand_interface")
+            }
+
+        key_residues = None
+        if values["key_residues"]:
+            # Multi-component renders hide the loaded object behind the receptor and ligand copies
+            scope = "(receptor or ligand)" if template == MULTI_COMPONENT else object_name(values["structure"])
+            key_residues = compile_key_residues(values["key_residues"], structure, scope)
+            record["key_residues"] = {key: key_residues[key] for key in ("selection", "missing_count", "missing")}
+
+        distances = None
+        if values["distance_pairs"]:
+            distances = measure_distances(structure, values["distance_pairs"], object_name(values["structure"]))
+            record["distances"] = distances["distances"]
+
+        if image_dir:
+            image_path = os.path.join(image_dir, f"{index:05d}_{object_name(values['structure'])}.png")
+            _render(values, template, path, interface, key_residues, distances, image_path, width, height)
+            record["image"] = image_path
+        record["status"] = "ok"
+    except Exception as error:
+        record["status"] = "error"
+        record["error"] = f"{type(error).__name__}: {error}"
+    record["seconds"] = round(time.perf_counter() - started, 3)
+    return record
+
+
+def _lost_row(index: int, row: dict) -> dict:
+    return {"index": index, "structure": row["structure"], "status": "error",
+            "error": "BrokenProcessPool: worker process died while analysing this row"}
+
+
+def run_batch(manifest: str, output: str, workers: int | None = None, image_dir: str | None = None,
+              width: int = 1200, height: int = 1200) -> dict:
+    """Run every manifest row in a process pool, appending results to output as they finish
+
+    A dying worker breaks the pool and loses every unfinished row. The rows that
+    were handed to workers are then rerun one at a time, so the one that crashes
+    is recorded as an error, and the rest continue in a fresh pool.
+    """
+    rows = read_manifest(manifest)
+    if image_dir:
+        os.makedirs(image_dir, exist_ok=True)
+    size = workers or os.cpu_count() or 1
+
+    started = time.perf_counter()
+    counts = {"ok": 0, "error": 0}
+    restarts = 0
+    pending = list(range(len(rows)))
+    with open(output, "w") as out:
+        def write(record: dict) -> None:
+            counts[record["status"]] += 1
+            out.write(json.dumps(record) + "\n")
+            out.flush()
+
+        while pending:
+            lost = []
+            with ProcessPoolExecutor(max_workers=size, initializer=init_worker) as pool:
+                futures = {pool.submit(analyse, index, rows[index], image_dir, width, height): index
+                           for index in pending}
+                for future in as_completed(futures):
+                    try:
+                        write(future.result())
+                    except BrokenProcessPool:
+                        lost.append(futures[future])
+            if not lost:
+                break
+            restarts += 1
+            # Rows are dispatched in order and at most size + 1 ahead, later ones never reached a worker
+            lost.sort()
+            suspects, pending = lost[:size + 1], lost[size + 1:]
+            isolated = None
+            for index in suspects:
+                if isolated is None:
+                    isolated = ProcessPoolExecutor(max_workers=1, initializer=init_worker)
+                try:
+                    write(isolated.submit(analyse, index, rows[index], image_dir, width, height).result())
+                except BrokenProcessPool:
+                    write(_lost_row(index, rows[index]))
+                    isolated.shutdown()
+                    isolated = None
+                    restarts += 1
+            if isolated is not None:
+                isolated.shutdown()
+    elapsed = time.perf_counter() - started
+
+    return {
+        "structures": len(rows),
+        "succeeded": counts["ok"],
+        "failed": counts["error"],
+        "pool_restarts": restarts,
+        "seconds": round(elapsed, 3),
+        "structures_per_second": round(len(rows) / elapsed, 3) if elapsed > 0 else None,
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Batch PyMOL visualization analysis")
+    parser.add_argument("manifest", help="CSV or JSONL manifest")
+    parser.add_argument("-o", "--output", required=True, help="Output JSONL with one result per structure")
+    parser.add_argument("-j", "--workers", type=int, default=None, help="Worker processes (default: CPU count)")
+    parser.add_argument("--image-dir", help="Directory for rendered images (default: <output>_images)")
+    parser.add_argument("--no-render", action="store_true", help="Only run the analysis, skip ray tracing")
+    parser.add_argument("--width", type=int, default=1200)
+    parser.add_argument("--height", type=int, default=1200)
+    args = parser.parse_args(argv)
+
+    image_dir = None
+    if not args.no_render:
+        image_dir = args.image_dir or os.path.splitext(args.output)[0] + "_images"
+
+    summary = run_batch(args.manifest, args.output, args.workers, image_dir, args.width, args.height)
+    print(
+        f"{summary['structures']} structures ({summary['succeeded']} ok, {summary['failed']} failed) "
+        f"in {summary['seconds']} s: {summary['structures_per_second']} structures/s",
+        file=sys.stderr,
+    )
+    return 0 if not summary["failed"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
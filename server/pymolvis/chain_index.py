@@ -0,0 +1,258 @@
+"""Byte-offset index of chains and residues for loading parts of very large structure files."""
+
+import os
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+
+from .structure import (
+    CIF_SUFFIXES,
+    Structure,
+    _atom_site_columns,
+    _Builder,
+    _cif_tokens,
+    _cif_value,
+    cif_atom,
+    open_text,
+    pdb_atom,
+)
+from .tracing import span
+
+LAZY_BYTES_ENV = "PYMOL_VIS_LAZY_BYTES"
+DEFAULT_LAZY_BYTES = 64 * 1024 ** 2
+SUBSET_BYTES_ENV = "PYMOL_VIS_CHAIN_SUBSET_BYTES"
+DEFAULT_SUBSET_BYTES = 512 * 1024 ** 2
+
+
+@dataclass
+class ChainEntry:
+    """Byte spans and residue start offsets of one chain in the first model"""
+
+    spans: list = field(default_factory=list)      # [start, end) byte ranges of consecutive atom lines
+    residues: list = field(default_factory=list)   # (resi, byte offset of the residue's first line)
+    atom_count: int = 0
+
+
+@dataclass
+class ChainIndex:
+    """Chain/residue offset index of a PDB or mmCIF file built in one scan"""
+
+    path: str
+    cif_columns: list | None
+    chains: dict[str, ChainEntry]
+
+    @property
+    def atom_count(self) -> int:
+        return sum(entry.atom_count for entry in self.chains.values())
+
+    def summary(self) -> dict:
+        return {
+            chain: {"atoms": entry.atom_count, "residues": len(entry.residues)}
+            for chain, entry in self.chains.items()
+        }
+
+
+def build_chain_index(path: str) -> ChainIndex:
+    """Scan an uncompressed file once, recording where each chain and residue starts"""
+    if path.endswith(".gz"):
+        raise ValueError("Chain offset index needs an uncompressed file")
+    is_cif = path.lower().endswith(CIF_SUFFIXES)
+    chains = {}
+    columns = []
+    c = None
+    first_model = None
+    current = None  # (chain, span start)
+    last_residue = None
+    offset = 0
+
+    with open(path, "rb") as handle:
+        for raw in handle:
+            start, offset = offset, offset + len(raw)
+            if is_cif:
+                if raw.startswith(b"_atom_site."):
+                    columns.append(raw.split()[0][len(b"_atom_site."):].decode())
+                    continue
+                if not columns or not raw.strip():
+                    continue
+                if raw.startswith((b"loop_", b"_", b"#", b"data_")):
+                    break
+                row = _cif_tokens(raw.decode(errors="replace"))
+                if len(row) < len(columns):
+                    continue
+                if c is None:
+                    c = _atom_site_columns(columns)
+                    first_model = _cif_value(row, c["model"], "1")
+                if _cif_value(row, c["model"], "1") != first_model:
+                    break
+                chain = _cif_value(row, c["chain"])
+                resi = _cif_value(row, c["seq"]) + _cif_value(row, c["ins"])
+            else:
+                record = raw[:6]
+                if record == b"ENDMDL":
+                    break
+                if record != b"ATOM  " and record != b"HETATM":
+                    if current:
+                        chains[current[0]].spans.append((current[1], start))
+                        current = None
+                    continue
+                chain = raw[21:22].decode().strip()
+                resi = raw[22:27].decode().strip()
+
+            entry = chains.setdefault(chain, ChainEntry())
+            if current is None or current[0] != chain:
+                if current:
+                    chains[current[0]].spans.append((current[1], start))
+                current = (chain, start)
+            if last_residue != (chain, resi):
+                entry.residues.append((resi, start))
+                last_residue = (chain, resi)
+            entry.atom_count += 1
+
+    if current:
+        chains[current[0]].spans.append((current[1], offset))
+    return ChainIndex(path=path, cif_columns=columns if is_cif else None, chains=chains)
+
+
+def load_chains(index: ChainIndex, chains) -> Structure:
+    """Materialize only the atoms of the given chains by seeking to their byte spans"""
+    builder = _Builder()
+    c = _atom_site_columns(index.cif_columns) if index.cif_columns is not None else None
+    spans = sorted(span for chain in chains if chain in index.chains for span in index.chains[chain].spans)
+    with open(index.path, "rb") as handle:
+        for start, end in spans:
+            handle.seek(start)
+            for raw in handle.read(end - start).splitlines():
+                line = raw.decode(errors="replace")
+                if c is not None:
+                    row = _cif_tokens(line)
+                    atom = cif_atom(row, c) if len(row) >= len(index.cif_columns) else None
+                else:
+                    atom = pdb_atom(line)
+                if atom:
+                    builder.add(*atom)
+    return builder.build()
+
+
+def stream_chains(path: str, chains) -> Structure:
+    """Materialize the given chains in one filtered pass, for files that cannot be seeked"""
+    wanted = set(chains)
+    builder = _Builder()
+    is_cif = path.lower().endswith(CIF_SUFFIXES)
+    columns = []
+    c = None
+    first_model = None
+    with open_text(path) as handle:
+        for line in handle:
+            if is_cif:
+                if line.startswith("_atom_site."):
+                    columns.append(line.split()[0][len("_atom_site."):])
+                    continue
+                if not columns or not line.strip():
+                    continue
+                if line.startswith(("loop_", "_", "#", "data_")):
+                    break
+                row = _cif_tokens(line)
+                if len(row) < len(columns):
+                    continue
+                if c is None:
+                    c = _atom_site_columns(columns)
+                    first_model = _cif_value(row, c["model"], "1")
+                if _cif_value(row, c["model"], "1") != first_model:
+                    break
+                atom = cif_atom(row, c) if _cif_value(row, c["chain"]) in wanted else None
+            else:
+                if line[:6] == "ENDMDL":
+                    break
+                atom = pdb_atom(line) if line[21:22].strip() in wanted else None
+            if atom:
+                builder.add(*atom)
+    return builder.build()
+
+
+def structure_bytes(structure: Structure) -> int:
+    """Memory held by the per-atom arrays of a structure"""
+    return sum(array.nbytes for array in structure.arrays().values())
+
+
+class LazyChainLoader:
+    """Per-file chain indexes, and chain subsets kept in memory up to a byte budget
+
+    Subsets are evicted least recently used first; the one just loaded is always
+    kept, even when it alone exceeds the budget.
+    """
+
+    def __init__(self, max_bytes: int = DEFAULT_SUBSET_BYTES):
+        self.max_bytes = max_bytes
+        self.stats = {"hits": 0, "misses": 0, "evictions": 0}
+        self._indexes = {}
+        self._subsets = OrderedDict()
+        self._subset_bytes = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _stat_key(path: str) -> tuple:
+        stat = os.stat(path)
+        return os.path.realpath(path), stat.st_size, stat.st_mtime_ns
+
+    def index(self, path: str) -> ChainIndex:
+        key = self._stat_key(path)
+        with self._lock:
+            index = self._indexes.get(key)
+        if index is None:
+            index = build_chain_index(path)
+            with self._lock:
+                self._indexes[key] = index
+        return index
+
+    def load(self, path: str, chains) -> Structure:
+        """Structure holding only the given chains"""
+        key = (self._stat_key(path), tuple(sorted(set(chains))))
+        with self._lock:
+            structure = self._subsets.get(key)
+            if structure is not None:
+                self._subsets.move_to_end(key)
+                self.stats["hits"] += 1
+                return structure
+            self.stats["misses"] += 1
+        with span("structure.load_chains", file=os.path.basename(path), chains=",".join(key[1])) as traced:
+            if path.endswith(".gz"):
+                structure = stream_chains(path, chains)
+            else:
+                structure = load_chains(self.index(path), chains)
+            traced.set(atoms=len(structure))
+        with self._lock:
+            if key not in self._subsets:
+                self._subsets[key] = structure
+                self._subset_bytes += structure_bytes(structure)
+                self._evict()
+        return structure
+
+    def _evict(self) -> None:
+        """Drop least recently used subsets until the held bytes fit the budget"""
+        while self._subset_bytes > self.max_bytes and len(self._subsets) > 1:
+            _, structure = self._subsets.popitem(last=False)
+            self._subset_bytes -= structure_bytes(structure)
+            self.stats["evictions"] += 1
+
+    def summary(self) -> dict:
+        """Hit/miss counters and occupancy of the subset cache"""
+        with self._lock:
+            stats = dict(self.stats)
+            stats.update(subsets=len(self._subsets), bytes_held=self._subset_bytes, max_bytes=self.max_bytes)
+        return stats
+
+
+_default_loader = None
+
+
+def lazy_threshold() -> int:
+    """File size above which tools load only the chains they need"""
+    return int(os.environ.get(LAZY_BYTES_ENV, DEFAULT_LAZY_BYTES))
+
+
+def default_chain_loader() -> LazyChainLoader:
+    """Process-wide chain loader with the configured subset budget"""
+    global _default_loader
+    if _default_loader is None:
+        _default_loader = LazyChainLoader(int(os.environ.get(SUBSET_BYTES_ENV, DEFAULT_SUBSET_BYTES)))
+    return _default_loader
@@ -0,0 +1,21 @@
+"""Environment-driven settings shared by the analysis helpers."""
+
+import os
+
+CACHE_DIR_ENV = "PYMOL_VIS_CACHE_DIR"
+
+
+def cache_root() -> str:
+    """Root directory for all on-disk caches"""
+    root = os.environ.get(CACHE_DIR_ENV) or os.path.join(
+        os.path.expanduser("~"), ".cache", "pymol-visualizer"
+    )
+    os.makedirs(root, exist_ok=True)
+    return root
+
+
+def cache_dir(name: str) -> str:
+    """Named subdirectory of the cache root"""
+    path = os.path.join(cache_root(), name)
+    os.makedirs(path, exist_ok=True)
+    return path
@@ -0,0 +1,152 @@
+"""Parsing and vectorized measurement of distance_pairs such as 57:CA-102:CA or A:57:CA-B:102:CA."""
+
+import re
+from dataclasses import dataclass
+
+import numpy as np
+
+from .interface import atom_selection
+from .structure import Structure
+
+_END = r"(?:([A-Za-z0-9]{1,4}):)?(-?\d+[A-Za-z]?):([A-Za-z0-9'\"*]{1,4})"
+_PAIR = re.compile(rf"^\s*{_END}\s*-\s*{_END}\s*$")
+
+
+@dataclass(frozen=True)
+class AtomRef:
+    """One end of a distance pair, chain is None when not qualified"""
+
+    chain: str | None
+    resi: str
+    name: str
+
+    def __str__(self) -> str:
+        prefix = f"{self.chain}:" if self.chain else ""
+        return f"{prefix}{self.resi}:{self.name}"
+
+
+def parse_distance_pairs(distance_pairs: str) -> list[tuple[AtomRef, AtomRef]]:
+    """Parse comma-separated pairs, raising ValueError on the first malformed entry"""
+    pairs = []
+    for item in distance_pairs.split(','):
+        if not item.strip():
+            continue
+        match = _PAIR.match(item)
+        if not match:
+            raise ValueError(
+                f"Invalid distance pair '{item.strip()}' (expected RESI:ATOM-RESI:ATOM or CHAIN:RESI:ATOM-CHAIN:RESI:ATOM)"
+            )
+        chain1, resi1, name1, chain2, resi2, name2 = match.groups()
+        pairs.append((AtomRef(chain1, resi1, name1), AtomRef(chain2, resi2, name2)))
+    return pairs
+
+
+class AtomIndex:
+    """Sorted composite atom keys for resolving many atom references at once"""
+
+    def __init__(self, structure: Structure):
+        self.structure = structure
+        self.lookup = {
+            table: {value: code for code, value in enumerate(getattr(structure, table))}
+            for table in ("chain_table", "resi_table", "name_table")
+        }
+        self.n_resi = len(structure.resi_table)
+        self.n_name = len(structure.name_table)
+
+        # (resi, name) keys for chain-less references and (chain, resi, name) keys for qualified ones
+        residue_atom = structure.resi_codes.astype(np.int64) * self.n_name + structure.name_codes
+        chain_atom = structure.chain_codes.astype(np.int64) * (self.n_resi * self.n_name) + residue_atom
+        self.residue_order = np.argsort(residue_atom, kind="stable")
+        self.residue_keys = residue_atom[self.residue_order]
+        self.chain_order = np.argsort(chain_atom, kind="stable")
+        self.chain_keys = chain_atom[self.chain_order]
+
+    def _codes(self, table: str, values) -> np.ndarray:
+        lookup = self.lookup[table]
+        return np.array([lookup.get(value, -1) if value is not None else -1 for value in values], dtype=np.int64)
+
+    def resolve(self, refs: list[AtomRef]) -> tuple[np.ndarray, list[str | None]]:
+        """Atom index per reference (-1 when unresolved) and an error message per reference"""
+        chains = self._codes("chain_table", [ref.chain for ref in refs])
+        resis = self._codes("resi_table", [ref.resi for ref in refs])
+        names = self._codes("name_table", [ref.name for ref in refs])
+        qualified = np.array([ref.chain is not None for ref in refs], dtype=bool)
+        known = (resis >= 0) & (names >= 0) & (~qualified | (chains >= 0))
+        residue_atom = resis * self.n_name + names
+        indices = np.full(len(refs), -1, dtype=np.int64)
+
+        # Chain-qualified references match at most one atom
+        chain_atom = chains * (self.n_resi * self.n_name) + residue_atom
+        pos = np.searchsorted(self.chain_keys, chain_atom)
+        pos = np.minimum(pos, len(self.chain_keys) - 1)
+        hit = known & qualified & (self.chain_keys[pos] == chain_atom)
+        indices[hit] = self.chain_order[pos[hit]]
+
+        # Chain-less references must be unique across chains
+        lo = np.searchsorted(self.residue_keys, residue_atom, side="left")
+        hi = np.searchsorted(self.residue_keys, residue_atom, side="right")
+        unique = known & ~qualified & (hi - lo == 1)
+        indices[unique] = self.residue_order[lo[unique]]
+
+        errors = [None] * len(refs)
+        for position in np.nonzero(indices < 0)[0]:
+            ref = refs[position]
+            if known[position] and not qualified[position] and hi[position] - lo[position] > 1:
+                candidates = self.residue_order[lo[position]:hi[position]]
+                found = "/".join(sorted({self.structure.chain_table[c] for c in self.structure.chain_codes[candidates]}))
+                errors[position] = f"Atom {ref} is ambiguous across chains {found}, qualify it as CHAIN:{ref}"
+            else:
+                errors[position] = f"No atom {ref} in structure"
+        return indices, errors
+
+
+def measure_distances(structure: Structure, distance_pairs: str, object_name: str | None = None) -> dict:
+    """Resolve all pairs against the structure arrays and measure them in one pass
+
+    With object_name the selections are scoped to that object and the distance
+    objects are named after it, so measurements of different structures in one
+    PyMOL session stay apart.
+    """
+    pairs = parse_distance_pairs(distance_pairs)
+    if not pairs:
+        raise ValueError("No distance pairs given")
+    if not len(structure):
+        raise ValueError("Structure has no atoms")
+
+    index = AtomIndex(structure)
+    refs = [ref for pair in pairs for ref in pair]
+    atoms, errors = index.resolve(refs)
+    atoms = atoms.reshape(-1, 2)
+
+    resolved = np.all(atoms >= 0, axis=1)
+    distances = np.full(len(pairs), np.nan, dtype=np.float64)
+    if resolved.any():
+        delta = structure.coords[atoms[resolved, 0]] - structure.coords[atoms[resolved, 1]]
+        distances[resolved] = np.sqrt(np.einsum("ij,ij->i", delta, delta))
+
+    prefix = f"{object_name}_" if object_name else ""
+    table = []
+    commands = []
+    for number, ((first, second), (i, j)) in enumerate(zip(pairs, atoms), start=1):
+        row = {"pair": f"{first}-{second}"}
+        pair_errors = [error for error in errors[2 * number - 2:2 * number] if error]
+        if pair_errors:
+            row["error"] = "; ".join(pair_errors)
+        else:
+            row["atom1"] = structure.atom(i)
+            row["atom2"] = structure.atom(j)
+            row["distance"] = round(float(distances[number - 1]), 3)
+            row["name"] = f"{prefix}dist_{number}"
+            commands.append(
+                f"distance {row['name']}, {atom_selection(row['atom1'], object_name)}, "
+                f"{atom_selection(row['atom2'], object_name)}"
+            )
+        table.append(row)
+
+    return {
+        "measured": int(resolved.sum()),
+        "failed": int(len(pairs) - resolved.sum()),
+        "distances": table,
+        "commands": commands,
+        "script": "; ".join(commands),
+    }
@@ -0,0 +1,256 @@
+"""PDB entry resolution through a local mirror and a size-bounded download cache."""
+
+import hashlib
+import json
+import os
+import re
+import shutil
+import tempfile
+import threading
+import time
+import urllib.request
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows: index updates are not serialized across processes
+    fcntl = None
+
+from .config import cache_dir
+from .tracing import span
+
+PDB_ID_PATTERN = re.compile(r"^[0-9][A-Za-z0-9]{3}$")
+DEFAULT_REMOTE_URL = "https://files.rcsb.org/download/{pdb_id}.cif.gz"
+DEFAULT_MAX_BYTES = 2 * 1024 ** 3
+DEFAULT_TIMEOUT = 30.0
+# Hits refresh an entry's last access at most this often, so reads rarely rewrite the index
+ACCESS_RESOLUTION = 60.0
+
+MIRROR_ENV = "PYMOL_VIS_PDB_MIRROR"
+REMOTE_URL_ENV = "PYMOL_VIS_PDB_URL"
+MAX_BYTES_ENV = "PYMOL_VIS_FETCH_CACHE_BYTES"
+TIMEOUT_ENV = "PYMOL_VIS_FETCH_TIMEOUT"
+
+# File names probed in a mirror directory, flat and wwPDB divided layouts
+MIRROR_PATTERNS = (
+    "{pdb_id}.cif.gz", "{pdb_id}.cif", "{pdb_id}.pdb.gz", "{pdb_id}.pdb",
+    "{middle}/{pdb_id}.cif.gz", "{middle}/pdb{pdb_id}.ent.gz",
+    "mmCIF/{middle}/{pdb_id}.cif.gz", "pdb/{middle}/pdb{pdb_id}.ent.gz",
+)
+
+
+def is_pdb_id(structure: str) -> bool:
+    """True for a 4-character PDB ID that is not an existing local file"""
+    structure = structure.strip()
+    return bool(PDB_ID_PATTERN.match(structure)) and not os.path.isfile(structure)
+
+
+def _suffix(url: str) -> str:
+    name = url.rsplit("/", 1)[-1].lower()
+    for suffix in (".cif.gz", ".pdb.gz", ".ent.gz", ".cif", ".pdb", ".ent"):
+        if name.endswith(suffix):
+            return suffix.replace(".ent", ".pdb")
+    return ".cif"
+
+
+class FetchCache:
+    """Content-addressed cache of downloaded entries with LRU eviction by byte budget
+
+    The index is shared by every process using the directory: it is re-read and
+    written back under a file lock, so concurrent workers never drop each other's
+    entries.
+    """
+
+    def __init__(self, directory: str, max_bytes: int = DEFAULT_MAX_BYTES,
+                 mirror_dir: str | None = None, remote_url: str = DEFAULT_REMOTE_URL,
+                 timeout: float = DEFAULT_TIMEOUT):
+        self.directory = directory
+        self.objects_dir = os.path.join(directory, "objects")
+        self.index_path = os.path.join(directory, "index.json")
+        self.max_bytes = max_bytes
+        self.mirror_dir = mirror_dir
+        self.remote_url = remote_url
+        self.timeout = timeout
+        self.stats = {"hits": 0, "misses": 0, "mirror_hits": 0, "evictions": 0}
+        self._lock = threading.Lock()
+        os.makedirs(self.objects_dir, exist_ok=True)
+        self._index = self._read_index()
+
+    def _read_index(self) -> dict:
+        try:
+            with open(self.index_path) as handle:
+                return json.load(handle)
+        except (OSError, ValueError):
+            return {}
+
+    def _write_index(self) -> None:
+        fd, partial = tempfile.mkstemp(dir=self.directory, suffix=".part")
+        with os.fdopen(fd, "w") as handle:
+            json.dump(self._index, handle)
+        os.replace(partial, self.index_path)
+
+    @contextmanager
+    def _locked_index(self, write: bool = True):
+        """Current index of all processes under an exclusive lock, written back when write is set"""
+        with self._lock, open(self.index_path + ".lock", "a") as lock:
+            if fcntl:
+                fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                self._index = self._read_index()
+                yield self._index
+                if write:
+                    self._write_index()
+            finally:
+                if fcntl:
+                    fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def _object_path(self, entry: dict) -> str:
+        return os.path.join(self.objects_dir, entry["digest"] + entry["suffix"])
+
+    def find_in_mirror(self, pdb_id: str) -> str | None:
+        """Path of the entry in the local mirror, if present"""
+        if not self.mirror_dir:
+            return None
+        for pattern in MIRROR_PATTERNS:
+            path = os.path.join(self.mirror_dir, pattern.format(pdb_id=pdb_id, middle=pdb_id[1:3]))
+            if os.path.isfile(path):
+                return path
+        return None
+
+    def resolve(self, pdb_id: str) -> str:
+        """Local file for a PDB ID: mirror first, then cache, then download"""
+        pdb_id = pdb_id.strip().lower()
+        mirrored = self.find_in_mirror(pdb_id)
+        if mirrored:
+            with self._lock:
+                self.stats["mirror_hits"] += 1
+            return mirrored
+
+        entry = self._read_index().get(pdb_id)
+        if entry and os.path.isfile(self._object_path(entry)):
+            now = time.time()
+            if now - entry["last_access"] > ACCESS_RESOLUTION:
+                with self._locked_index() as index:
+                    if pdb_id in index:
+                        index[pdb_id]["last_access"] = now
+            with self._lock:
+                self.stats["hits"] += 1
+            return self._object_path(entry)
+        with self._lock:
+            self.stats["misses"] += 1
+
+        with span("fetch.download", pdb_id=pdb_id) as traced:
+            path = self._download(pdb_id)
+            traced.set(bytes=os.path.getsize(path))
+        return path
+
+    def _download(self, pdb_id: str) -> str:
+        url = self.remote_url.format(pdb_id=pdb_id)
+        fd, partial = tempfile.mkstemp(dir=self.objects_dir, suffix=".part")
+        digest = hashlib.sha256()
+        try:
+            with os.fdopen(fd, "wb") as handle, urllib.request.urlopen(url, timeout=self.timeout) as response:
+                for block in iter(lambda: response.read(1 << 20), b""):
+                    digest.update(block)
+                    handle.write(block)
+            entry = {
+                "digest": digest.hexdigest(),
+                "suffix": _suffix(url),
+                "size": os.path.getsize(partial),
+                "last_access": time.time(),
+            }
+            path = self._object_path(entry)
+            # Objects appear and join the index together, so eviction never sees one unindexed
+            with self._locked_index() as index:
+                os.replace(partial, path)
+                index[pdb_id] = entry
+                self._evict(keep=entry["digest"])
+        except BaseException:
+            if os.path.exists(partial):
+                os.unlink(partial)
+            raise
+        return path
+
+    def _stored_objects(self) -> dict[str, dict]:
+        objects = {}
+        for entry in self._index.values():
+            objects.setdefault(entry["digest"], entry)
+        return objects
+
+    def _evict(self, keep: str | None = None) -> None:
+        """Drop unindexed objects, then least recently used entries until the stored bytes fit the budget"""
+        indexed = {os.path.basename(self._object_path(entry)) for entry in self._index.values()}
+        for name in os.listdir(self.objects_dir):
+            if name not in indexed and not name.endswith(".part"):
+                try:
+                    os.unlink(os.path.join(self.objects_dir, name))
+                except FileNotFoundError:
+                    pass
+        objects = self._stored_objects()
+        total = sum(entry["size"] for entry in objects.values())
+        for pdb_id, entry in sorted(self._index.items(), key=lambda item: item[1]["last_access"]):
+            if total <= self.max_bytes:
+                break
+            if entry["digest"] == keep:
+                continue
+            del self._index[pdb_id]
+            self.stats["evictions"] += 1
+            # Identical content may be shared by several IDs
+            if not any(other["digest"] == entry["digest"] for other in self._index.values()):
+                total -= entry["size"]
+                try:
+                    os.unlink(self._object_path(entry))
+                except FileNotFoundError:
+                    pass
+
+    def bytes_stored(self) -> int:
+        with self._locked_index(write=False):
+            return sum(entry["size"] for entry in self._stored_objects().values())
+
+    def summary(self) -> dict:
+        """Hit/miss counters and occupancy"""
+        with self._locked_index(write=False) as index:
+            stats = dict(self.stats)
+            entries = len(index)
+        lookups = stats["hits"] + stats["misses"] + stats["mirror_hits"]
+        stats.update({
+            "entries": entries,
+            "bytes_stored": self.bytes_stored(),
+            "max_bytes": self.max_bytes,
+            "hit_rate": round((stats["hits"] + stats["mirror_hits"]) / lookups, 4) if lookups else None,
+            "mirror_dir": self.mirror_dir,
+        })
+        return stats
+
+    def clear(self) -> None:
+        with self._locked_index() as index:
+            index.clear()
+            shutil.rmtree(self.objects_dir, ignore_errors=True)
+            os.makedirs(self.objects_dir, exist_ok=True)
+
+
+_default_cache = None
+
+
+def default_fetch_cache() -> FetchCache:
+    """Process-wide fetch cache configured from the environment"""
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = FetchCache(
+            cache_dir("pdb"),
+            max_bytes=int(os.environ.get(MAX_BYTES_ENV, DEFAULT_MAX_BYTES)),
+            mirror_dir=os.environ.get(MIRROR_ENV) or None,
+            remote_url=os.environ.get(REMOTE_URL_ENV, DEFAULT_REMOTE_URL),
+            timeout=float(os.environ.get(TIMEOUT_ENV, DEFAULT_TIMEOUT)),
+        )
+    return _default_cache
+
+
+def resolve_structure_path(structure: str) -> str:
+    """Map the prompt's structure argument (file path or PDB ID) to a local file"""
+    structure = structure.strip()
+    if os.path.isfile(structure):
+        return structure
+    if not PDB_ID_PATTERN.match(structure):
+        raise ValueError(f"Structure not found: {structure} (expected a file path or 4-character PDB ID)")
+    return default_fetch_cache().resolve(structure)
@@ -0,0 +1,278 @@
+"""Vectorized classification of receptor-ligand interface contacts into interaction types."""
+
+import numpy as np
+
+from .interface import atom_selection
+from .spatial import CellGrid
+from .structure import Structure
+
+HBOND_DISTANCE = 3.5
+HBOND_MIN_ANGLE = 90.0
+SALT_BRIDGE_DISTANCE = 4.0
+HYDROPHOBIC_DISTANCE = 4.0
+PI_STACKING_DISTANCE = 5.5
+PI_STACKING_OFFSET = 2.0
+PI_PARALLEL_ANGLE = 30.0
+PI_T_SHAPED_ANGLE = 60.0
+CATION_PI_DISTANCE = 6.0
+BOND_DISTANCE = 1.9
+
+AMINO_ACIDS = frozenset({
+    "ALA", "ARG", "ASN", "ASP", "CYS", "GLN", "GLU", "GLY", "HIS", "ILE",
+    "LEU", "LYS", "MET", "PHE", "PRO", "SER", "THR", "TRP", "TYR", "VAL", "MSE",
+})
+_SIDE_CHAIN_DONORS = {
+    "ARG": {"NE", "NH1", "NH2"}, "ASN": {"ND2"}, "GLN": {"NE2"}, "HIS": {"ND1", "NE2"}, "LYS": {"NZ"},
+    "SER": {"OG"}, "THR": {"OG1"}, "TYR": {"OH"}, "TRP": {"NE1"}, "CYS": {"SG"},
+}
+_SIDE_CHAIN_ACCEPTORS = {
+    "ASP": {"OD1", "OD2"}, "GLU": {"OE1", "OE2"}, "ASN": {"OD1"}, "GLN": {"OE1"}, "HIS": {"ND1", "NE2"},
+    "SER": {"OG"}, "THR": {"OG1"}, "TYR": {"OH"}, "MET": {"SD"},
+}
+# Backbone N (except proline) donates, backbone O and the C-terminal OXT accept
+DONORS = {resn: ({"N"} if resn != "PRO" else set()) | _SIDE_CHAIN_DONORS.get(resn, set()) for resn in AMINO_ACIDS}
+ACCEPTORS = {resn: {"O", "OXT"} | _SIDE_CHAIN_ACCEPTORS.get(resn, set()) for resn in AMINO_ACIDS}
+CATIONS = {"LYS": {"NZ"}, "ARG": {"NE", "NH1", "NH2"}, "HIS": {"ND1", "NE2"}}
+ANIONS = {"ASP": {"OD1", "OD2"}, "GLU": {"OE1", "OE2"}}
+# Charge centres facing aromatic rings in cation-pi contacts
+CATION_CENTRES = {"LYS": {"NZ"}, "ARG": {"CZ"}}
+HYDROPHOBIC_RESIDUES = frozenset({"ALA", "VAL", "LEU", "ILE", "MET", "MSE", "PHE", "TRP", "PRO", "TYR", "CYS"})
+RINGS = {
+    "PHE": ("CG", "CD1", "CD2", "CE1", "CE2", "CZ"),
+    "TYR": ("CG", "CD1", "CD2", "CE1", "CE2", "CZ"),
+    "TRP": ("CD2", "CE2", "CE3", "CZ2", "CZ3", "CH2"),
+    "HIS": ("CG", "ND1", "CD2", "CE1", "NE2"),
+}
+# Three ring atoms spanning the ring plane, for its normal
+RING_PLANES = {
+    "PHE": ("CG", "CE1", "CE2"),
+    "TYR": ("CG", "CE1", "CE2"),
+    "TRP": ("CD2", "CZ2", "CZ3"),
+    "HIS": ("CG", "CE1", "NE2"),
+}
+INTERACTION_COLORS = {
+    "hydrogen_bond": "yellow",
+    "salt_bridge": "magenta",
+    "hydrophobic": "gray50",
+    "pi_stacking": "green",
+    "cation_pi": "orange",
+}
+HYDROGENS = frozenset({"H", "D"})
+
+
+def _atom_mask(structure: Structure, atoms: np.ndarray, names_by_resn: dict) -> np.ndarray:
+    """Atoms whose residue name and atom name are listed in names_by_resn"""
+    allowed = np.zeros((len(structure.resn_table), len(structure.name_table)), dtype=bool)
+    name_codes = {name: code for code, name in enumerate(structure.name_table)}
+    for resn_code, resn in enumerate(structure.resn_table):
+        codes = [name_codes[name] for name in names_by_resn.get(resn, ()) if name in name_codes]
+        allowed[resn_code, codes] = True
+    return allowed[structure.resn_codes[atoms], structure.name_codes[atoms]]
+
+
+def _first_per_key(keys: np.ndarray, distances: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Position of the shortest distance for each distinct key, and how many entries share it"""
+    order = np.lexsort((distances, keys))
+    firsts = np.flatnonzero(np.concatenate(([True], keys[order][1:] != keys[order][:-1])))
+    counts = np.diff(np.concatenate((firsts, [len(order)])))
+    return order[firsts], counts
+
+
+def _antecedents(coords: np.ndarray, residues: np.ndarray, positions: np.ndarray) -> np.ndarray:
+    """Coordinates of the closest bonded atom of the same residue, NaN where there is none"""
+    found = np.full((len(coords), 3), np.nan, dtype=np.float32)
+    if not len(positions):
+        return found
+    query, neighbor, distances = CellGrid(coords, BOND_DISTANCE).query(coords[positions])
+    keep = (positions[query] != neighbor) & (residues[positions[query]] == residues[neighbor])
+    query, neighbor, distances = query[keep], neighbor[keep], distances[keep]
+    if len(query):
+        closest, _ = _first_per_key(query, distances)
+        found[positions[query[closest]]] = coords[neighbor[closest]]
+    return found
+
+
+def _angle_ok(apex: np.ndarray, toward: np.ndarray, antecedent: np.ndarray) -> np.ndarray:
+    """Angle antecedent-apex-toward of at least HBOND_MIN_ANGLE, true when the antecedent is unknown"""
+    first, second = antecedent - apex, toward - apex
+    cosine = np.einsum("ij,ij->i", first, second) / (
+        np.linalg.norm(first, axis=1) * np.linalg.norm(second, axis=1))
+    return np.isnan(cosine) | (cosine <= np.cos(np.radians(HBOND_MIN_ANGLE)))
+
+
+def _rings(structure: Structure, atoms: np.ndarray, residues: np.ndarray) -> dict:
+    """Centroid, unit normal and first atom position of every complete aromatic ring"""
+    positions = np.flatnonzero(_atom_mask(structure, atoms, RINGS))
+    ring_residues, first, inverse, counts = np.unique(residues[positions], return_index=True,
+                                                      return_inverse=True, return_counts=True)
+    first = positions[first]
+    expected = np.array([len(RINGS.get(resn, ())) for resn in structure.resn_table])
+    complete = counts == expected[structure.resn_codes[atoms[first]]]
+
+    coords = structure.coords[atoms]
+    centroids = np.stack([np.bincount(inverse, weights=coords[positions, axis], minlength=len(ring_residues))
+                          for axis in range(3)], axis=1) / np.maximum(counts, 1)[:, None]
+    plane = []
+    for slot in range(3):
+        members = np.flatnonzero(_atom_mask(structure, atoms, {resn: {names[slot]} for resn, names in RING_PLANES.items()}))
+        corner = np.zeros((len(ring_residues), 3))
+        slots = np.searchsorted(ring_residues, residues[members])
+        corner[slots] = coords[members]
+        plane.append(corner)
+    normals = np.cross(plane[1] - plane[0], plane[2] - plane[0])
+    lengths = np.linalg.norm(normals, axis=1)
+    complete &= lengths > 1e-6
+    return {
+        "centroids": centroids[complete],
+        "normals": (normals[complete] / np.where(lengths > 1e-6, lengths, 1)[complete, None]),
+        "atoms": first[complete],
+    }
+
+
+def classify_interactions(structure: Structure, receptor_chains, ligand_chains, prefix: str = "") -> dict:
+    """Hydrogen bonds, salt bridges, hydrophobic, pi stacking and cation-pi contacts across an interface
+
+    prefix goes in front of the object names in the commands, as in find_interface.
+    """
+    receptor_chains = list(receptor_chains)
+    ligand_chains = list(ligand_chains)
+    heavy = ~np.isin(structure.element_codes, structure.codes_for("element_table", HYDROGENS))
+    receptor_idx = structure.select_chains(receptor_chains)
+    ligand_idx = structure.select_chains(ligand_chains)
+    receptor_idx, ligand_idx = receptor_idx[heavy[receptor_idx]], ligand_idx[heavy[ligand_idx]]
+    if not len(receptor_idx):
+        raise ValueError(f"No receptor atoms found on chains {'+'.join(receptor_chains)}")
+    if not len(ligand_idx):
+        raise ValueError(f"No ligand atoms found on chains {'+'.join(ligand_chains)}")
+
+    atoms = np.concatenate([receptor_idx, ligand_idx])
+    n_receptor = len(receptor_idx)
+    coords = structure.coords[atoms]
+    residue_of, first_atoms = structure.residue_index()
+    residues = residue_of[atoms].astype(np.int64)
+
+    # Non-amino-acid groups (cofactors, small molecules) have no templates: N and O both donate and accept
+    hetero = ~np.isin(structure.resn_codes[atoms], structure.codes_for("resn_table", AMINO_ACIDS))
+    element = np.char.upper(structure.decode("element_codes", atoms))
+    polar = hetero & np.isin(element, ("N", "O"))
+    donor = _atom_mask(structure, atoms, DONORS) | polar
+    acceptor = _atom_mask(structure, atoms, ACCEPTORS) | polar
+    cation = _atom_mask(structure, atoms, CATIONS)
+    anion = _atom_mask(structure, atoms, ANIONS)
+    side_chain = ~np.isin(structure.name_codes[atoms], structure.codes_for("name_table", ("C", "CA")))
+    hydrophobic_residue = np.isin(structure.resn_codes[atoms], structure.codes_for("resn_table", HYDROPHOBIC_RESIDUES))
+    hydrophobic = (element == "C") & ((side_chain & hydrophobic_residue) | hetero)
+
+    # One grid pass over every receptor-ligand atom pair within the longest atom-atom cutoff
+    cutoff = max(HBOND_DISTANCE, SALT_BRIDGE_DISTANCE, HYDROPHOBIC_DISTANCE)
+    rec, lig, distances = CellGrid(coords[n_receptor:], cutoff).query(coords[:n_receptor], cutoff)
+    lig = lig + n_receptor
+    found = {kind: [] for kind in INTERACTION_COLORS}
+
+    # Hydrogen bonds: donor-acceptor distance and both antecedent angles, in either direction
+    close = distances <= HBOND_DISTANCE
+    forward = close & donor[rec] & acceptor[lig]
+    backward = close & acceptor[rec] & donor[lig]
+    polar_pairs = forward | backward
+    antecedent = _antecedents(coords, residues, np.unique(np.concatenate([rec[polar_pairs], lig[polar_pairs]])))
+    forward &= (_angle_ok(coords[rec], coords[lig], antecedent[rec])
+                & _angle_ok(coords[lig], coords[rec], antecedent[lig]))
+    backward &= (_angle_ok(coords[lig], coords[rec], antecedent[lig])
+                 & _angle_ok(coords[rec], coords[lig], antecedent[rec]))
+    for position in np.flatnonzero(forward | backward).tolist():
+        found["hydrogen_bond"].append((rec[position], lig[position], distances[position], {
+            "donor": "receptor" if forward[position] else "ligand"}))
+
+    # Salt bridges and hydrophobic contacts, one per residue pair at its closest atoms
+    residue_pairs = residues[rec] * len(first_atoms) + residues[lig]
+    charged = (distances <= SALT_BRIDGE_DISTANCE) & ((cation[rec] & anion[lig]) | (anion[rec] & cation[lig]))
+    apolar = (distances <= HYDROPHOBIC_DISTANCE) & hydrophobic[rec] & hydrophobic[lig]
+    for kind, mask in (("salt_bridge", charged), ("hydrophobic", apolar)):
+        selected = np.flatnonzero(mask)
+        if not len(selected):
+            continue
+        closest, counts = _first_per_key(residue_pairs[selected], distances[selected])
+        for position, count in zip(selected[closest].tolist(), counts.tolist()):
+            extra = {"contacts": count} if kind == "hydrophobic" else {}
+            found[kind].append((rec[position], lig[position], distances[position], extra))
+
+    # Pi stacking between ring centroids, cation-pi between charge centres and centroids
+    rings = _rings(structure, atoms, residues)
+    receptor_rings = rings["atoms"] < n_receptor
+    pseudo = {}
+    centres = np.flatnonzero(_atom_mask(structure, atoms, CATION_CENTRES))
+
+    def ring_grid(mask):
+        return CellGrid(rings["centroids"][mask], CATION_PI_DISTANCE), np.flatnonzero(mask)
+
+    if receptor_rings.any() and (~receptor_rings).any():
+        grid, ligand_rings = ring_grid(~receptor_rings)
+        first, second, ring_distances = grid.query(rings["centroids"][receptor_rings], PI_STACKING_DISTANCE)
+        first, second = np.flatnonzero(receptor_rings)[first], ligand_rings[second]
+        normals, centroids = rings["normals"], rings["centroids"]
+        angles = np.degrees(np.arccos(np.clip(np.abs(np.einsum("ij,ij->i", normals[first], normals[second])), 0, 1)))
+        between = centroids[second] - centroids[first]
+        offsets = np.minimum(
+            np.linalg.norm(between - np.einsum("ij,ij->i", between, normals[first])[:, None] * normals[first], axis=1),
+            np.linalg.norm(between - np.einsum("ij,ij->i", between, normals[second])[:, None] * normals[second], axis=1))
+        parallel = angles <= PI_PARALLEL_ANGLE
+        stacked = (offsets <= PI_STACKING_OFFSET) & (parallel | (angles >= PI_T_SHAPED_ANGLE))
+        for position in np.flatnonzero(stacked).tolist():
+            found["pi_stacking"].append((("ring", first[position]), ("ring", second[position]),
+                                         ring_distances[position], {
+                                             "geometry": "parallel" if parallel[position] else "t-shaped",
+                                             "angle": round(float(angles[position]), 1),
+                                             "offset": round(float(offsets[position]), 2)}))
+    for centre_side, ring_side in ((centres[centres < n_receptor], ~receptor_rings),
+                                   (centres[centres >= n_receptor], receptor_rings)):
+        if not len(centre_side) or not ring_side.any():
+            continue
+        grid, ring_positions = ring_grid(ring_side)
+        first, second, ring_distances = grid.query(coords[centre_side], CATION_PI_DISTANCE)
+        for centre, ring, distance in zip(centre_side[first].tolist(), ring_positions[second].tolist(),
+                                          ring_distances.tolist()):
+            if centre < n_receptor:
+                found["cation_pi"].append((centre, ("ring", ring), distance, {"cation": "receptor"}))
+            else:
+                found["cation_pi"].append((("ring", ring), centre, distance, {"cation": "ligand"}))
+
+    def describe(end) -> tuple[dict, str]:
+        if isinstance(end, tuple):
+            ring = end[1]
+            atom = structure.atom(atoms[rings["atoms"][ring]])
+            del atom["name"]
+            atom["ring"] = True
+            if ring not in pseudo:
+                pseudo[ring] = len(pseudo) + 1
+            return atom, f"{prefix}interaction_centroids and resi {pseudo[ring]}"
+        owner = prefix + ("receptor" if end < n_receptor else "ligand")
+        atom = structure.atom(atoms[end])
+        return atom, atom_selection(atom, owner)
+
+    table, drawing = [], []
+    for kind, rows in found.items():
+        for receptor_end, ligand_end, distance, extra in rows:
+            receptor_atom, receptor_selection = describe(receptor_end)
+            ligand_atom, ligand_selection = describe(ligand_end)
+            table.append({"type": kind, "receptor": receptor_atom, "ligand": ligand_atom,
+                          "distance": round(float(distance), 2), **extra})
+            drawing.append(f"distance {prefix}interaction_{kind}, {receptor_selection}, {ligand_selection}")
+
+    commands = [f"pseudoatom {prefix}interaction_centroids, resi={number}, pos=[{x:.3f}, {y:.3f}, {z:.3f}]"
+                for ring, number in pseudo.items() for x, y, z in [rings["centroids"][ring].tolist()]]
+    if pseudo:
+        commands.append(f"hide everything, {prefix}interaction_centroids")
+    commands += drawing
+    for kind, rows in found.items():
+        if rows:
+            commands += [f"set dash_color, {INTERACTION_COLORS[kind]}, {prefix}interaction_{kind}",
+                         f"hide labels, {prefix}interaction_{kind}"]
+    return {
+        "receptor_chains": receptor_chains,
+        "ligand_chains": ligand_chains,
+        "counts": {kind: len(rows) for kind, rows in found.items()},
+        "colors": INTERACTION_COLORS,
+        "interactions": table,
+        "commands": commands,
+        "script": "; ".join(commands),
+    }
@@ -0,0 +1,112 @@
+"""Receptor-ligand interface detection on coordinate arrays."""
+
+import numpy as np
+
+from .spatial import CellGrid
+from .structure import Structure
+
+DEFAULT_CUTOFF = 4.0
+DEFAULT_TOP_K = 10
+
+
+def chain_selection(chain: str) -> str:
+    """PyMOL chain clause, chain "" for atoms without a chain identifier"""
+    return f"chain {chain}" if chain else 'chain ""'
+
+
+def atom_selection(atom: dict, object_name: str | None = None) -> str:
+    """PyMOL selection for a single atom record"""
+    selection = f"{chain_selection(atom['chain'])} and resi {atom['resi']} and name {atom['name']}"
+    return f"{object_name} and {selection}" if object_name else selection
+
+
+def unique_residues(structure: Structure, indices: np.ndarray) -> list[dict]:
+    """Distinct residues touched by the given atoms, in file order"""
+    indices = np.asarray(indices)
+    keys = structure.chain_codes[indices].astype(np.int64) * len(structure.resi_table)
+    keys += structure.resi_codes[indices]
+    _, first = np.unique(keys, return_index=True)
+    residues = []
+    for index in np.sort(indices[first]):
+        atom = structure.atom(index)
+        del atom["name"]
+        residues.append(atom)
+    return residues
+
+
+def residue_selection(residues: list[dict], object_name: str | None = None) -> str:
+    """Chain-qualified PyMOL selection covering the given residues"""
+    by_chain = {}
+    for residue in residues:
+        by_chain.setdefault(residue["chain"], []).append(residue["resi"])
+    if not by_chain:
+        return "none"
+    clauses = [f"({chain_selection(chain)} and resi {'+'.join(resis)})" for chain, resis in by_chain.items()]
+    selection = " or ".join(clauses)
+    return f"{object_name} and ({selection})" if object_name else selection
+
+
+def interface_selections(receptor_residues: list[dict], ligand_residues: list[dict], prefix: str = "") -> list[str]:
+    """select commands creating the receptor and ligand interface selections, scoped to the component objects"""
+    return [
+        f"select {prefix}receptor_interface, {residue_selection(receptor_residues, prefix + 'receptor')}",
+        f"select {prefix}ligand_interface, {residue_selection(ligand_residues, prefix + 'ligand')}",
+    ]
+
+
+def find_interface(structure: Structure, receptor_chains, ligand_chains,
+                   cutoff: float = DEFAULT_CUTOFF, top_k: int = DEFAULT_TOP_K, prefix: str = "") -> dict:
+    """Find receptor-ligand atom contacts within cutoff using a cell grid
+
+    prefix goes in front of every object and selection name in the commands, so
+    analyses sharing one PyMOL session do not overwrite each other's selections.
+    """
+    receptor_chains = list(receptor_chains)
+    ligand_chains = list(ligand_chains)
+    receptor_idx = structure.select_chains(receptor_chains)
+    ligand_idx = structure.select_chains(ligand_chains)
+    if not len(receptor_idx):
+        raise ValueError(f"No receptor atoms found on chains {'+'.join(receptor_chains)}")
+    if not len(ligand_idx):
+        raise ValueError(f"No ligand atoms found on chains {'+'.join(ligand_chains)}")
+
+    grid = CellGrid(structure.coords[ligand_idx], cutoff)
+    rec_hits, lig_hits, distances = grid.query(structure.coords[receptor_idx], cutoff)
+    rec_atoms = receptor_idx[rec_hits]
+    lig_atoms = ligand_idx[lig_hits]
+
+    # Only the k smallest distances need ordering
+    k = min(top_k, len(distances))
+    closest = np.argpartition(distances, k - 1)[:k] if k else np.empty(0, dtype=np.int64)
+    closest = closest[np.argsort(distances[closest], kind="stable")]
+
+    pairs = []
+    for position in closest:
+        pairs.append({
+            "receptor": structure.atom(rec_atoms[position]),
+            "ligand": structure.atom(lig_atoms[position]),
+            "distance": round(float(distances[position]), 3),
+        })
+
+    receptor_interface = unique_residues(structure, np.unique(rec_atoms))
+    ligand_interface = unique_residues(structure, np.unique(lig_atoms))
+
+    commands = interface_selections(receptor_interface, ligand_interface, prefix)
+    for number, pair in enumerate(pairs, start=1):
+        commands.append(
+            f"distance {prefix}interface_dist_{number}, "
+            f"{atom_selection(pair['receptor'], prefix + 'receptor')}, {atom_selection(pair['ligand'], prefix + 'ligand')}"
+        )
+
+    return {
+        "cutoff": cutoff,
+        "receptor_chains": receptor_chains,
+        "ligand_chains": ligand_chains,
+        "receptor_atom_count": int(len(receptor_idx)),
+        "ligand_atom_count": int(len(ligand_idx)),
+        "contact_count": int(len(distances)),
+        "closest_pairs": pairs,
+        "receptor_interface": receptor_interface,
+        "ligand_interface": ligand_interface,
+        "commands": commands,
+    }
@@ -0,0 +1,129 @@
+"""Level-of-detail policy: draft first image for large scenes, full-quality render in the background."""
+
+import json
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from .presets import DEFAULT_PRESET
+
+POLICY_ENV = "PYMOL_VIS_LOD_POLICY"
+DEFAULT_WIDTH = 1200
+DEFAULT_HEIGHT = 1200
+# Finished background renders stay queryable this long, then render_status forgets them
+JOB_TTL = 3600.0
+
+# First matching tier wins; None means unbounded. A tier without draft renders at full quality directly.
+# draft.scale shrinks the image, draft.ray=False uses OpenGL (draw) in the interactive session.
+DEFAULT_POLICY = [
+    {"max_atoms": 10000, "max_pixels": 4000000, "draft": None},
+    {"max_atoms": 100000, "max_pixels": None, "draft": {"preset": "draft", "scale": 0.5, "ray": True}},
+    {"max_atoms": None, "max_pixels": None, "draft": {"preset": "draft", "scale": 0.33, "ray": False}},
+]
+
+
+def load_policy() -> list[dict]:
+    """Policy table from the JSON file named by PYMOL_VIS_LOD_POLICY, or the default"""
+    path = os.environ.get(POLICY_ENV)
+    if not path:
+        return DEFAULT_POLICY
+    with open(path) as handle:
+        policy = json.load(handle)
+    if not isinstance(policy, list) or not policy:
+        raise ValueError(f"{path}: render policy must be a non-empty list of tiers")
+    return policy
+
+
+def choose_tier(atom_count: int, width: int = DEFAULT_WIDTH, height: int = DEFAULT_HEIGHT,
+                policy: list[dict] | None = None) -> dict:
+    """First tier whose atom and pixel limits admit the scene"""
+    policy = policy or load_policy()
+    pixels = width * height
+    for tier in policy:
+        if tier.get("max_atoms") is not None and atom_count > tier["max_atoms"]:
+            continue
+        if tier.get("max_pixels") is not None and pixels > tier["max_pixels"]:
+            continue
+        return tier
+    return policy[-1]
+
+
+def draft_size(tier: dict, width: int, height: int) -> tuple[int, int]:
+    scale = float(tier["draft"].get("scale", 0.5))
+    return max(64, int(width * scale)), max(64, int(height * scale))
+
+
+def draft_render_command(tier: dict, width: int = DEFAULT_WIDTH, height: int = DEFAULT_HEIGHT) -> str:
+    """ray or draw command producing the draft image in an interactive session"""
+    draft_width, draft_height = draft_size(tier, width, height)
+    verb = "ray" if tier["draft"].get("ray", True) else "draw"
+    return f"{verb} {draft_width}, {draft_height}"
+
+
+class ProgressiveRenderer:
+    """Returns a draft render immediately and finishes the full-quality render in the background"""
+
+    def __init__(self, render_draft, render_final, max_background: int = 2, job_ttl: float = JOB_TTL):
+        # render_draft(scene) and render_final(scene) both return a result dict with an image path
+        self.render_draft = render_draft
+        self.render_final = render_final
+        self.job_ttl = job_ttl
+        self._background = ThreadPoolExecutor(max_workers=max_background, thread_name_prefix="final-render")
+        self._jobs = {}
+        self._finished = {}  # job id -> monotonic time the render ended
+        self._lock = threading.Lock()
+
+    def submit_final(self, scene: dict) -> str:
+        """Start a full-quality render in the background, returning its job id"""
+        job_id = uuid.uuid4().hex[:12]
+        with self._lock:
+            self._prune()
+            future = self._background.submit(self.render_final, scene)
+            self._jobs[job_id] = future
+        future.add_done_callback(lambda _: self._finish(job_id))
+        return job_id
+
+    def _finish(self, job_id: str) -> None:
+        with self._lock:
+            self._finished[job_id] = time.monotonic()
+
+    def _prune(self) -> None:
+        """Forget jobs that finished more than job_ttl seconds ago"""
+        expired = time.monotonic() - self.job_ttl
+        for job_id in [job_id for job_id, ended in self._finished.items() if ended < expired]:
+            del self._finished[job_id]
+            del self._jobs[job_id]
+
+    def render(self, scene: dict, atom_count: int, policy: list[dict] | None = None) -> dict:
+        """Draft or final image now, plus the id of the pending final render when drafted"""
+        width = int(scene.get("width", DEFAULT_WIDTH))
+        height = int(scene.get("height", DEFAULT_HEIGHT))
+        tier = choose_tier(atom_count, width, height, policy)
+        if not tier.get("draft"):
+            return dict(self.render_final(scene), quality="final")
+
+        draft_width, draft_height = draft_size(tier, width, height)
+        draft_scene = dict(scene, preset=tier["draft"].get("preset", "draft"),
+                           width=draft_width, height=draft_height)
+        draft_scene.pop("session", None)
+        result = dict(self.render_draft(draft_scene), quality="draft")
+        # The final image replaces the draft at the same output path when it is done
+        final_scene = dict(scene, preset=scene.get("preset", DEFAULT_PRESET), output=result["image"])
+        result["final_job"] = self.submit_final(final_scene)
+        return result
+
+    def status(self, job_id: str) -> dict:
+        """State of a background render"""
+        with self._lock:
+            self._prune()
+            future = self._jobs.get(job_id)
+        if future is None:
+            raise ValueError(f"Unknown or expired render job: {job_id}")
+        if not future.done():
+            return {"job": job_id, "status": "running"}
+        error = future.exception()
+        if error is not None:
+            return {"job": job_id, "status": "failed", "error": f"{type(error).__name__}: {error}"}
+        return {"job": job_id, "status": "done", **future.result()}
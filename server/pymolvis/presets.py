@@ -0,0 +1,88 @@
+"""Named rendering presets shared by the prompt templates and headless workers."""
+
+# Each preset is a sequence of (setting, value) pairs applied in order
+RENDER_PRESETS = {
+    "publication": (
+        ("ray_trace_mode", 1),
+        ("ray_trace_gain", 0.05),
+        ("ray_trace_depth_factor", 1),
+        ("ray_trace_disco_factor", 1),
+        ("specular", 0),
+        ("ambient", 0.8),
+        ("cartoon_side_chain_helper", "on"),
+        ("valence", "off"),
+        ("ray_shadow", "off"),
+        ("reflect", 0.5),
+        ("stick_radius", 0.25),
+    ),
+    # Fast first look: no outlines, antialiasing or shadows and coarser geometry
+    "draft": (
+        ("ray_trace_mode", 0),
+        ("antialias", 0),
+        ("specular", 0),
+        ("ambient", 0.8),
+        ("cartoon_side_chain_helper", "on"),
+        ("valence", "off"),
+        ("ray_shadow", "off"),
+        ("stick_radius", 0.25),
+        ("surface_quality", -1),
+        ("cartoon_sampling", 4),
+        ("sphere_quality", 0),
+        ("stick_quality", 5),
+    ),
+}
+
+DEFAULT_PRESET = "publication"
+
+
+def preset_settings(name: str = DEFAULT_PRESET) -> tuple:
+    """Settings of a named preset"""
+    try:
+        return RENDER_PRESETS[name]
+    except KeyError:
+        raise ValueError(f"Unknown render preset: {name} (available: {', '.join(RENDER_PRESETS)})") from None
+
+
+def preset_commands(name: str = DEFAULT_PRESET, ray: bool | str = True) -> list[str]:
+    """PyMOL commands applying a preset, ending with hide labels and optionally a render command
+
+    ray may be True for a plain ray, or a full command such as "ray 600, 600" or "draw 600, 600".
+    """
+    commands = [f"set {setting}, {value}" for setting, value in preset_settings(name)]
+    commands.append("hide labels")
+    if ray:
+        commands.append("ray" if ray is True else ray)
+    return commands
+
+
+def switch_preset_commands(current: str, name: str = DEFAULT_PRESET) -> list[str]:
+    """Commands replacing preset current by name, settings only current touches go back to PyMOL defaults"""
+    kept = {setting for setting, _ in preset_settings(name)}
+    commands = [f"unset {setting}" for setting, _ in preset_settings(current) if setting not in kept]
+    return commands + preset_commands(name, ray=False)
+
+
+def preset_command_line(name: str = DEFAULT_PRESET, ray: bool | str = True) -> str:
+    """Preset as one semicolon-separated command line, a single run_pymol_command call"""
+    return "; ".join(preset_commands(name, ray))
+
+
+def preset_script(name: str = DEFAULT_PRESET, ray: bool | str = True) -> str:
+    """Preset as the contents of a .pml script"""
+    return "\n".join(preset_commands(name, ray)) + "\n"
+
+
+def apply_preset(cmd, name: str = DEFAULT_PRESET, reset: bool = False) -> None:
+    """Apply a preset's settings directly through a PyMOL cmd module
+
+    With reset, settings that only other presets change go back to PyMOL defaults
+    first, so a session saved under another preset renders the same as a fresh one.
+    """
+    if reset:
+        kept = {setting for setting, _ in preset_settings(name)}
+        for setting in dict.fromkeys(setting for settings in RENDER_PRESETS.values() for setting, _ in settings):
+            if setting not in kept:
+                cmd.unset(setting)
+    for setting, value in preset_settings(name):
+        cmd.set(setting, value)
+    cmd.hide("labels")
@@ -0,0 +1,161 @@
+"""Content-addressed cache of rendered images and sessions with LRU eviction."""
+
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+
+from .config import cache_dir
+from .fetch import resolve_structure_path
+from .presets import DEFAULT_PRESET, preset_settings
+from .structure_cache import content_digest
+from .tracing import span
+
+MAX_BYTES_ENV = "PYMOL_VIS_RENDER_CACHE_BYTES"
+DEFAULT_MAX_BYTES = 1024 ** 3
+
+# Scene fields that change the rendered pixels
+KEY_FIELDS = ("object", "commands", "view", "width", "height", "ray", "arguments", "selections")
+
+
+def render_key(scene: dict) -> str:
+    """Hash of structure contents, template arguments, selections and render settings"""
+    preset = scene.get("preset", DEFAULT_PRESET)
+    material = {field: scene.get(field) for field in KEY_FIELDS}
+    material["settings"] = [list(pair) for pair in preset_settings(preset)] if preset else None
+    if scene.get("tiles"):
+        # Tiled renders use an orthoscopic camera
+        material["tiles"] = scene["tiles"]
+    if scene.get("structure"):
+        material["structure"] = content_digest(resolve_structure_path(scene["structure"]))
+    if scene.get("input_session"):
+        material["input_session"] = content_digest(scene["input_session"])
+    encoded = json.dumps(material, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(encoded.encode()).hexdigest()
+
+
+class RenderCache:
+    """Rendered PNG and PSE files by render key within a byte budget"""
+
+    def __init__(self, directory: str, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.directory = directory
+        self.index_path = os.path.join(directory, "index.json")
+        self.max_bytes = max_bytes
+        self.stats = {"hits": 0, "misses": 0, "evictions": 0}
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        self._index = self._read_index()
+
+    def _read_index(self) -> dict:
+        try:
+            with open(self.index_path) as handle:
+                return json.load(handle)
+        except (OSError, ValueError):
+            return {}
+
+    def _write_index(self) -> None:
+        fd, partial = tempfile.mkstemp(dir=self.directory, suffix=".part")
+        with os.fdopen(fd, "w") as handle:
+            json.dump(self._index, handle)
+        os.replace(partial, self.index_path)
+
+    def paths(self, key: str) -> dict:
+        """Image and session file locations for a key"""
+        return {
+            "image": os.path.join(self.directory, f"{key}.png"),
+            "session": os.path.join(self.directory, f"{key}.pse"),
+        }
+
+    def contains(self, key: str) -> bool:
+        """True when a render is stored for the key, without counting a lookup"""
+        with self._lock:
+            return key in self._index and os.path.isfile(self.paths(key)["image"])
+
+    def get(self, key: str) -> dict | None:
+        """Cached files for a key, counting the lookup as a hit or miss"""
+        with self._lock:
+            entry = self._index.get(key)
+            paths = self.paths(key)
+            if entry and os.path.isfile(paths["image"]):
+                self.stats["hits"] += 1
+                entry["last_access"] = time.time()
+                self._write_index()
+                return {name: path for name, path in paths.items() if os.path.isfile(path)}
+            self.stats["misses"] += 1
+            return None
+
+    def put(self, key: str) -> None:
+        """Register files already written at paths(key) and evict to fit the budget"""
+        size = sum(os.path.getsize(path) for path in self.paths(key).values() if os.path.isfile(path))
+        with self._lock:
+            self._index[key] = {"size": size, "last_access": time.time()}
+            self._evict(keep=key)
+            self._write_index()
+
+    def _evict(self, keep: str | None = None) -> None:
+        """Drop least recently used renders until the stored bytes fit the budget"""
+        total = sum(entry["size"] for entry in self._index.values())
+        for key, entry in sorted(self._index.items(), key=lambda item: item[1]["last_access"]):
+            if total <= self.max_bytes:
+                break
+            if key == keep:
+                continue
+            del self._index[key]
+            total -= entry["size"]
+            self.stats["evictions"] += 1
+            for path in self.paths(key).values():
+                try:
+                    os.unlink(path)
+                except FileNotFoundError:
+                    pass
+
+    def summary(self) -> dict:
+        """Hit/miss counters and occupancy"""
+        with self._lock:
+            stats = dict(self.stats)
+            stats["entries"] = len(self._index)
+            stats["bytes_stored"] = sum(entry["size"] for entry in self._index.values())
+        lookups = stats["hits"] + stats["misses"]
+        stats["max_bytes"] = self.max_bytes
+        stats["hit_rate"] = round(stats["hits"] / lookups, 4) if lookups else None
+        return stats
+
+
+def cached_render(pool, cache: RenderCache, scene: dict) -> dict:
+    """Render a scene through the pool unless an identical render is cached"""
+    with span("render", width=scene.get("width"), height=scene.get("height")) as traced:
+        key = render_key(scene)
+        output = scene.get("output")
+        result = cache.get(key)
+        traced.set(cache_hit=result is not None)
+        if result is None:
+            paths = cache.paths(key)
+            job = dict(scene, output=paths["image"], session=paths["session"])
+            result = dict(pool.render(job), **paths)
+            cache.put(key)
+            result["cached"] = False
+        else:
+            result["cached"] = True
+
+    result["key"] = key
+    if output:
+        shutil.copyfile(result["image"], output)
+        result["image"] = output
+    return result
+
+
+_default_cache = None
+
+
+def default_render_cache() -> RenderCache:
+    """Process-wide render cache configured from the environment"""
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = RenderCache(
+            cache_dir("renders"),
+            max_bytes=int(os.environ.get(MAX_BYTES_ENV, DEFAULT_MAX_BYTES)),
+        )
+    return _default_cache
@@ -0,0 +1,253 @@
+"""Pool of pre-started headless PyMOL processes that render scene descriptions to PNG."""
+
+import asyncio
+import multiprocessing
+import os
+import sys
+import threading
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from .config import cache_dir
+from .fetch import resolve_structure_path
+from .presets import DEFAULT_PRESET, apply_preset
+from .tiles import tile_camera
+from .tracing import span
+
+WORKERS_ENV = "PYMOL_VIS_RENDER_WORKERS"
+THREADS_ENV = "PYMOL_VIS_RENDER_THREADS"
+DEFAULT_WORKERS = 2
+# Image format codes of cmd.png
+PNG_FORMAT, PPM_FORMAT = 0, 1
+
+_pymol = None
+
+
+def pymol_available() -> bool:
+    try:
+        import pymol2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def redirect_output(handle) -> None:
+    """Point file descriptors 1 and 2 of this process at an open binary file
+
+    Pool workers inherit the server's stdout, which is the MCP stdio transport, and
+    PyMOL prints from C, out of reach of sys.stdout replacements.
+    """
+    sys.stdout.flush()
+    sys.stderr.flush()
+    os.dup2(handle.fileno(), 1)
+    os.dup2(handle.fileno(), 2)
+
+
+def silence_output() -> None:
+    """Discard everything this process prints, at the file descriptor level"""
+    with open(os.devnull, "wb") as null:
+        redirect_output(null)
+
+
+def init_pool_worker() -> None:
+    """init_worker for processes started by the server, with their output discarded"""
+    silence_output()
+    init_worker()
+
+
+def init_worker() -> None:
+    """Start one headless PyMOL instance for this worker process"""
+    global _pymol
+    try:
+        import pymol2
+    except ImportError:
+        _pymol = None
+        return
+    _pymol = pymol2.PyMOL()
+    _pymol.start()
+    _pymol.cmd.feedback("disable", "all", "everything")
+
+
+def worker_cmd():
+    """cmd API of this worker's PyMOL instance"""
+    if _pymol is None:
+        raise RuntimeError("PyMOL (pymol2 module) is not available for rendering")
+    return _pymol.cmd
+
+
+def object_name(structure: str) -> str:
+    """PyMOL object name used for a structure argument"""
+    return os.path.basename(structure.strip()).split(".")[0] or "structure"
+
+
+def _ping() -> bool:
+    return _pymol is not None
+
+
+def render_job(scene: dict) -> dict:
+    """Build a scene in this worker's PyMOL and ray trace it to a PNG
+
+    Scene keys: input_session, structure, object, commands, view, preset,
+    width, height, threads, ray, tile, output, session. Only output is required.
+    A tile (from tiles.tile_grid) renders only that part of the width x height
+    image, to a PPM file when output ends in .ppm.
+    """
+    cmd = worker_cmd()
+    started = time.perf_counter()
+    cmd.reinitialize()
+    if scene.get("threads"):
+        cmd.set("max_threads", int(scene["threads"]))
+
+    if scene.get("input_session"):
+        cmd.load(scene["input_session"])
+    if scene.get("structure"):
+        cmd.load(resolve_structure_path(scene["structure"]), scene.get("object") or object_name(scene["structure"]))
+    cmd.bg_color("white")
+    cmd.set("ray_opaque_background", 1)
+    for command in scene.get("commands", ()):
+        cmd.do(command, echo=0)
+    if scene.get("preset", DEFAULT_PRESET):
+        apply_preset(cmd, scene.get("preset", DEFAULT_PRESET), reset=True)
+    if scene.get("view"):
+        cmd.set_view(scene["view"])
+
+    output = scene["output"]
+    width, height = int(scene.get("width", 1200)), int(scene.get("height", 1200))
+    view = tile = scene.get("tile")
+    if tile:
+        view = cmd.get_view()
+        tile_view, field_of_view = tile_camera(view, width, height, tile)
+        cmd.set_view(tile_view)
+        cmd.set("orthoscopic", 1)
+        cmd.set("field_of_view", field_of_view)
+        width, height = tile["width"], tile["height"]
+    cmd.png(output, width=width, height=height, ray=1 if scene.get("ray", True) else 0,
+            format=PPM_FORMAT if output.endswith(".ppm") else PNG_FORMAT)
+    if scene.get("session"):
+        if tile:
+            cmd.set_view(view)
+        cmd.save(scene["session"])
+    return {"image": output, "seconds": round(time.perf_counter() - started, 3), "pid": os.getpid()}
+
+
+class RenderPool:
+    """Fixed number of warm PyMOL worker processes fed from one job queue"""
+
+    def __init__(self, workers: int, threads_per_job: int | None = None, output_dir: str | None = None):
+        if workers < 1:
+            raise ValueError("Render pool needs at least one worker")
+        self.workers = workers
+        self.threads_per_job = threads_per_job or max(1, (os.cpu_count() or 1) // workers)
+        self.output_dir = output_dir or cache_dir("render_output")
+        self.stats = {"submitted": 0, "completed": 0, "failed": 0, "restarts": 0}
+        self._lock = threading.Lock()
+        self._executor = None
+
+    def _new_executor(self) -> ProcessPoolExecutor:
+        # spawn keeps the workers independent of threads running in the server process
+        return ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=init_pool_worker,
+        )
+
+    def start(self) -> "RenderPool":
+        """Start all worker processes and their PyMOL instances now"""
+        with self._lock:
+            if self._executor is None:
+                self._executor = self._new_executor()
+            executor = self._executor
+        pings = [executor.submit(_ping) for _ in range(self.workers)]
+        if not all(ping.result() for ping in pings):
+            raise RuntimeError("PyMOL (pymol2 module) is not available for rendering")
+        return self
+
+    def _prepare(self, scene: dict) -> dict:
+        scene = dict(scene)
+        scene.setdefault("threads", self.threads_per_job)
+        if not scene.get("output"):
+            scene["output"] = os.path.join(self.output_dir, f"{uuid.uuid4().hex}.png")
+        return scene
+
+    def submit(self, scene: dict):
+        """Queue a scene, returning a concurrent.futures.Future of the job result"""
+        with self._lock:
+            if self._executor is None:
+                self._executor = self._new_executor()
+            self.stats["submitted"] += 1
+            return self._executor.submit(render_job, self._prepare(scene))
+
+    def render(self, scene: dict) -> dict:
+        """Render a scene, restarting the pool once if a worker process died"""
+        with span("render.ray", width=scene.get("width"), height=scene.get("height")) as traced:
+            result = self._render(scene)
+            # Time inside the worker, the rest of the span is queueing and transfer
+            traced.set(worker_seconds=result.get("seconds"), pid=result.get("pid"))
+        return result
+
+    def _render(self, scene: dict) -> dict:
+        try:
+            result = self.submit(scene).result()
+        except BrokenProcessPool:
+            with self._lock:
+                self.stats["restarts"] += 1
+                self._executor = None
+            try:
+                result = self.submit(scene).result()
+            except Exception:
+                self._count("failed")
+                raise
+        except Exception:
+            self._count("failed")
+            raise
+        self._count("completed")
+        return result
+
+    def render_all(self, scenes: list[dict]) -> list[dict]:
+        """Render scenes in parallel across the workers, in order, restarting the pool once if a worker died"""
+        futures = [self.submit(scene) for scene in scenes]
+        results = []
+        for future, scene in zip(futures, scenes):
+            try:
+                result = future.result()
+            except BrokenProcessPool:
+                result = self._render(scene)
+            except Exception:
+                self._count("failed")
+                raise
+            else:
+                self._count("completed")
+            results.append(result)
+        return results
+
+    async def render_async(self, scene: dict) -> dict:
+        return await asyncio.to_thread(self.render, scene)
+
+    def _count(self, key: str) -> None:
+        with self._lock:
+            self.stats[key] += 1
+
+    def summary(self) -> dict:
+        with self._lock:
+            return {"workers": self.workers, "threads_per_job": self.threads_per_job, **self.stats}
+
+    def shutdown(self) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+
+_default_pool = None
+
+
+def default_render_pool() -> RenderPool:
+    """Process-wide render pool sized from the environment"""
+    global _default_pool
+    if _default_pool is None:
+        workers = int(os.environ.get(WORKERS_ENV, DEFAULT_WORKERS))
+        threads = int(os.environ[THREADS_ENV]) if os.environ.get(THREADS_ENV) else None
+        _default_pool = RenderPool(max(1, workers), threads)
+    return _default_pool
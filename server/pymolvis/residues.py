@@ -0,0 +1,296 @@
+"""Compiler from the key_residues argument to a minimal per-chain PyMOL selection and command batch."""
+
+import re
+import weakref
+from typing import NamedTuple
+
+import numpy as np
+
+from .structure import Structure
+
+_ITEM = r"(?:([A-Za-z0-9]{1,4}):)?(-?\d+)([A-Za-z]?)(?:-(-?\d+))?"
+_ITEM_PATTERN = re.compile(rf"\s*{_ITEM}\s*")
+_CHAIN_PATTERN = re.compile(r"[A-Za-z0-9]{1,4}")
+MAX_RANGE = 100000
+MAX_REPORTED = 50
+
+
+class ResidueSet(NamedTuple):
+    """Requested residues of one chain: plain numbers and residues with an insertion code"""
+
+    numbers: np.ndarray  # unique int64, sorted
+    coded: list[str]     # such as "52A"
+
+    def __len__(self) -> int:
+        return len(self.numbers) + len(self.coded)
+
+    def labels(self) -> list[str]:
+        return [str(number) for number in self.numbers.tolist()] + self.coded
+
+
+# Byte classes for the vectorized parser: 0 invalid, 1 digit, 2 letter, 3 comma, 4 colon
+_BYTE_CLASS = np.zeros(256, dtype=np.uint8)
+_BYTE_CLASS[ord("0"):ord("9") + 1] = 1
+_BYTE_CLASS[ord("A"):ord("Z") + 1] = 2
+_BYTE_CLASS[ord("a"):ord("z") + 1] = 2
+_BYTE_CLASS[ord(",")] = 3
+_BYTE_CLASS[ord(":")] = 4
+_POW10 = 10 ** np.arange(10, dtype=np.int64)
+_POW256 = 256 ** np.arange(4, dtype=np.int64)
+
+
+def _parse_plain(key_residues: str) -> dict[str | None, ResidueSet] | None:
+    """Vectorized parse of RESI or CHAIN:RESI lists, None when ranges, insertion codes or anything unusual occur"""
+    text = key_residues.replace(" ", "").strip(",")
+    try:
+        data = np.frombuffer(text.encode("ascii"), dtype=np.uint8)
+    except UnicodeEncodeError:
+        return None
+    if not text:
+        return None
+    kind = _BYTE_CLASS[data]
+    separators = np.flatnonzero(kind == 3)
+    colons = np.flatnonzero(kind == 4)
+    if kind.min() == 0 or np.any(np.diff(separators) == 1):
+        return None
+
+    n_items = len(separators) + 1
+    starts = np.empty(n_items, dtype=np.int64)
+    starts[0], starts[1:] = 0, separators + 1
+    lasts = np.empty(n_items, dtype=np.int64)
+    lasts[:-1], lasts[-1] = separators - 1, len(data) - 1
+    # The residue number runs from after the item's colon (or its start) to its last character
+    number_starts = starts.copy()
+    if len(colons):
+        colon_items = np.searchsorted(separators, colons)
+        if np.any(np.diff(colon_items) == 0):
+            return None
+        number_starts[colon_items] = colons + 1
+    digits = lasts - number_starts + 1
+    chain_length = number_starts - starts - (number_starts != starts)
+    if digits.min() < 1 or digits.max() > 9 or chain_length.max() > 4:
+        return None
+    if len(colons) and chain_length[colon_items].min() < 1:
+        return None
+
+    item = np.repeat(np.arange(n_items), digits)
+    index = np.arange(len(item)) - np.repeat(np.cumsum(digits) - digits, digits) + np.repeat(number_starts, digits)
+    if np.any(kind[index] != 1):
+        return None
+    numbers = np.bincount(item, weights=(data[index] - 48) * _POW10[lasts[item] - index], minlength=n_items)
+    keys = numbers.astype(np.int64)
+    if chain_length.max() > 0:
+        item = np.repeat(np.arange(n_items), chain_length)
+        index = np.arange(len(item)) - np.repeat(np.cumsum(chain_length) - chain_length, chain_length) + np.repeat(starts, chain_length)
+        place = number_starts[item] - 2 - index
+        chain_keys = np.bincount(item, weights=data[index] * _POW256[place], minlength=n_items).astype(np.int64)
+        keys += chain_keys << 32
+
+    # One sort groups residues by chain and orders them within the chain
+    keys.sort()
+    keys = keys[np.concatenate(([True], keys[1:] != keys[:-1]))]
+    chain_keys, numbers = keys >> 32, keys & 0xFFFFFFFF
+    bounds = np.flatnonzero(np.diff(chain_keys)) + 1
+    residues = {}
+    for first, last in zip(np.concatenate(([0], bounds)).tolist(), np.concatenate((bounds, [len(keys)])).tolist()):
+        chain = int(chain_keys[first]).to_bytes(4, "big").lstrip(b"\0").decode() or None
+        residues[chain] = ResidueSet(numbers[first:last], [])
+    return residues
+
+
+def _parse_items(items: list[str]) -> dict[str | None, ResidueSet]:
+    numbers, coded = {}, {}
+    for item in items:
+        match = _ITEM_PATTERN.fullmatch(item)
+        if not match:
+            raise ValueError(
+                f"Invalid key residue '{item}' (expected RESI, RESI-RESI, CHAIN:RESI or CHAIN:RESI-RESI)"
+            )
+        chain, start, insertion, end = match.groups()
+        if insertion:
+            if end:
+                raise ValueError(f"Residue ranges cannot start at an insertion code: {item}")
+            coded.setdefault(chain, []).append(f"{start}{insertion}")
+        elif end:
+            first, last = int(start), int(end)
+            if last < first or last - first > MAX_RANGE:
+                raise ValueError(f"Invalid residue range {item}")
+            numbers.setdefault(chain, []).extend(range(first, last + 1))
+        else:
+            numbers.setdefault(chain, []).append(int(start))
+    return {chain: ResidueSet(np.unique(np.asarray(numbers.get(chain, []), dtype=np.int64)),
+                              sorted(set(coded.get(chain, [])), key=_residue_order))
+            for chain in {**numbers, **coded}}
+
+
+def parse_key_residues(key_residues: str) -> dict[str | None, ResidueSet]:
+    """Residues per chain (None when not chain-qualified), raising ValueError on malformed input
+
+    Accepts 57,102 or A:57,B:102, ranges such as A:10-45 and insertion codes such as 52A.
+    """
+    if not key_residues.strip(" ,"):
+        return {}
+    parsed = _parse_plain(key_residues)
+    if parsed is not None:
+        return parsed
+    return _parse_items([item.strip() for item in key_residues.split(",") if item.strip()])
+
+
+def _resi_token(value) -> str:
+    # A leading minus would read as a range separator in PyMOL
+    text = str(value)
+    return "\\" + text if text.startswith("-") else text
+
+
+def merge_ranges(numbers) -> list[tuple[int, int]]:
+    """Integers as (first, last) runs of consecutive values"""
+    values = np.unique(np.asarray(numbers, dtype=np.int64))
+    if values.size == 0:
+        return []
+    breaks = np.flatnonzero(np.diff(values) != 1)
+    starts = np.concatenate(([0], breaks + 1))
+    ends = np.concatenate((breaks, [values.size - 1]))
+    return list(zip(values[starts].tolist(), values[ends].tolist()))
+
+
+def resi_expression(runs: list[tuple]) -> str:
+    """PyMOL resi expression such as 10-45+50 for (first, last) runs"""
+    return "+".join(
+        _resi_token(first) if first == last else f"{_resi_token(first)}-{_resi_token(last)}" for first, last in runs
+    )
+
+
+class ResidueCatalog:
+    """Residues of a structure per chain, in file order"""
+
+    def __init__(self, structure: Structure):
+        _, first = structure.residue_index()
+        first = np.sort(first)
+        chain_codes = structure.chain_codes[first]
+        resi_codes = structure.resi_codes[first]
+        self.chains = {}
+        for code in np.unique(chain_codes).tolist():
+            resis = [structure.resi_table[index] for index in resi_codes[chain_codes == code].tolist()]
+            plain = [(int(resi), position) for position, resi in enumerate(resis) if resi.lstrip("-").isdigit()]
+            plain.sort()
+            # Integer part of every residue number by file position, insertion codes included
+            position_numbers = np.array([_residue_order(resi)[0] for resi in resis], dtype=np.int64)
+            self.chains[structure.chain_table[code]] = {
+                "resis": resis,
+                "positions": {resi: position for position, resi in enumerate(resis)},
+                "numbers": np.array([number for number, _ in plain], dtype=np.int64),
+                "number_positions": np.array([position for _, position in plain], dtype=np.int64),
+                "position_numbers": position_numbers,
+                "sorted_numbers": np.sort(position_numbers),
+            }
+
+    def runs(self, chain: str, residues: ResidueSet) -> tuple[list[tuple], list[str]]:
+        """Runs of residues adjacent in the chain (gaps in numbering bridged) and the residues not found
+
+        PyMOL reads resi first-last as a numeric range, so a run only continues while
+        the numbers increase along the file and no residue elsewhere in the chain is
+        numbered in between; out-of-order numbering splits it.
+        """
+        entry = self.chains[chain]
+        numbers = entry["numbers"]
+        slots = np.minimum(np.searchsorted(numbers, residues.numbers), max(len(numbers) - 1, 0))
+        found = numbers[slots] == residues.numbers if len(numbers) else np.zeros(len(residues.numbers), bool)
+        positions = entry["number_positions"][slots[found]].tolist()
+        missing = [str(number) for number in residues.numbers[~found].tolist()]
+        for resi in residues.coded:
+            position = entry["positions"].get(resi)
+            if position is None:
+                missing.append(resi)
+            else:
+                positions.append(position)
+        missing = sorted(missing, key=_residue_order)
+        if not positions:
+            return [], missing
+        resis = entry["resis"]
+        positions = np.unique(np.asarray(positions, dtype=np.int64))
+        values = entry["position_numbers"][positions]
+        # Neighbours in the file join a run only when no other residue is numbered between them
+        sorted_numbers = entry["sorted_numbers"]
+        between = (np.searchsorted(sorted_numbers, values[1:], "right")
+                   - np.searchsorted(sorted_numbers, values[:-1], "left"))
+        breaks = np.flatnonzero((np.diff(positions) != 1) | (between != 2))
+        starts = np.concatenate(([0], breaks + 1)).tolist()
+        ends = np.concatenate((breaks, [len(positions) - 1])).tolist()
+        runs = [(resis[positions[start]], resis[positions[end]]) for start, end in zip(starts, ends)]
+        return runs, missing
+
+    def chains_with(self, resi: str) -> list[str]:
+        return [chain for chain, entry in self.chains.items() if resi in entry["positions"]]
+
+
+def _residue_order(resi: str) -> tuple:
+    match = re.match(r"(-?\d+)(.*)", resi)
+    return (int(match.group(1)), match.group(2)) if match else (0, resi)
+
+
+_catalogs = {}
+
+
+def residue_catalog(structure: Structure) -> ResidueCatalog:
+    """Catalog of a structure, built once per structure object"""
+    key = id(structure)
+    catalog = _catalogs.get(key)
+    if catalog is None:
+        catalog = _catalogs[key] = ResidueCatalog(structure)
+        weakref.finalize(structure, _catalogs.pop, key, None)
+    return catalog
+
+
+def _unnumbered_runs(residues: ResidueSet) -> list[tuple]:
+    return merge_ranges(residues.numbers) + [(resi, resi) for resi in residues.coded]
+
+
+def compile_key_residues(key_residues: str, structure: Structure | None = None, object_name: str | None = None,
+                         selection_name: str = "key_residues") -> dict:
+    """Minimal selection and command batch for key_residues, checked against structure when given"""
+    residues = parse_key_residues(key_residues)
+    catalog = residue_catalog(structure) if structure is not None else None
+    clauses, per_chain, missing, ambiguous = [], {}, [], []
+
+    for chain, requested in residues.items():
+        if catalog is not None and chain is not None:
+            if chain not in catalog.chains:
+                missing.extend(f"{chain}:{resi}" for resi in requested.labels())
+                continue
+            runs, absent = catalog.runs(chain, requested)
+            missing.extend(f"{chain}:{resi}" for resi in absent)
+        else:
+            runs = _unnumbered_runs(requested)
+            if catalog is not None:
+                for resi in requested.labels():
+                    matches = catalog.chains_with(resi)
+                    if not matches:
+                        missing.append(resi)
+                    elif len(matches) > 1:
+                        ambiguous.append(f"{resi} ({'/'.join(matches)})")
+        if not runs:
+            continue
+        expression = resi_expression(runs)
+        per_chain[chain or ""] = expression
+        clauses.append(f"(chain {chain} and resi {expression})" if chain else f"(resi {expression})")
+
+    selection = " or ".join(clauses) or "none"
+    if object_name and clauses:
+        selection = f"{object_name} and ({selection})"
+    commands = [
+        f"select {selection_name}, {selection}",
+        f"show sticks, {selection_name}",
+        f"util.cbaw {selection_name}",
+        f"show spheres, {selection_name} and name CA",
+        f"set sphere_scale, 0.3, {selection_name} and name CA",
+    ]
+    return {
+        "selection": selection,
+        "residues": sum(len(requested) for requested in residues.values()),
+        "chains": per_chain,
+        "missing_count": len(missing),
+        "missing": missing[:MAX_REPORTED],
+        "ambiguous": ambiguous[:MAX_REPORTED],
+        "commands": commands,
+        "script": "; ".join(commands),
+    }
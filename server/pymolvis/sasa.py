@@ -0,0 +1,165 @@
+"""Solvent-accessible surface area (Shrake-Rupley) and buried surface area of receptor-ligand interfaces."""
+
+import numpy as np
+
+from .interface import interface_selections
+from .spatial import CellGrid
+from .structure import Structure
+
+PROBE_RADIUS = 1.4
+DEFAULT_POINTS = 100
+DEFAULT_MIN_BURIED = 1.0
+DEFAULT_RADIUS = 1.8
+# Van der Waals radii (Bondi) by element symbol
+ELEMENT_RADII = {
+    "H": 1.1, "D": 1.1, "C": 1.7, "N": 1.55, "O": 1.52, "S": 1.8, "SE": 1.9, "P": 1.8,
+    "F": 1.47, "CL": 1.75, "BR": 1.85, "I": 1.98,
+    "NA": 2.27, "K": 2.75, "MG": 1.73, "CA": 2.31, "ZN": 1.39, "FE": 2.0, "MN": 2.0, "CU": 1.4,
+}
+HYDROGENS = frozenset({"H", "D"})
+
+# Pair x sphere point entries evaluated per block, bounds temporary memory
+_BLOCK_ENTRIES = 1 << 22
+
+
+def sphere_points(count: int = DEFAULT_POINTS) -> np.ndarray:
+    """Nearly uniform unit vectors on a golden-section spiral"""
+    if count < 1:
+        raise ValueError("Shrake-Rupley needs at least one sphere point")
+    index = np.arange(count) + 0.5
+    z = 1 - 2 * index / count
+    radius = np.sqrt(1 - z * z)
+    angle = np.pi * (1 + 5 ** 0.5) * index
+    return np.stack([radius * np.cos(angle), radius * np.sin(angle), z], axis=1).astype(np.float32)
+
+
+def atom_radii(structure: Structure, indices: np.ndarray) -> np.ndarray:
+    """Van der Waals radius of each atom from its element"""
+    table = np.array([ELEMENT_RADII.get(element.upper(), DEFAULT_RADIUS) for element in structure.element_table],
+                     dtype=np.float32)
+    return table[structure.element_codes[indices]]
+
+
+def _neighbor_pairs(coords: np.ndarray, radii: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Pairs (i, j), i != j, of overlapping probe-expanded spheres, sorted by i"""
+    grid = CellGrid(coords, 2 * float(radii.max()))
+    i, j, distances = grid.query(coords)
+    keep = (i != j) & (distances < radii[i] + radii[j])
+    i, j = i[keep], j[keep]
+    order = np.argsort(i, kind="stable")
+    return i[order], j[order]
+
+
+def _bury(buried: np.ndarray, coords: np.ndarray, radii: np.ndarray, points: np.ndarray,
+          i: np.ndarray, j: np.ndarray) -> None:
+    """Mark the sphere points of atoms i that lie inside the expanded sphere of atoms j
+
+    Point x_i + r_i * u is inside sphere j exactly when u . (x_j - x_i) > (r_i^2 + d^2 - r_j^2) / (2 r_i),
+    so each block of pairs is one matrix product against the shared unit sphere.
+    """
+    block = max(1, _BLOCK_ENTRIES // len(points))
+    for start in range(0, len(i), block):
+        bi, bj = i[start:start + block], j[start:start + block]
+        vectors = coords[bj] - coords[bi]
+        d_sq = np.einsum("ij,ij->i", vectors, vectors)
+        threshold = (radii[bi] ** 2 + d_sq - radii[bj] ** 2) / (2 * radii[bi])
+        inside = (vectors @ points.T) > threshold[:, None]
+        # Pairs are sorted by i, so OR-reduce each atom's run of pairs
+        firsts = np.flatnonzero(np.concatenate(([True], bi[1:] != bi[:-1])))
+        buried[bi[firsts]] |= np.logical_or.reduceat(inside, firsts, axis=0)
+
+
+def _areas(buried: np.ndarray, radii: np.ndarray) -> np.ndarray:
+    exposed = buried.shape[1] - np.count_nonzero(buried, axis=1)
+    return 4 * np.pi * radii.astype(np.float64) ** 2 * exposed / buried.shape[1]
+
+
+def shrake_rupley(coords, radii, probe: float = PROBE_RADIUS, n_points: int = DEFAULT_POINTS,
+                  groups: np.ndarray | None = None) -> tuple[np.ndarray, np.ndarray | None]:
+    """Per-atom SASA in square Angstrom, plus the SASA of each group in isolation when groups are given
+
+    With groups (an integer label per atom) both surfaces come from the same neighbour
+    pairs: atoms are only occluded by their own group in isolation and by every atom
+    in the assembly.
+    """
+    coords = np.ascontiguousarray(coords, dtype=np.float32).reshape(-1, 3)
+    radii = np.asarray(radii, dtype=np.float32) + probe
+    points = sphere_points(n_points)
+    buried = np.zeros((len(coords), n_points), dtype=bool)
+    if not len(coords):
+        return np.zeros(0), None if groups is None else np.zeros(0)
+
+    i, j = _neighbor_pairs(coords, radii)
+    if groups is None:
+        _bury(buried, coords, radii, points, i, j)
+        return _areas(buried, radii), None
+
+    same = groups[i] == groups[j]
+    _bury(buried, coords, radii, points, i[same], j[same])
+    isolated = _areas(buried, radii)
+    _bury(buried, coords, radii, points, i[~same], j[~same])
+    return _areas(buried, radii), isolated
+
+
+def buried_surface(structure: Structure, receptor_chains, ligand_chains, probe: float = PROBE_RADIUS,
+                   n_points: int = DEFAULT_POINTS, min_buried: float = DEFAULT_MIN_BURIED,
+                   hydrogens: bool = False, prefix: str = "") -> dict:
+    """SASA of receptor, ligand and complex, and the residues buried by complex formation
+
+    prefix goes in front of the object and selection names in the commands, as in find_interface.
+    """
+    receptor_chains = list(receptor_chains)
+    ligand_chains = list(ligand_chains)
+    receptor_idx = structure.select_chains(receptor_chains)
+    ligand_idx = structure.select_chains(ligand_chains)
+    if not hydrogens:
+        heavy = ~np.isin(structure.element_codes, structure.codes_for("element_table", HYDROGENS))
+        receptor_idx, ligand_idx = receptor_idx[heavy[receptor_idx]], ligand_idx[heavy[ligand_idx]]
+    if not len(receptor_idx):
+        raise ValueError(f"No receptor atoms found on chains {'+'.join(receptor_chains)}")
+    if not len(ligand_idx):
+        raise ValueError(f"No ligand atoms found on chains {'+'.join(ligand_chains)}")
+
+    indices = np.concatenate([receptor_idx, ligand_idx])
+    is_ligand = np.arange(len(indices)) >= len(receptor_idx)
+    complex_sasa, isolated_sasa = shrake_rupley(structure.coords[indices], atom_radii(structure, indices),
+                                                probe, n_points, groups=is_ligand)
+    delta = isolated_sasa - complex_sasa
+
+    # Sum per residue over the selected atoms, in file order
+    residue_of, _ = structure.residue_index()
+    residue_ids, positions = np.unique(residue_of[indices], return_inverse=True)
+    residue_delta = np.bincount(positions, weights=delta, minlength=len(residue_ids))
+    residue_isolated = np.bincount(positions, weights=isolated_sasa, minlength=len(residue_ids))
+    first_atom = np.full(len(residue_ids), len(indices))
+    np.minimum.at(first_atom, positions, np.arange(len(indices)))
+
+    sides = {"receptor": [], "ligand": []}
+    for position in np.flatnonzero(residue_delta >= min_buried).tolist():
+        atom = first_atom[position]
+        residue = structure.atom(indices[atom])
+        del residue["name"]
+        residue["sasa"] = round(float(residue_isolated[position]), 2)
+        residue["buried"] = round(float(residue_delta[position]), 2)
+        sides["ligand" if is_ligand[atom] else "receptor"].append(residue)
+
+    receptor_sasa = float(isolated_sasa[~is_ligand].sum())
+    ligand_sasa = float(isolated_sasa[is_ligand].sum())
+    total = float(complex_sasa.sum())
+    commands = interface_selections(sides["receptor"], sides["ligand"], prefix)
+    return {
+        "probe": probe,
+        "points": n_points,
+        "min_buried": min_buried,
+        "receptor_chains": receptor_chains,
+        "ligand_chains": ligand_chains,
+        "receptor_atom_count": int(len(receptor_idx)),
+        "ligand_atom_count": int(len(ligand_idx)),
+        "receptor_sasa": round(receptor_sasa, 1),
+        "ligand_sasa": round(ligand_sasa, 1),
+        "complex_sasa": round(total, 1),
+        "buried_surface_area": round(receptor_sasa + ligand_sasa - total, 1),
+        "receptor_interface": sorted(sides["receptor"], key=lambda residue: -residue["buried"]),
+        "ligand_interface": sorted(sides["ligand"], key=lambda residue: -residue["buried"]),
+        "commands": commands,
+    }
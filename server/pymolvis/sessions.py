@@ -0,0 +1,281 @@
+"""Session-scoped PyMOL workers: one isolated headless PyMOL process per analysis, leased from a pool."""
+
+import multiprocessing
+import os
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from .config import cache_dir
+from .fetch import resolve_structure_path
+from .presets import DEFAULT_PRESET, apply_preset
+from .render_pool import init_worker, object_name, redirect_output, worker_cmd
+
+MAX_SESSIONS_ENV = "PYMOL_VIS_SESSIONS"
+IDLE_SECONDS_ENV = "PYMOL_VIS_SESSION_IDLE"
+DEFAULT_MAX_SESSIONS = 4
+# An open session may sit unused while its results are read and discussed
+DEFAULT_IDLE_SECONDS = 8 * 3600.0
+# A spare worker costs a process and is cheap to start again
+DEFAULT_WORKER_IDLE_SECONDS = 600.0
+DEFAULT_LEASE_TIMEOUT = 30.0
+
+_output = None  # File receiving this worker's stdout and stderr
+
+
+def _init_session_worker() -> None:
+    global _output
+    # Kept rather than discarded, run_commands reports it back
+    _output = tempfile.TemporaryFile()
+    redirect_output(_output)
+    init_worker()
+    cmd = worker_cmd()
+    # Errors are reported back to the caller, other feedback stays quiet
+    cmd.feedback("enable", "all", "errors")
+
+
+def _take_output() -> str:
+    """Everything printed since the last call, Python and PyMOL's C layer alike"""
+    sys.stdout.flush()
+    sys.stderr.flush()
+    _output.seek(0)
+    text = _output.read().decode(errors="replace")
+    # The descriptors share this file offset, so the next output starts at the top again
+    _output.seek(0)
+    _output.truncate()
+    return text.strip()
+
+
+def _reset() -> bool:
+    worker_cmd().reinitialize()
+    return True
+
+
+def _load(path: str, name: str) -> dict:
+    cmd = worker_cmd()
+    cmd.load(path, name)
+    return {"object": name, "atoms": cmd.count_atoms(name)}
+
+
+def _run_commands(commands: list[str]) -> dict:
+    """Run PyMOL commands in order, collecting the printed output (errors included) of each"""
+    cmd = worker_cmd()
+    messages = []
+    _take_output()
+    for command in commands:
+        cmd.do(command, echo=0)
+        text = _take_output()
+        if text:
+            messages.append({"command": command, "output": text})
+    return {
+        "executed": len(commands),
+        "output": messages,
+        "objects": cmd.get_names("objects"),
+        "selections": cmd.get_names("selections"),
+    }
+
+
+def _render(output: str, width: int, height: int, preset: str | None) -> dict:
+    cmd = worker_cmd()
+    started = time.perf_counter()
+    if preset:
+        apply_preset(cmd, preset)
+    cmd.png(output, width=width, height=height, ray=1)
+    return {"image": output, "seconds": round(time.perf_counter() - started, 3)}
+
+
+class _Worker:
+    """One single-process executor holding a warm PyMOL instance"""
+
+    def __init__(self):
+        self.executor = ProcessPoolExecutor(
+            max_workers=1,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_session_worker,
+        )
+        self.last_used = time.monotonic()
+        self.busy = 0
+
+    def call(self, function, *args):
+        self.busy += 1
+        try:
+            return self.executor.submit(function, *args).result()
+        finally:
+            self.busy -= 1
+            self.last_used = time.monotonic()
+
+    def idle_since(self, cutoff: float) -> bool:
+        return not self.busy and self.last_used < cutoff
+
+    def shutdown(self) -> None:
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+
+class SessionPool:
+    """Leases isolated PyMOL workers to analysis sessions
+
+    At most max_sessions sessions are open at once. Closed sessions return their
+    worker reset (reinitialize) to a free list for the next lease. Free workers
+    unused for worker_idle_seconds are shut down; sessions are only closed for the
+    caller after idle_seconds, long enough to outlast any pause in an analysis.
+    """
+
+    def __init__(self, max_sessions: int = DEFAULT_MAX_SESSIONS, idle_seconds: float = DEFAULT_IDLE_SECONDS,
+                 output_dir: str | None = None, worker_idle_seconds: float = DEFAULT_WORKER_IDLE_SECONDS):
+        if max_sessions < 1:
+            raise ValueError("Session pool needs at least one session")
+        self.max_sessions = max_sessions
+        self.idle_seconds = idle_seconds
+        self.worker_idle_seconds = worker_idle_seconds
+        self.output_dir = output_dir or cache_dir("session_output")
+        self.stats = {"opened": 0, "closed": 0, "evicted": 0, "workers_started": 0, "workers_stopped": 0,
+                      "crashes": 0}
+        self._sessions = {}
+        self._free = []
+        self._condition = threading.Condition()
+        self._reaper = None
+
+    def _start_reaper(self) -> None:
+        limits = [seconds for seconds in (self.idle_seconds, self.worker_idle_seconds) if seconds > 0]
+        if self._reaper is None and limits:
+            self._reaper = threading.Thread(target=self._reap, args=(min(limits),), daemon=True,
+                                            name="pymol-session-reaper")
+            self._reaper.start()
+
+    def _reap(self, shortest: float) -> None:
+        while True:
+            time.sleep(max(1.0, shortest / 4))
+            self.evict_idle()
+
+    def open(self, timeout: float = DEFAULT_LEASE_TIMEOUT) -> str:
+        """Lease a worker for a new session, waiting up to timeout seconds for a free slot"""
+        deadline = time.monotonic() + timeout
+        with self._condition:
+            self._start_reaper()
+            while len(self._sessions) >= self.max_sessions:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise RuntimeError(f"All {self.max_sessions} PyMOL sessions are in use, close one first")
+                self._condition.wait(remaining)
+            worker = self._free.pop() if self._free else None
+            if worker is not None:
+                worker.last_used = time.monotonic()
+            session_id = uuid.uuid4().hex[:12]
+            # Reserve the slot before starting a worker outside the lock
+            self._sessions[session_id] = worker
+            self.stats["opened"] += 1
+        if worker is None:
+            worker = _Worker()
+            try:
+                # Starts the process and PyMOL now, failing early when pymol2 is missing
+                worker.call(_reset)
+            except Exception:
+                worker.shutdown()
+                with self._condition:
+                    self._sessions.pop(session_id, None)
+                    self._condition.notify()
+                raise
+            with self._condition:
+                self.stats["workers_started"] += 1
+                self._sessions[session_id] = worker
+        return session_id
+
+    def _worker(self, session_id: str) -> _Worker:
+        with self._condition:
+            worker = self._sessions.get(session_id)
+        if worker is None:
+            raise ValueError(f"Unknown or closed PyMOL session: {session_id}")
+        return worker
+
+    def call(self, session_id: str, function, *args):
+        """Run a function in the session's worker; a crashed worker ends the session"""
+        worker = self._worker(session_id)
+        try:
+            return worker.call(function, *args)
+        except BrokenProcessPool:
+            with self._condition:
+                self._sessions.pop(session_id, None)
+                self.stats["crashes"] += 1
+                self._condition.notify()
+            worker.shutdown()
+            raise RuntimeError(f"PyMOL session {session_id} crashed and was closed, open a new session")
+
+    def load(self, session_id: str, structure: str, name: str | None = None) -> dict:
+        return self.call(session_id, _load, resolve_structure_path(structure), name or object_name(structure))
+
+    def run(self, session_id: str, commands: list[str]) -> dict:
+        return self.call(session_id, _run_commands, list(commands))
+
+    def render(self, session_id: str, width: int = 1200, height: int = 1200, preset: str | None = DEFAULT_PRESET,
+               output: str | None = None) -> dict:
+        output = output or os.path.join(self.output_dir, f"{session_id}_{uuid.uuid4().hex[:8]}.png")
+        return self.call(session_id, _render, output, int(width), int(height), preset)
+
+    def close(self, session_id: str) -> None:
+        """End a session, resetting its worker and keeping it warm for the next lease"""
+        with self._condition:
+            worker = self._sessions.pop(session_id, None)
+            if worker is None:
+                raise ValueError(f"Unknown or closed PyMOL session: {session_id}")
+            self.stats["closed"] += 1
+        try:
+            worker.call(_reset)
+        except BrokenProcessPool:
+            worker.shutdown()
+            worker = None
+        with self._condition:
+            if worker is not None:
+                self._free.append(worker)
+            self._condition.notify()
+
+    def evict_idle(self) -> int:
+        """Close sessions unused for idle_seconds and stop free workers unused for worker_idle_seconds"""
+        now = time.monotonic()
+        # A limit of 0 or less disables that kind of eviction
+        session_cutoff = now - self.idle_seconds if self.idle_seconds > 0 else float("-inf")
+        worker_cutoff = now - self.worker_idle_seconds if self.worker_idle_seconds > 0 else float("-inf")
+        with self._condition:
+            idle_sessions = [session_id for session_id, worker in self._sessions.items()
+                             if worker is not None and worker.idle_since(session_cutoff)]
+            idle_workers = [worker for worker in self._free if worker.idle_since(worker_cutoff)]
+            self._free = [worker for worker in self._free if not worker.idle_since(worker_cutoff)]
+            for session_id in idle_sessions:
+                idle_workers.append(self._sessions.pop(session_id))
+            self.stats["evicted"] += len(idle_sessions)
+            self.stats["workers_stopped"] += len(idle_workers)
+            if idle_sessions:
+                self._condition.notify_all()
+        for worker in idle_workers:
+            worker.shutdown()
+        return len(idle_sessions) + len(idle_workers)
+
+    def summary(self) -> dict:
+        with self._condition:
+            return {"max_sessions": self.max_sessions, "idle_seconds": self.idle_seconds,
+                    "worker_idle_seconds": self.worker_idle_seconds,
+                    "active": len(self._sessions), "warm_workers": len(self._free), **self.stats}
+
+    def shutdown(self) -> None:
+        with self._condition:
+            workers = [worker for worker in self._sessions.values() if worker is not None] + self._free
+            self._sessions, self._free = {}, []
+        for worker in workers:
+            worker.shutdown()
+
+
+_default_pool = None
+
+
+def default_session_pool() -> SessionPool:
+    """Process-wide session pool sized from the environment"""
+    global _default_pool
+    if _default_pool is None:
+        _default_pool = SessionPool(
+            int(os.environ.get(MAX_SESSIONS_ENV, DEFAULT_MAX_SESSIONS)),
+            float(os.environ.get(IDLE_SECONDS_ENV, DEFAULT_IDLE_SECONDS)),
+        )
+    return _default_pool
@@ -0,0 +1,167 @@
+"""Cross-process registry of memory-mapped structures: lookups without rehashing, holders and eviction."""
+
+import json
+import os
+import tempfile
+import time
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows: registry updates are not serialized across processes
+    fcntl = None
+
+REGISTRY_NAME = "registry.json"
+
+
+def process_token(pid: int) -> str:
+    """Start time of a process from /proc, so a reused PID is not taken for a live holder"""
+    try:
+        with open(f"/proc/{pid}/stat") as handle:
+            return handle.read().rsplit(")", 1)[1].split()[19]
+    except (OSError, IndexError):
+        return ""
+
+
+def process_alive(pid: int, token: str) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return not token or process_token(pid) == token
+
+
+def registry_key(stat_key: tuple) -> str:
+    """Registry key of a (real path, size, modification time) file stat"""
+    return "\0".join(str(part) for part in stat_key)
+
+
+class StructureRegistry:
+    """Cached structures of one directory, shared by the server and all worker processes
+
+    Maps source files to the content digest of their cached arrays, so any process
+    maps an already parsed structure without hashing the file again, and records the
+    processes holding each structure. Holders that exited without releasing, crashed
+    workers included, are dropped on the next update.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.path = os.path.join(directory, REGISTRY_NAME)
+        self._lock_path = self.path + ".lock"
+        self._identity = (None, "")
+
+    def _holder(self) -> tuple[str, str]:
+        """PID and start time of the calling process, looked up again after a fork"""
+        pid = os.getpid()
+        if self._identity[0] != pid:
+            self._identity = (pid, process_token(pid))
+        return str(pid), self._identity[1]
+
+    def _read(self) -> dict:
+        try:
+            with open(self.path) as handle:
+                state = json.load(handle)
+        except (OSError, ValueError):
+            state = {}
+        state.setdefault("files", {})
+        state.setdefault("structures", {})
+        return state
+
+    def _write(self, state: dict) -> None:
+        fd, partial = tempfile.mkstemp(dir=self.directory, suffix=".part")
+        with os.fdopen(fd, "w") as handle:
+            json.dump(state, handle)
+        os.replace(partial, self.path)
+
+    @contextmanager
+    def _update(self):
+        """Registry state under an exclusive lock, written back when the block completes"""
+        with open(self._lock_path, "a") as lock:
+            if fcntl:
+                fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                state = self._read()
+                for entry in state["structures"].values():
+                    entry["holders"] = {pid: token for pid, token in entry["holders"].items()
+                                        if process_alive(int(pid), token)}
+                yield state
+                self._write(state)
+            finally:
+                if fcntl:
+                    fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def lookup(self, key: str) -> str | None:
+        """Digest recorded for a source file, None when it was never parsed"""
+        return self._read()["files"].get(key)
+
+    def record(self, key: str, digest: str, size: int) -> None:
+        """Register a source file's cached structure and hold it for this process"""
+        path = key.split("\0", 1)[0]
+        with self._update() as state:
+            # An earlier version of the same file is never looked up again
+            for stale in [other for other in state["files"] if other.split("\0", 1)[0] == path and other != key]:
+                del state["files"][stale]
+            state["files"][key] = digest
+            entry = state["structures"].setdefault(digest, {"bytes": size, "holders": {}})
+            entry["bytes"] = size
+            entry["last_used"] = time.time()
+            pid, token = self._holder()
+            entry["holders"][pid] = token
+
+    def touch(self, digests) -> None:
+        """Mark structures as just used, moving them to the back of the eviction order"""
+        now = time.time()
+        with self._update() as state:
+            for digest in digests:
+                entry = state["structures"].get(digest)
+                if entry is not None:
+                    entry["last_used"] = now
+
+    def source(self, digest: str) -> str | None:
+        """Path of a source file recorded for a structure"""
+        for key, recorded in self._read()["files"].items():
+            if recorded == digest:
+                return key.split("\0", 1)[0]
+        return None
+
+    def release(self, digests) -> None:
+        """Drop this process's holds on the given structures"""
+        pid, _ = self._holder()
+        with self._update() as state:
+            for digest in digests:
+                entry = state["structures"].get(digest)
+                if entry is not None:
+                    entry["holders"].pop(pid, None)
+
+    def holders(self, digest: str) -> int:
+        """Number of live processes holding a structure"""
+        entry = self._read()["structures"].get(digest)
+        if entry is None:
+            return 0
+        return sum(1 for pid, token in entry["holders"].items() if process_alive(int(pid), token))
+
+    def bytes_stored(self) -> int:
+        return sum(entry["bytes"] for entry in self._read()["structures"].values())
+
+    def evict(self, max_bytes: int, remove) -> list[str]:
+        """Remove least recently used structures no live process holds until the total fits max_bytes"""
+        evicted = []
+        with self._update() as state:
+            structures = state["structures"]
+            total = sum(entry["bytes"] for entry in structures.values())
+            for digest, entry in sorted(structures.items(), key=lambda item: item[1].get("last_used", 0)):
+                if total <= max_bytes:
+                    break
+                if entry["holders"]:
+                    continue
+                remove(digest)
+                del structures[digest]
+                total -= entry["bytes"]
+                evicted.append(digest)
+            if evicted:
+                gone = set(evicted)
+                state["files"] = {key: digest for key, digest in state["files"].items() if digest not in gone}
+        return evicted
@@ -0,0 +1,83 @@
+"""Uniform cell grid for fixed-radius neighbour queries on coordinate arrays."""
+
+import numpy as np
+
+# The 27 neighbouring cell offsets (including the cell itself)
+_OFFSETS = np.array(
+    [(i, j, k) for i in (-1, 0, 1) for j in (-1, 0, 1) for k in (-1, 0, 1)],
+    dtype=np.int64,
+)
+
+# Number of query points processed per block, bounds temporary memory
+_QUERY_BLOCK = 65536
+
+
+class CellGrid:
+    """Points binned into cubic cells whose edge equals the search radius"""
+
+    def __init__(self, coords, cell_size: float):
+        if cell_size <= 0:
+            raise ValueError("cell_size must be positive")
+        self.coords = np.ascontiguousarray(coords, dtype=np.float32).reshape(-1, 3)
+        self.cell_size = float(cell_size)
+
+        if len(self.coords):
+            self.origin = self.coords.min(axis=0).astype(np.float64) - self.cell_size
+        else:
+            self.origin = np.zeros(3)
+        cells = self._cells(self.coords)
+        self.shape = (cells.max(axis=0) + 2) if len(cells) else np.ones(3, dtype=np.int64)
+
+        keys = self._keys(cells)
+        self.order = np.argsort(keys, kind="stable")
+        self.sorted_keys = keys[self.order]
+
+    def _cells(self, points) -> np.ndarray:
+        return np.floor((points - self.origin) / self.cell_size).astype(np.int64)
+
+    def _keys(self, cells) -> np.ndarray:
+        return (cells[:, 0] * self.shape[1] + cells[:, 1]) * self.shape[2] + cells[:, 2]
+
+    def _candidates(self, cells):
+        """Yield (query index, grid index) candidate arrays for each neighbour offset"""
+        for offset in _OFFSETS:
+            shifted = cells + offset
+            inside = np.all((shifted >= 0) & (shifted < self.shape), axis=1)
+            query = np.nonzero(inside)[0]
+            if not len(query):
+                continue
+            keys = self._keys(shifted[query])
+            lo = np.searchsorted(self.sorted_keys, keys, side="left")
+            hi = np.searchsorted(self.sorted_keys, keys, side="right")
+            counts = hi - lo
+            total = int(counts.sum())
+            if not total:
+                continue
+            # Expand each [lo, hi) range into explicit positions without a Python loop
+            starts = np.repeat(lo - (np.cumsum(counts) - counts), counts)
+            positions = starts + np.arange(total)
+            yield np.repeat(query, counts), self.order[positions]
+
+    def query(self, points, cutoff: float | None = None):
+        """Return (i, j, distance) for every points[i] within cutoff of coords[j]"""
+        cutoff = self.cell_size if cutoff is None else float(cutoff)
+        if cutoff > self.cell_size:
+            raise ValueError("cutoff must not exceed the grid cell size")
+        points = np.ascontiguousarray(points, dtype=np.float32).reshape(-1, 3)
+        cutoff_sq = cutoff * cutoff
+
+        found_i, found_j, found_d = [], [], []
+        for block_start in range(0, len(points), _QUERY_BLOCK):
+            block = points[block_start:block_start + _QUERY_BLOCK]
+            for qi, gj in self._candidates(self._cells(block)):
+                delta = block[qi] - self.coords[gj]
+                dist_sq = np.einsum("ij,ij->i", delta, delta)
+                keep = dist_sq <= cutoff_sq
+                found_i.append(qi[keep] + block_start)
+                found_j.append(gj[keep])
+                found_d.append(np.sqrt(dist_sq[keep]))
+
+        if not found_i:
+            empty = np.empty(0, dtype=np.int64)
+            return empty, empty.copy(), np.empty(0, dtype=np.float32)
+        return np.concatenate(found_i), np.concatenate(found_j), np.concatenate(found_d)
@@ -0,0 +1,252 @@
+"""Structure parsing into structure-of-arrays form for server-side analysis."""
+
+import gzip
+import re
+from dataclasses import dataclass, fields
+
+import numpy as np
+
+WATER_RESIDUES = frozenset({"HOH", "WAT", "DOD", "H2O", "TIP3", "SOL"})
+CIF_SUFFIXES = (".cif", ".mmcif", ".cif.gz", ".mmcif.gz")
+PRIMARY_ALTLOCS = ("", " ", "A", "1")
+
+# Per-atom arrays and the string table each code array indexes into
+CODE_TABLES = {
+    "chain_codes": "chain_table",
+    "resi_codes": "resi_table",
+    "resn_codes": "resn_table",
+    "name_codes": "name_table",
+    "element_codes": "element_table",
+}
+
+
+@dataclass
+class Structure:
+    """Atoms of one model as parallel arrays with interned string codes"""
+
+    coords: np.ndarray         # (N, 3) float32
+    chain_codes: np.ndarray    # (N,) int32 index into chain_table
+    resi_codes: np.ndarray     # (N,) int32 index into resi_table (PyMOL resi incl. insertion code)
+    resn_codes: np.ndarray     # (N,) int32 index into resn_table
+    name_codes: np.ndarray     # (N,) int32 index into name_table
+    element_codes: np.ndarray  # (N,) int32 index into element_table
+    hetatm: np.ndarray         # (N,) bool, True for HETATM records
+    chain_table: list[str]
+    resi_table: list[str]
+    resn_table: list[str]
+    name_table: list[str]
+    element_table: list[str]
+
+    def __len__(self) -> int:
+        return len(self.coords)
+
+    def arrays(self) -> dict[str, np.ndarray]:
+        """Per-atom arrays by field name"""
+        return {f.name: getattr(self, f.name) for f in fields(self) if not f.name.endswith("_table")}
+
+    def tables(self) -> dict[str, list[str]]:
+        """String tables by field name"""
+        return {f.name: getattr(self, f.name) for f in fields(self) if f.name.endswith("_table")}
+
+    def codes_for(self, table: str, values) -> np.ndarray:
+        """Codes of the given strings in a table, unknown strings are ignored"""
+        wanted = set(values)
+        return np.array([code for code, value in enumerate(getattr(self, table)) if value in wanted],
+                        dtype=np.int32)
+
+    def decode(self, field: str, indices=None) -> np.ndarray:
+        """String values of a code field, optionally for a subset of atoms"""
+        codes = getattr(self, field)
+        if indices is not None:
+            codes = codes[indices]
+        return np.asarray(getattr(self, CODE_TABLES[field]), dtype=str)[codes]
+
+    def atom(self, index: int) -> dict:
+        """JSON-friendly description of one atom"""
+        return {
+            "chain": self.chain_table[self.chain_codes[index]],
+            "resi": self.resi_table[self.resi_codes[index]],
+            "resn": self.resn_table[self.resn_codes[index]],
+            "name": self.name_table[self.name_codes[index]],
+        }
+
+    def residue_index(self) -> tuple[np.ndarray, np.ndarray]:
+        """Residue number of each atom (0-based, file order) and the first atom of each residue"""
+        keys = self.chain_codes.astype(np.int64) * len(self.resi_table) + self.resi_codes
+        _, first, inverse = np.unique(keys, return_index=True, return_inverse=True)
+        order = np.argsort(first, kind="stable")
+        rank = np.empty_like(order)
+        rank[order] = np.arange(len(order))
+        return rank[inverse.reshape(-1)], first[order]
+
+    def select_chains(self, chains) -> np.ndarray:
+        """Indices of non-water atoms on any of the given chains"""
+        mask = np.isin(self.chain_codes, self.codes_for("chain_table", chains))
+        mask &= ~np.isin(self.resn_codes, self.codes_for("resn_table", WATER_RESIDUES))
+        return np.nonzero(mask)[0]
+
+
+class _Interner:
+    """Assigns consecutive integer codes to strings in first-seen order"""
+
+    def __init__(self):
+        self.codes = {}
+        self.values = []
+
+    def __call__(self, value: str) -> int:
+        code = self.codes.get(value)
+        if code is None:
+            code = self.codes[value] = len(self.values)
+            self.values.append(value)
+        return code
+
+
+class _Builder:
+    """Accumulates atom records and interns their string fields"""
+
+    def __init__(self):
+        self.coords = []
+        self.hetatm = []
+        self.columns = {field: [] for field in CODE_TABLES}
+        self.interners = {field: _Interner() for field in CODE_TABLES}
+
+    def add(self, x, y, z, chain, resi, resn, name, element, hetatm):
+        self.coords.append((x, y, z))
+        self.hetatm.append(hetatm)
+        for field, value in zip(CODE_TABLES, (chain, resi, resn, name, element)):
+            self.columns[field].append(self.interners[field](value))
+
+    def build(self) -> Structure:
+        codes = {field: np.array(values, dtype=np.int32) for field, values in self.columns.items()}
+        tables = {table: self.interners[field].values for field, table in CODE_TABLES.items()}
+        return Structure(
+            coords=np.array(self.coords, dtype=np.float32).reshape(-1, 3),
+            hetatm=np.array(self.hetatm, dtype=bool),
+            **codes,
+            **tables,
+        )
+
+
+def open_text(path: str):
+    """Open a possibly gzip-compressed text file"""
+    if path.endswith(".gz"):
+        return gzip.open(path, "rt", errors="replace")
+    return open(path, "r", errors="replace")
+
+
+def pdb_atom(line: str) -> tuple | None:
+    """Builder fields of an ATOM/HETATM line, None for other records and alternate locations"""
+    record = line[:6]
+    if record != "ATOM  " and record != "HETATM":
+        return None
+    # Keep only the primary alternate location
+    if line[16] not in PRIMARY_ALTLOCS:
+        return None
+    name = line[12:16].strip()
+    element = line[76:78].strip() if len(line) > 76 else ""
+    return (
+        float(line[30:38]), float(line[38:46]), float(line[46:54]),
+        line[21].strip(), line[22:27].strip(), line[17:20].strip(), name,
+        element or name.lstrip("0123456789")[:1],
+        record == "HETATM",
+    )
+
+
+def parse_pdb(path: str) -> Structure:
+    """Parse ATOM/HETATM records of the first model in a PDB file"""
+    builder = _Builder()
+    with open_text(path) as handle:
+        for line in handle:
+            if line[:6] == "ENDMDL":
+                break
+            atom = pdb_atom(line)
+            if atom:
+                builder.add(*atom)
+    return builder.build()
+
+
+_CIF_TOKEN = re.compile(r"'[^']*'(?=\s|$)|\"[^\"]*\"(?=\s|$)|\S+")
+
+
+def _cif_tokens(line: str) -> list[str]:
+    if "'" not in line and '"' not in line:
+        return line.split()
+    return [token[1:-1] if token[0] in "'\"" else token for token in _CIF_TOKEN.findall(line)]
+
+
+def _cif_value(row: list[str], column: int | None, default: str = "") -> str:
+    if column is None:
+        return default
+    value = row[column]
+    return default if value in (".", "?") else value
+
+
+def _atom_site_columns(columns: list[str]) -> dict[str, int | None]:
+    """Column positions of the _atom_site items used, preferring author numbering"""
+    position = {name: i for i, name in enumerate(columns)}
+    pick = lambda *names: next((position[n] for n in names if n in position), None)
+    return {
+        "group": pick("group_PDB"),
+        "alt": pick("label_alt_id"),
+        "chain": pick("auth_asym_id", "label_asym_id"),
+        "seq": pick("auth_seq_id", "label_seq_id"),
+        "ins": pick("pdbx_PDB_ins_code"),
+        "resn": pick("auth_comp_id", "label_comp_id"),
+        "name": pick("auth_atom_id", "label_atom_id"),
+        "element": pick("type_symbol"),
+        "model": pick("pdbx_PDB_model_num"),
+        "x": pick("Cartn_x"),
+        "y": pick("Cartn_y"),
+        "z": pick("Cartn_z"),
+    }
+
+
+def cif_atom(row: list[str], c: dict) -> tuple | None:
+    """Builder fields of an _atom_site row, None for alternate locations"""
+    if _cif_value(row, c["alt"]) not in PRIMARY_ALTLOCS:
+        return None
+    name = _cif_value(row, c["name"])
+    return (
+        float(row[c["x"]]), float(row[c["y"]]), float(row[c["z"]]),
+        _cif_value(row, c["chain"]), _cif_value(row, c["seq"]) + _cif_value(row, c["ins"]),
+        _cif_value(row, c["resn"]), name,
+        _cif_value(row, c["element"]) or name[:1],
+        _cif_value(row, c["group"]) == "HETATM",
+    )
+
+
+def parse_mmcif(path: str) -> Structure:
+    """Parse the _atom_site loop of the first model in an mmCIF file"""
+    builder = _Builder()
+    columns = []
+    c = None
+    first_model = None
+    with open_text(path) as handle:
+        for line in handle:
+            if line.startswith("_atom_site."):
+                columns.append(line.split()[0][len("_atom_site."):])
+                continue
+            if not columns or not line.strip():
+                continue
+            if line.startswith(("loop_", "_", "#", "data_")):
+                break
+
+            row = _cif_tokens(line)
+            if len(row) < len(columns):
+                continue
+            if c is None:
+                c = _atom_site_columns(columns)
+                first_model = _cif_value(row, c["model"], "1")
+            if _cif_value(row, c["model"], "1") != first_model:
+                break
+            atom = cif_atom(row, c)
+            if atom:
+                builder.add(*atom)
+    return builder.build()
+
+
+def parse_structure(path: str) -> Structure:
+    """Parse a PDB or mmCIF file chosen by file extension"""
+    if path.lower().endswith(CIF_SUFFIXES):
+        return parse_mmcif(path)
+    return parse_pdb(path)
@@ -0,0 +1,334 @@
+"""Memory-mapped binary cache of parsed structures keyed by file content hash."""
+
+import atexit
+import hashlib
+import json
+import os
+import struct
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+from .config import cache_dir
+from .chain_index import default_chain_loader, lazy_threshold
+from .fetch import resolve_structure_path
+from .shared_store import StructureRegistry, registry_key
+from .structure import Structure, parse_structure
+from .summary import structure_summary
+from .tracing import span
+
+MAX_BYTES_ENV = "PYMOL_VIS_STRUCTURE_CACHE_BYTES"
+DEFAULT_MAX_BYTES = 4 * 1024 ** 3
+MAPPED_BYTES_ENV = "PYMOL_VIS_MAPPED_BYTES"
+DEFAULT_MAPPED_BYTES = 1024 ** 3
+# Hits refresh a structure's last use in the shared registry at most this often
+TOUCH_RESOLUTION = 60.0
+# Files whose content digest is remembered by path, size and modification time
+DIGEST_MEMO_SIZE = 1024
+MAGIC = b"PMVSOA01"
+ALIGNMENT = 64
+_HEADER = struct.Struct("<8sQ")
+
+
+def file_digest(path: str) -> str:
+    """SHA-256 of a file's contents"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as handle:
+        for block in iter(lambda: handle.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+_digests = OrderedDict()
+_digests_lock = threading.Lock()
+
+
+def content_digest(path: str) -> str:
+    """file_digest memoized by path, size and modification time, for the most recently used files"""
+    stat = os.stat(path)
+    stat_key = (os.path.realpath(path), stat.st_size, stat.st_mtime_ns)
+    with _digests_lock:
+        digest = _digests.get(stat_key)
+        if digest is not None:
+            _digests.move_to_end(stat_key)
+    if digest is None:
+        digest = file_digest(path)
+        with _digests_lock:
+            _digests[stat_key] = digest
+            while len(_digests) > DIGEST_MEMO_SIZE:
+                _digests.popitem(last=False)
+    return digest
+
+
+def _aligned(offset: int) -> int:
+    return (offset + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
+
+
+def write_structure(path: str, structure: Structure) -> None:
+    """Write a structure as header JSON followed by aligned raw arrays"""
+    arrays = {name: np.ascontiguousarray(array) for name, array in structure.arrays().items()}
+    layout = {}
+    offset = 0
+    for name, array in arrays.items():
+        layout[name] = {"dtype": array.dtype.str, "shape": list(array.shape), "offset": offset}
+        offset = _aligned(offset + array.nbytes)
+    header = json.dumps({"arrays": layout, "tables": structure.tables()}).encode()
+    data_start = _aligned(_HEADER.size + len(header))
+
+    # Write under a temporary name so readers never map a partial file
+    fd, partial = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".part")
+    try:
+        with os.fdopen(fd, "wb") as handle:
+            handle.write(_HEADER.pack(MAGIC, len(header)))
+            handle.write(header)
+            for name, array in arrays.items():
+                handle.seek(data_start + layout[name]["offset"])
+                handle.write(array.tobytes())
+        os.replace(partial, path)
+    except BaseException:
+        os.unlink(partial)
+        raise
+
+
+def write_json(path: str, content: dict) -> None:
+    """Write JSON under a temporary name and move it into place"""
+    fd, partial = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".part")
+    try:
+        with os.fdopen(fd, "w") as handle:
+            json.dump(content, handle)
+        os.replace(partial, path)
+    except BaseException:
+        os.unlink(partial)
+        raise
+
+
+def read_structure(path: str) -> Structure:
+    """Map a cached structure file, arrays are read-only views of the mapping"""
+    with open(path, "rb") as handle:
+        magic, header_size = _HEADER.unpack(handle.read(_HEADER.size))
+        if magic != MAGIC:
+            raise ValueError(f"Not a structure cache file: {path}")
+        header = json.loads(handle.read(header_size))
+    data_start = _aligned(_HEADER.size + header_size)
+
+    mapping = np.memmap(path, dtype=np.uint8, mode="r")
+    arrays = {}
+    for name, spec in header["arrays"].items():
+        dtype = np.dtype(spec["dtype"])
+        count = int(np.prod(spec["shape"], dtype=np.int64))
+        start = data_start + spec["offset"]
+        arrays[name] = np.frombuffer(mapping, dtype=dtype, count=count, offset=start).reshape(spec["shape"])
+    return Structure(**arrays, **header["tables"])
+
+
+class StructureCache:
+    """Parsed structures on disk by content hash, plus an in-process index by file stat
+
+    Each cached structure has a JSON summary next to its arrays, written when the
+    file is parsed. Structures are memory-mapped read-only, so every process loading
+    the same file shares one copy of its arrays in the page cache; the registry lets
+    processes find them without hashing the file and keeps structures that a live
+    process holds out of eviction. A process holds the structures in its index, which
+    keeps the most recently used up to max_mapped_bytes.
+    """
+
+    def __init__(self, directory: str, max_bytes: int = DEFAULT_MAX_BYTES,
+                 max_mapped_bytes: int = DEFAULT_MAPPED_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.max_mapped_bytes = max_mapped_bytes
+        os.makedirs(directory, exist_ok=True)
+        self.registry = StructureRegistry(directory)
+        self._loaded = OrderedDict()  # stat key -> (digest, structure, bytes)
+        self._mapped_bytes = 0
+        self._sources = {}
+        self._summaries = {}
+        self._held = set()
+        self._touched = {}  # digest -> time its last use was written to the registry
+        self._lock = threading.Lock()
+
+    def path_for(self, digest: str) -> str:
+        return os.path.join(self.directory, f"{digest}.soa")
+
+    def summary_path_for(self, digest: str) -> str:
+        return os.path.join(self.directory, f"{digest}.summary.json")
+
+    def load(self, source_path: str) -> Structure:
+        """Structure arrays for a PDB/mmCIF file, parsing it only on a cache miss"""
+        stat = os.stat(source_path)
+        stat_key = (os.path.realpath(source_path), stat.st_size, stat.st_mtime_ns)
+        now = time.time()
+        with self._lock:
+            entry = self._loaded.get(stat_key)
+            if entry is not None:
+                self._loaded.move_to_end(stat_key)
+                digest, structure, _ = entry
+                touch = now - self._touched.get(digest, 0) > TOUCH_RESOLUTION
+                if touch:
+                    self._touched[digest] = now
+        if entry is not None:
+            if touch:
+                self.registry.touch([digest])
+            return structure
+
+        with span("structure.load", file=os.path.basename(source_path)) as traced:
+            key = registry_key(stat_key)
+            digest = self.registry.lookup(key)
+            registry_hit = digest is not None and os.path.isfile(self.path_for(digest))
+            if not registry_hit:
+                digest = content_digest(source_path)
+            cache_path = self.path_for(digest)
+            cache_hit = os.path.isfile(cache_path)
+            if not cache_hit:
+                parsed = parse_structure(source_path)
+                write_structure(cache_path, parsed)
+                write_json(self.summary_path_for(digest), structure_summary(parsed))
+            structure = read_structure(cache_path)
+            size = os.path.getsize(cache_path)
+            self._hold(key, digest, size)
+            if not cache_hit:
+                self.evict()
+            traced.set(cache_hit=cache_hit, registry_hit=registry_hit, atoms=len(structure))
+        with self._lock:
+            previous = self._loaded.pop(stat_key, None)
+            if previous is not None:
+                self._mapped_bytes -= previous[2]
+            self._loaded[stat_key] = (digest, structure, size)
+            self._mapped_bytes += size
+            self._sources[digest] = source_path
+            dropped = self._shrink()
+        if dropped:
+            self.registry.release(dropped)
+        return structure
+
+    def _hold(self, key: str, digest: str, size: int) -> None:
+        """Record the structure in the registry as held by this process"""
+        self.registry.record(key, digest, size)
+        with self._lock:
+            if not self._held:
+                atexit.register(self.release)
+            self._held.add(digest)
+            self._touched[digest] = time.time()
+
+    def _shrink(self) -> list[str]:
+        """Forget least recently used structures beyond max_mapped_bytes, returning the digests no longer held"""
+        dropped = []
+        while self._mapped_bytes > self.max_mapped_bytes and len(self._loaded) > 1:
+            _, (digest, _, size) = self._loaded.popitem(last=False)
+            self._mapped_bytes -= size
+            # The same content may be loaded from several files
+            if any(entry[0] == digest for entry in self._loaded.values()):
+                continue
+            dropped.append(digest)
+            self._held.discard(digest)
+            for table in (self._sources, self._summaries, self._touched):
+                table.pop(digest, None)
+        return dropped
+
+    def release(self) -> None:
+        """Drop this process's holds, structures already mapped stay readable"""
+        with self._lock:
+            held, self._held = self._held, set()
+        if held:
+            self.registry.release(held)
+
+    def _remove(self, digest: str) -> None:
+        for path in (self.path_for(digest), self.summary_path_for(digest)):
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+        with self._lock:
+            self._summaries.pop(digest, None)
+
+    def stats(self) -> dict:
+        """Structures mapped and held by this process and the bytes stored for all processes"""
+        with self._lock:
+            loaded, held, mapped = len(self._loaded), len(self._held), self._mapped_bytes
+        return {"loaded": loaded, "held": held, "mapped_bytes": mapped, "max_mapped_bytes": self.max_mapped_bytes,
+                "bytes_stored": self.registry.bytes_stored(), "max_bytes": self.max_bytes}
+
+    def evict(self) -> list[str]:
+        """Delete least recently used structures that no live process holds, until the cache fits max_bytes"""
+        return self.registry.evict(self.max_bytes, self._remove)
+
+    def loaded(self) -> dict[str, str]:
+        """Source file of every structure mapped by this process, by content digest"""
+        with self._lock:
+            return dict(self._sources)
+
+    def source(self, digest: str) -> str | None:
+        """Source file of a cached structure, from this process or any other that loaded it"""
+        with self._lock:
+            path = self._sources.get(digest)
+        return path if path is not None else self.registry.source(digest)
+
+    def summary(self, digest: str) -> dict:
+        """Summary of a cached structure, computed from its arrays if it predates summaries"""
+        with self._lock:
+            summary = self._summaries.get(digest)
+        if summary is not None:
+            return summary
+        summary_path = self.summary_path_for(digest)
+        if os.path.isfile(summary_path):
+            with open(summary_path) as handle:
+                summary = json.load(handle)
+        elif os.path.isfile(self.path_for(digest)):
+            summary = structure_summary(read_structure(self.path_for(digest)))
+            write_json(summary_path, summary)
+        else:
+            raise ValueError(f"No cached structure with digest {digest}")
+        with self._lock:
+            self._summaries[digest] = summary
+        return summary
+
+
+_default_cache = None
+
+
+def default_cache() -> StructureCache:
+    """Process-wide cache in the configured cache directory"""
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = StructureCache(
+            cache_dir("structures"),
+            max_bytes=int(os.environ.get(MAX_BYTES_ENV, DEFAULT_MAX_BYTES)),
+            max_mapped_bytes=int(os.environ.get(MAPPED_BYTES_ENV, DEFAULT_MAPPED_BYTES)),
+        )
+    return _default_cache
+
+
+def load_structure(structure: str) -> Structure:
+    """Load atom arrays for a file path or PDB ID through the binary cache"""
+    return default_cache().load(resolve_structure_path(structure))
+
+
+def load_structure_summary(structure: str) -> dict:
+    """Summary of a file path or PDB ID, parsing it through the binary cache on first use"""
+    path = resolve_structure_path(structure)
+    cache = default_cache()
+    cache.load(path)
+    return cache.summary(content_digest(path))
+
+
+def load_structure_chains(structure: str, chains) -> Structure:
+    """Atom arrays covering at least the given chains
+
+    Files above the lazy-loading threshold are indexed by chain and only the
+    requested chains are parsed, smaller files go through the full binary cache.
+    """
+    path = resolve_structure_path(structure)
+    if os.path.getsize(path) < lazy_threshold():
+        return default_cache().load(path)
+    return default_chain_loader().load(path, chains)
+
+
+def structure_atom_count(structure: str) -> int:
+    """Number of atoms in the first model, from the chain index for very large files"""
+    path = resolve_structure_path(structure)
+    if os.path.getsize(path) >= lazy_threshold() and not path.endswith(".gz"):
+        return default_chain_loader().index(path).atom_count
+    return len(default_cache().load(path))
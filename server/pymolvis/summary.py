@@ -0,0 +1,111 @@
+"""Structure summaries for planning: chains, residue ranges, numbering gaps, hetero groups and extent."""
+
+import re
+
+import numpy as np
+
+from .structure import WATER_RESIDUES, Structure
+
+# Hetero groups listed one by one, beyond this only the counts per residue name are complete
+MAX_HETERO_GROUPS = 200
+# Atom names marking a HETATM residue as a modified residue of the polymer (amino acid, nucleotide)
+POLYMER_BACKBONES = (("N", "CA", "C"), ("P", "C4'"))
+_NUMBER = re.compile(r"-?\d+")
+
+
+def _resi_numbers(resi_table: list[str]) -> np.ndarray:
+    """Integer part of each residue number, insertion codes dropped"""
+    numbers = [_NUMBER.match(resi) for resi in resi_table]
+    return np.array([int(match.group()) if match else 0 for match in numbers], dtype=np.int64)
+
+
+def _has_atoms(structure: Structure, residue_of: np.ndarray, n_residues: int, names) -> np.ndarray:
+    """Per residue, whether it has an atom of every given name"""
+    found = np.ones(n_residues, dtype=bool)
+    for name in names:
+        atoms = np.isin(structure.name_codes, structure.codes_for("name_table", [name]))
+        found &= np.bincount(residue_of[atoms], minlength=n_residues) > 0
+    return found
+
+
+def structure_summary(structure: Structure) -> dict:
+    """Chains with residue counts, ranges and numbering gaps, hetero groups, atom count and bounding box
+
+    Built from the parsed arrays in a few vectorized passes, so the summary never
+    needs a second read of the file or a PyMOL query.
+    """
+    residue_of, first_atoms = structure.residue_index()
+    n_residues = len(first_atoms)
+    atom_counts = np.bincount(residue_of, minlength=n_residues)
+    chains = structure.chain_codes[first_atoms]
+    resi_codes = structure.resi_codes[first_atoms]
+    resn_codes = structure.resn_codes[first_atoms]
+    water = np.isin(resn_codes, structure.codes_for("resn_table", WATER_RESIDUES))
+    backbone = np.zeros(n_residues, dtype=bool)
+    for names in POLYMER_BACKBONES:
+        backbone |= _has_atoms(structure, residue_of, n_residues, names)
+    hetatm = structure.hetatm[first_atoms]
+    polymer = ~water & (~hetatm | backbone)
+    hetero = ~water & ~polymer
+
+    # Numbering gaps between consecutive polymer residues of a chain, in file order
+    numbers = _resi_numbers(structure.resi_table)[resi_codes]
+    polymer_at = np.flatnonzero(polymer)
+    jumps = np.flatnonzero((chains[polymer_at[1:]] == chains[polymer_at[:-1]])
+                           & (np.diff(numbers[polymer_at]) > 1))
+
+    summary_chains = {}
+    chain_atoms = np.bincount(structure.chain_codes, minlength=len(structure.chain_table))
+    for code in np.unique(chains).tolist():
+        in_chain = chains == code
+        residues = np.flatnonzero(in_chain & polymer)
+        summary_chains[structure.chain_table[code]] = {
+            "atoms": int(chain_atoms[code]),
+            "residues": int(len(residues)),
+            "first": structure.resi_table[resi_codes[residues[0]]] if len(residues) else None,
+            "last": structure.resi_table[resi_codes[residues[-1]]] if len(residues) else None,
+            "gaps": [],
+            "modified_residues": int(np.count_nonzero(in_chain & polymer & hetatm)),
+            "hetero_groups": int(np.count_nonzero(in_chain & hetero)),
+            "waters": int(np.count_nonzero(in_chain & water)),
+        }
+    for jump in jumps.tolist():
+        before, after = polymer_at[jump], polymer_at[jump + 1]
+        summary_chains[structure.chain_table[chains[before]]]["gaps"].append({
+            "after": structure.resi_table[resi_codes[before]],
+            "before": structure.resi_table[resi_codes[after]],
+            "missing": int(numbers[after] - numbers[before] - 1),
+        })
+
+    hetero_at = np.flatnonzero(hetero)
+    names, counts = np.unique(resn_codes[hetero_at], return_counts=True)
+    groups = [{
+        "chain": structure.chain_table[chains[residue]],
+        "resi": structure.resi_table[resi_codes[residue]],
+        "resn": structure.resn_table[resn_codes[residue]],
+        "atoms": int(atom_counts[residue]),
+    } for residue in hetero_at[:MAX_HETERO_GROUPS].tolist()]
+
+    bounding_box = None
+    if len(structure):
+        low = structure.coords.min(axis=0).astype(np.float64)
+        high = structure.coords.max(axis=0).astype(np.float64)
+        bounding_box = {
+            "min": np.round(low, 3).tolist(),
+            "max": np.round(high, 3).tolist(),
+            "center": np.round((low + high) / 2, 3).tolist(),
+            "size": np.round(high - low, 3).tolist(),
+        }
+
+    return {
+        "atom_count": len(structure),
+        "hetatm_count": int(np.count_nonzero(structure.hetatm)),
+        "residue_count": int(np.count_nonzero(polymer)),
+        "water_count": int(np.count_nonzero(water)),
+        "chains": summary_chains,
+        "hetero_group_count": int(len(hetero_at)),
+        "hetero_residue_names": {structure.resn_table[code]: int(count)
+                                 for code, count in zip(names.tolist(), counts.tolist())},
+        "hetero_groups": groups,
+        "bounding_box": bounding_box,
+    }
@@ -0,0 +1,258 @@
+"""Batch Kabsch superposition of models onto the receptor chains of a reference structure."""
+
+import math
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import NamedTuple
+
+import numpy as np
+
+from .render_pool import object_name, silence_output
+from .sasa import HYDROGENS
+from .structure_cache import load_structure_chains
+
+# Atom names fitted for each atom set, None fits every heavy atom
+ATOM_SETS = {"CA": ("CA",), "backbone": ("N", "CA", "C", "O"), "heavy": None}
+DEFAULT_ATOM_SET = "CA"
+MIN_MATCHED = 3
+# Fewer models load faster in this process than through worker processes
+PARALLEL_MIN_MODELS = 8
+# PyMOL's default field_of_view, a negative last set_view value means perspective
+FIELD_OF_VIEW = 20.0
+
+
+class FitAtoms(NamedTuple):
+    """Fitted atoms of one structure with the string tables their residue and name codes index"""
+
+    positions: np.ndarray   # (N,) position of the atom's chain in the fitted chain list
+    resi_codes: np.ndarray  # (N,) index into resi_table
+    name_codes: np.ndarray  # (N,) index into name_table
+    resi_table: list[str]
+    name_table: list[str]
+    coords: np.ndarray      # (N, 3) float64
+
+    def keys(self, vocabulary: dict) -> np.ndarray:
+        """int64 matching key per atom, residue and atom names numbered through a shared vocabulary"""
+        resi_ids = np.array([vocabulary.setdefault(resi, len(vocabulary)) for resi in self.resi_table], dtype=np.int64)
+        name_ids = np.array([vocabulary.setdefault(name, len(vocabulary)) for name in self.name_table], dtype=np.int64)
+        return (self.positions.astype(np.int64) << 56) | (resi_ids[self.resi_codes] << 28) | name_ids[self.name_codes]
+
+
+def fit_atoms(structure: str, chains: list[str], atom_set: str = DEFAULT_ATOM_SET) -> FitAtoms:
+    """Fitted atoms on the given chains of a structure
+
+    Atoms are keyed by their chain's position in the list instead of its identifier, so
+    models whose receptor chains are named differently still match the reference.
+    """
+    if atom_set not in ATOM_SETS:
+        raise ValueError(f"Unknown atom set '{atom_set}' (expected one of {', '.join(ATOM_SETS)})")
+    parsed = load_structure_chains(structure, chains)
+    indices = parsed.select_chains(chains)
+    names = ATOM_SETS[atom_set]
+    if names is None:
+        mask = ~np.isin(parsed.element_codes[indices], parsed.codes_for("element_table", HYDROGENS))
+    else:
+        mask = np.isin(parsed.name_codes[indices], parsed.codes_for("name_table", names))
+    indices = indices[mask]
+
+    positions = np.zeros(len(parsed.chain_table), dtype=np.int8)
+    for position, chain in enumerate(chains):
+        positions[parsed.codes_for("chain_table", [chain])] = position
+    return FitAtoms(positions[parsed.chain_codes[indices]], parsed.resi_codes[indices], parsed.name_codes[indices],
+                    parsed.resi_table, parsed.name_table, parsed.coords[indices].astype(np.float64))
+
+
+def kabsch(mobile: np.ndarray, target: np.ndarray, counts: np.ndarray) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Rotations (M, 3, 3), translations (M, 3) and RMSDs (M,) fitting each segment of mobile onto target
+
+    mobile and target are (P, 3) arrays of matched atoms, concatenated over M models
+    of counts[m] atoms each. Covariances are accumulated per model with bincount and
+    go through one batched SVD; the RMSD follows from the singular values, so no
+    per-atom (P, 3, 3) temporaries are needed.
+    """
+    segment = np.repeat(np.arange(len(counts)), counts)
+
+    def sums(values):
+        return np.bincount(segment, weights=values, minlength=len(counts))
+
+    mobile_centres = np.stack([sums(mobile[:, axis]) for axis in range(3)], axis=1) / counts[:, None]
+    target_centres = np.stack([sums(target[:, axis]) for axis in range(3)], axis=1) / counts[:, None]
+    mobile_centred = mobile - mobile_centres[segment]
+    target_centred = target - target_centres[segment]
+    covariances = np.empty((len(counts), 3, 3))
+    for row in range(3):
+        for column in range(3):
+            covariances[:, row, column] = sums(mobile_centred[:, row] * target_centred[:, column])
+
+    u, singular, vt = np.linalg.svd(covariances)
+    # Flip the weakest axis where the optimal orthogonal matrix would be a reflection
+    signs = np.sign(np.linalg.det(u) * np.linalg.det(vt))
+    vt[:, 2, :] *= signs[:, None]
+    singular[:, 2] *= signs
+    rotations = np.swapaxes(vt, 1, 2) @ np.swapaxes(u, 1, 2)
+    translations = target_centres - np.einsum("mij,mj->mi", rotations, mobile_centres)
+
+    spread = sums(np.einsum("pi,pi->p", mobile_centred, mobile_centred) + np.einsum("pi,pi->p", target_centred, target_centred))
+    rmsd = np.sqrt(np.maximum(spread - 2 * singular.sum(axis=1), 0) / counts)
+    return rotations, translations, rmsd
+
+
+def homogeneous(rotation: np.ndarray, translation: np.ndarray) -> list[float]:
+    """Row-major 4x4 homogeneous matrix as 16 floats"""
+    matrix = np.eye(4)
+    matrix[:3, :3] = rotation
+    matrix[:3, 3] = translation
+    return [round(value, 6) for value in matrix.ravel().tolist()]
+
+
+def shared_view(coords: np.ndarray) -> list[float]:
+    """set_view matrix looking down the principal axes of coords, framing all of them
+
+    Equivalent to orienting on the reference receptor, so every superposed model can
+    be rendered from the same camera.
+    """
+    centre = coords.mean(axis=0)
+    centred = coords - centre
+    _, vectors = np.linalg.eigh(centred.T @ centred)
+    axes = vectors[:, ::-1].copy()
+    axes[:, 2] = np.cross(axes[:, 0], axes[:, 1])
+    radius = max(float(np.sqrt(np.einsum("ij,ij->i", centred, centred).max())), 1.0)
+    distance = radius / math.tan(math.radians(FIELD_OF_VIEW / 2))
+    # The first nine values hold the camera axes in model space as columns
+    view = axes.ravel().tolist() + [0.0, 0.0, -distance] + centre.tolist()
+    view += [distance - radius, distance + radius, -FIELD_OF_VIEW]
+    return [round(value, 4) for value in view]
+
+
+def _unique_names(models: list[str], taken: set[str]) -> list[str]:
+    names = []
+    for model in models:
+        name, suffix = object_name(model), 2
+        while name in taken:
+            name, suffix = f"{object_name(model)}_{suffix}", suffix + 1
+        taken.add(name)
+        names.append(name)
+    return names
+
+
+def _load_fit_atoms(structure: str, chains: list[str], atom_set: str) -> FitAtoms | str:
+    try:
+        return fit_atoms(structure, chains, atom_set)
+    except (OSError, ValueError) as error:
+        return f"{type(error).__name__}: {error}"
+
+
+_loader = None
+_loader_lock = threading.Lock()
+
+
+def _loader_pool() -> ProcessPoolExecutor:
+    """Loader processes kept between calls, one per CPU
+
+    The pool is never resized: replacing it would shut it down under a concurrent
+    call still mapping models onto it.
+    """
+    global _loader
+    with _loader_lock:
+        if _loader is None:
+            _loader = ProcessPoolExecutor(max_workers=os.cpu_count() or 1,
+                                          mp_context=multiprocessing.get_context("spawn"),
+                                          initializer=silence_output)
+        return _loader
+
+
+def _drop_loader_pool(pool: ProcessPoolExecutor) -> None:
+    global _loader
+    with _loader_lock:
+        if _loader is pool:
+            _loader = None
+    pool.shutdown(wait=False)
+
+
+def load_models(models: list[str], model_chains: list[str], atom_set: str, workers: int | None = None) -> list:
+    """Fitted atoms or an error message per model, loaded in worker processes for long model lists"""
+    workers = min(workers or os.cpu_count() or 1, len(models))
+    if workers > 1 and len(models) >= PARALLEL_MIN_MODELS:
+        pool = _loader_pool()
+        try:
+            return list(pool.map(_load_fit_atoms, models, [model_chains] * len(models), [atom_set] * len(models),
+                                 chunksize=max(1, len(models) // (workers * 4))))
+        except BrokenProcessPool:
+            # A crashed loader takes the pool with it, finish in this process
+            _drop_loader_pool(pool)
+        except RuntimeError:
+            # Another call dropped the pool after a crash, while this one was still submitting
+            pass
+    return [_load_fit_atoms(model, model_chains, atom_set) for model in models]
+
+
+def superpose_models(reference: str, models: list[str], receptor_chains: list[str],
+                     model_chains: list[str] | None = None, atom_set: str = DEFAULT_ATOM_SET,
+                     workers: int | None = None) -> dict:
+    """RMSDs and transformation matrices superposing every model on the reference receptor chains
+
+    Fitted atoms are matched by chain position, residue number and atom name. Models
+    are loaded through the binary structure cache, in a reused pool of spawned
+    processes when there are many, then fitted together in one batched Kabsch pass.
+    """
+    if not models:
+        raise ValueError("At least one model is required")
+    model_chains = model_chains or receptor_chains
+    if len(model_chains) != len(receptor_chains):
+        raise ValueError("model_chains must list as many chains as receptor_chains")
+    reference_atoms = fit_atoms(reference, receptor_chains, atom_set)
+    vocabulary = {}
+    reference_keys = reference_atoms.keys(vocabulary)
+    if len(reference_keys) < MIN_MATCHED:
+        raise ValueError(f"Reference has fewer than {MIN_MATCHED} {atom_set} atoms on chains "
+                         f"{'+'.join(receptor_chains)}")
+
+    loaded = load_models(models, model_chains, atom_set, workers)
+
+    names = _unique_names(models, {object_name(reference)})
+    results = [{"model": model, "object": name} for model, name in zip(models, names)]
+    fitted, mobile, target, counts = [], [], [], []
+    for index, entry in enumerate(loaded):
+        if isinstance(entry, str):
+            results[index]["error"] = entry
+            continue
+        _, reference_at, model_at = np.intersect1d(reference_keys, entry.keys(vocabulary), return_indices=True)
+        if len(model_at) < MIN_MATCHED:
+            results[index]["error"] = f"Only {len(model_at)} {atom_set} atoms match the reference"
+            continue
+        fitted.append(index)
+        mobile.append(entry.coords[model_at])
+        target.append(reference_atoms.coords[reference_at])
+        counts.append(len(model_at))
+
+    commands = []
+    if fitted:
+        rotations, translations, rmsd = kabsch(np.concatenate(mobile), np.concatenate(target), np.array(counts))
+        for position, index in enumerate(fitted):
+            matrix = homogeneous(rotations[position], translations[position])
+            command = f"cmd.transform_object('{names[index]}', {matrix}, homogenous=1)"
+            results[index].update({
+                "rmsd": round(float(rmsd[position]), 3),
+                "matched_atoms": counts[position],
+                "matrix": matrix,
+                "command": command,
+            })
+            commands.append(command)
+
+    view = shared_view(reference_atoms.coords)
+    commands.append(f"set_view ({', '.join(str(value) for value in view)})")
+    return {
+        "reference": reference,
+        "receptor_chains": receptor_chains,
+        "model_chains": model_chains,
+        "atom_set": atom_set,
+        "reference_atoms": int(len(reference_keys)),
+        "superposed": len(fitted),
+        "failed": len(models) - len(fitted),
+        "models": results,
+        "view": view,
+        "commands": commands,
+    }
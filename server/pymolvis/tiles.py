@@ -0,0 +1,200 @@
+"""Tiled ray tracing of very large images across the render pool, stitched into one PNG."""
+
+import math
+import os
+import struct
+import tempfile
+import time
+import uuid
+import zlib
+
+import numpy as np
+
+from .tracing import span
+
+# Pixels rendered beyond each tile edge; antialiasing differs within a few pixels of an image border
+TILE_MARGIN = 8
+SEAM_TRIM = 4
+# Mean absolute difference (0-255) above which two tiles disagree on their overlap. Antialiased
+# outlines (ray_trace_mode 1) shade a few levels differently from tile to tile; misplaced tiles
+# or a scene built differently by two workers differ by far more
+SEAM_TOLERANCE = 8.0
+# Largest tile ray traced by one worker
+MAX_TILE_PIXELS = 2048 * 2048
+_PNG_ROWS = 256
+
+
+def tile_count(width: int, height: int, workers: int) -> int:
+    """Default number of tiles: one per worker, more when a tile would exceed MAX_TILE_PIXELS"""
+    return max(workers, math.ceil(width * height / MAX_TILE_PIXELS))
+
+
+def tile_grid(width: int, height: int, count: int, margin: int = TILE_MARGIN) -> list[dict]:
+    """Tiles of a width x height image: the core each one contributes and the larger region it renders
+
+    The column and row split is the factorization of count giving the squarest tiles.
+    """
+    if count < 1:
+        raise ValueError("Tiled rendering needs at least one tile")
+    columns = min((divisor for divisor in range(1, count + 1) if count % divisor == 0),
+                  key=lambda c: abs(math.log((width / c) / (height / (count // c)))))
+    rows = count // columns
+    xs = np.linspace(0, width, columns + 1).round().astype(int).tolist()
+    ys = np.linspace(0, height, rows + 1).round().astype(int).tolist()
+    if min(np.diff(xs)) < 1 or min(np.diff(ys)) < 1:
+        raise ValueError(f"{count} tiles do not fit a {width}x{height} image")
+    tiles = []
+    for row in range(rows):
+        for column in range(columns):
+            x0, y0 = max(xs[column] - margin, 0), max(ys[row] - margin, 0)
+            x1, y1 = min(xs[column + 1] + margin, width), min(ys[row + 1] + margin, height)
+            tiles.append({
+                "row": row,
+                "column": column,
+                "core": [xs[column], ys[row], xs[column + 1], ys[row + 1]],
+                "x": x0, "y": y0, "width": x1 - x0, "height": y1 - y0,
+            })
+    return tiles
+
+
+def tile_camera(view, width: int, height: int, tile: dict) -> tuple[list[float], float]:
+    """View and field of view that ray trace exactly one tile of the full width x height image
+
+    Only an orthoscopic camera can be split this way: the tile camera keeps the rotation,
+    origin and clipping planes, moves sideways to the tile centre and narrows the field
+    of view to the tile height.
+    """
+    view = list(view)
+    half_angle = math.radians(abs(view[17]) / 2)
+    pixel = 2 * abs(view[11]) * math.tan(half_angle) / height
+    view[9] -= (tile["x"] + tile["width"] / 2 - width / 2) * pixel
+    view[10] -= (height / 2 - tile["y"] - tile["height"] / 2) * pixel
+    field_of_view = math.degrees(2 * math.atan(math.tan(half_angle) * tile["height"] / height))
+    view[17] = field_of_view
+    return view, field_of_view
+
+
+def read_ppm(path: str) -> np.ndarray:
+    """(height, width, 3) uint8 pixels of a binary PPM file"""
+    with open(path, "rb") as handle:
+        data = handle.read()
+    magic, width, height, maximum = data[:64].split(maxsplit=4)[:4]
+    if magic != b"P6" or int(maximum) != 255:
+        raise ValueError(f"Unsupported PPM image: {path}")
+    width, height = int(width), int(height)
+    return np.frombuffer(data, np.uint8, width * height * 3, len(data) - width * height * 3).reshape(height, width, 3)
+
+
+def write_png(path: str, image: np.ndarray) -> None:
+    """Write (height, width, 3) uint8 pixels as an RGB PNG, compressing block by block"""
+    height, width, _ = image.shape
+
+    def chunk(kind: bytes, data: bytes) -> bytes:
+        return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data))
+
+    compressor = zlib.compressobj()
+    parts = []
+    for start in range(0, height, _PNG_ROWS):
+        rows = image[start:start + _PNG_ROWS].reshape(-1, width * 3)
+        # Filter type 1 (Sub): each byte minus the same channel of the pixel to its left
+        filtered = np.empty((len(rows), width * 3 + 1), dtype=np.uint8)
+        filtered[:, 0] = 1
+        filtered[:, 1:4] = rows[:, :3]
+        np.subtract(rows[:, 3:], rows[:, :-3], out=filtered[:, 4:])
+        parts.append(compressor.compress(filtered.tobytes()))
+    parts.append(compressor.flush())
+
+    partial = f"{path}.{uuid.uuid4().hex[:8]}.part"
+    with open(partial, "wb") as handle:
+        handle.write(b"\x89PNG\r\n\x1a\n")
+        handle.write(chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0)))
+        handle.write(chunk(b"IDAT", b"".join(parts)))
+        handle.write(chunk(b"IEND", b""))
+    os.replace(partial, path)
+
+
+def _seam(first: np.ndarray, second: np.ndarray) -> float:
+    return float(np.abs(first.astype(np.int16) - second.astype(np.int16)).mean()) if first.size else 0.0
+
+
+def stitch(tiles: list[dict], images: list[np.ndarray], width: int, height: int) -> tuple[np.ndarray, list[dict]]:
+    """Full image from the tile cores, and the difference of every pair of neighbouring tiles on their overlap"""
+    image = np.empty((height, width, 3), dtype=np.uint8)
+    placed = {}
+    for tile, pixels in zip(tiles, images):
+        if pixels.shape != (tile["height"], tile["width"], 3):
+            raise RuntimeError(f"Tile {tile['row']},{tile['column']} has size {pixels.shape[1]}x{pixels.shape[0]}, "
+                               f"expected {tile['width']}x{tile['height']}")
+        x0, y0, x1, y1 = tile["core"]
+        image[y0:y1, x0:x1] = pixels[y0 - tile["y"]:y1 - tile["y"], x0 - tile["x"]:x1 - tile["x"]]
+        placed[tile["row"], tile["column"]] = (tile, pixels)
+
+    seams = []
+    for (row, column), (tile, pixels) in placed.items():
+        for neighbour_key in ((row, column + 1), (row + 1, column)):
+            if neighbour_key not in placed:
+                continue
+            neighbour, neighbour_pixels = placed[neighbour_key]
+            # Overlap of both rendered regions, minus the border pixels of either tile
+            x0 = max(tile["x"], neighbour["x"]) + SEAM_TRIM
+            y0 = max(tile["y"], neighbour["y"]) + SEAM_TRIM
+            x1 = min(tile["x"] + tile["width"], neighbour["x"] + neighbour["width"]) - SEAM_TRIM
+            y1 = min(tile["y"] + tile["height"], neighbour["y"] + neighbour["height"]) - SEAM_TRIM
+            if x1 <= x0 or y1 <= y0:
+                continue
+            difference = _seam(pixels[y0 - tile["y"]:y1 - tile["y"], x0 - tile["x"]:x1 - tile["x"]],
+                               neighbour_pixels[y0 - neighbour["y"]:y1 - neighbour["y"],
+                                                x0 - neighbour["x"]:x1 - neighbour["x"]])
+            seams.append({"tiles": [[row, column], list(neighbour_key)], "difference": round(difference, 3)})
+    return image, seams
+
+
+class TiledRenderer:
+    """Ray traces a scene as tiles spread over the workers of a render pool
+
+    Used in place of the pool by cached_render, so tiled images go through the
+    render cache like any other render.
+    """
+
+    def __init__(self, pool, tiles: int | None = None):
+        self.pool = pool
+        self.tiles = tiles
+
+    def render(self, scene: dict) -> dict:
+        """Render all tiles in parallel, check the seams and write the stitched PNG"""
+        width, height = int(scene.get("width", 1200)), int(scene.get("height", 1200))
+        count = self.tiles or tile_count(width, height, self.pool.workers)
+        tiles = tile_grid(width, height, count)
+        output = scene.get("output") or os.path.join(self.pool.output_dir, f"{uuid.uuid4().hex}.png")
+        started = time.perf_counter()
+
+        with span("render.tiled", width=width, height=height, tiles=len(tiles)) as traced, \
+                tempfile.TemporaryDirectory(dir=self.pool.output_dir) as tile_dir:
+            jobs = []
+            for index, tile in enumerate(tiles):
+                job = dict(scene, tile=tile, output=os.path.join(tile_dir, f"{index}.ppm"))
+                # The first tile saves the untiled scene as the session
+                if index:
+                    job.pop("session", None)
+                jobs.append(job)
+            results = self.pool.render_all(jobs)
+            images = [read_ppm(job["output"]) for job in jobs]
+            image, seams = stitch(tiles, images, width, height)
+            mismatched = [seam for seam in seams if seam["difference"] > SEAM_TOLERANCE]
+            if mismatched:
+                raise RuntimeError(f"Tiles disagree on {len(mismatched)} seams (largest mean difference "
+                                   f"{max(seam['difference'] for seam in mismatched)}), the scene is not deterministic "
+                                   f"across workers")
+            write_png(output, image)
+            traced.set(workers=len({result["pid"] for result in results}))
+
+        return {
+            "image": output,
+            "seconds": round(time.perf_counter() - started, 3),
+            "projection": "orthoscopic",
+            "tiles": len(tiles),
+            "grid": [max(tile["column"] for tile in tiles) + 1, max(tile["row"] for tile in tiles) + 1],
+            "tile_seconds": [result["seconds"] for result in results],
+            "workers": len({result["pid"] for result in results}),
+            "max_seam_difference": max((seam["difference"] for seam in seams), default=0.0),
+        }
@@ -0,0 +1,165 @@
+"""Timing spans for tool calls, workflow phases and their expensive steps, kept in a bounded ring buffer."""
+
+import contextvars
+import itertools
+import json
+import os
+import threading
+import time
+from collections import deque
+
+TRACE_ENV = "PYMOL_VIS_TRACE"
+TRACE_FILE_ENV = "PYMOL_VIS_TRACE_FILE"
+TRACE_SPANS_ENV = "PYMOL_VIS_TRACE_SPANS"
+DEFAULT_CAPACITY = 2000
+
+_current_span = contextvars.ContextVar("pymolvis_span", default=None)
+
+
+class _NullSpan:
+    """Stand-in returned while tracing is disabled, every operation is a no-op"""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def set(self, **attributes) -> None:
+        pass
+
+
+NULL_SPAN = _NullSpan()
+
+
+class Span:
+    """One timed operation; nested spans record the enclosing span as parent"""
+
+    def __init__(self, tracer: "Tracer", name: str, attributes: dict):
+        self.tracer = tracer
+        self.name = name
+        self.attributes = {key: value for key, value in attributes.items() if value is not None}
+        self.id = next(tracer._ids)
+        self.parent = None
+
+    def set(self, **attributes) -> None:
+        """Attach attributes such as atom counts or cache hit flags"""
+        self.attributes.update((key, value) for key, value in attributes.items() if value is not None)
+
+    def __enter__(self):
+        parent = _current_span.get()
+        self.parent = parent.id if parent is not None else None
+        self._token = _current_span.set(self)
+        self._wall = time.time()
+        self._started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        seconds = time.perf_counter() - self._started
+        _current_span.reset(self._token)
+        record = {"id": self.id, "parent": self.parent, "name": self.name,
+                  "start": round(self._wall, 6), "seconds": round(seconds, 6),
+                  "status": "ok" if exc is None else "error"}
+        if exc is not None:
+            record["error"] = f"{exc_type.__name__}: {exc}"
+        record.update(self.attributes)
+        self.tracer.add(record)
+        return False
+
+
+class Tracer:
+    """Ring buffer of finished spans with an optional JSONL trace file"""
+
+    def __init__(self, enabled: bool = False, capacity: int = DEFAULT_CAPACITY, path: str | None = None):
+        self.enabled = enabled
+        self.path = path
+        self._spans = deque(maxlen=capacity)
+        self._marks = {}
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self.dropped = 0
+
+    def span(self, name: str, **attributes):
+        """Context manager timing a block; free when tracing is disabled"""
+        if not self.enabled:
+            return NULL_SPAN
+        return Span(self, name, attributes)
+
+    def add(self, record: dict) -> None:
+        with self._lock:
+            if len(self._spans) == self._spans.maxlen:
+                self.dropped += 1
+            self._spans.append(record)
+            if self.path:
+                with open(self.path, "a") as handle:
+                    handle.write(json.dumps(record, default=str) + "\n")
+
+    def mark(self, key: str, name: str | None, **attributes) -> dict | None:
+        """End the open marked span of key and start one called name (None only ends it)
+
+        Used for workflow phases, whose boundaries are reported one call at a time.
+        Returns the record of the span that was ended.
+        """
+        if not self.enabled:
+            return None
+        now_wall, now = time.time(), time.perf_counter()
+        with self._lock:
+            previous = self._marks.pop(key, None)
+            if name is not None:
+                self._marks[key] = (name, now_wall, now, {k: v for k, v in attributes.items() if v is not None})
+        if previous is None:
+            return None
+        previous_name, wall, started, previous_attributes = previous
+        record = {"id": next(self._ids), "parent": None, "name": previous_name, "start": round(wall, 6),
+                  "seconds": round(now - started, 6), "status": "ok", "key": key, **previous_attributes}
+        self.add(record)
+        return record
+
+    def spans(self, limit: int | None = None, name: str | None = None) -> list[dict]:
+        """Most recent finished spans, oldest first, optionally only those whose name starts with name"""
+        with self._lock:
+            spans = list(self._spans)
+        if name:
+            spans = [span for span in spans if span["name"].startswith(name)]
+        return spans[-limit:] if limit else spans
+
+    def summary(self) -> dict:
+        """Count, total, mean and max seconds per span name over the buffer"""
+        totals = {}
+        for span in self.spans():
+            entry = totals.setdefault(span["name"], {"count": 0, "errors": 0, "total_seconds": 0.0, "max_seconds": 0.0})
+            entry["count"] += 1
+            entry["errors"] += span["status"] != "ok"
+            entry["total_seconds"] += span["seconds"]
+            entry["max_seconds"] = max(entry["max_seconds"], span["seconds"])
+        for entry in totals.values():
+            entry["mean_seconds"] = round(entry["total_seconds"] / entry["count"], 6)
+            entry["total_seconds"] = round(entry["total_seconds"], 6)
+        with self._lock:
+            buffered, dropped = len(self._spans), self.dropped
+        return {"enabled": self.enabled, "trace_file": self.path, "buffered": buffered,
+                "capacity": self._spans.maxlen, "dropped": dropped, "by_name": totals}
+
+    def clear(self) -> None:
+        with self._lock:
+            self._spans.clear()
+            self._marks.clear()
+            self.dropped = 0
+
+
+_default_tracer = None
+
+
+def default_tracer() -> Tracer:
+    """Process-wide tracer, enabled by PYMOL_VIS_TRACE=1 or a PYMOL_VIS_TRACE_FILE path"""
+    global _default_tracer
+    if _default_tracer is None:
+        path = os.environ.get(TRACE_FILE_ENV) or None
+        enabled = path is not None or os.environ.get(TRACE_ENV, "").lower() in ("1", "true", "yes", "on")
+        _default_tracer = Tracer(enabled, int(os.environ.get(TRACE_SPANS_ENV, DEFAULT_CAPACITY)), path)
+    return _default_tracer
+
+
+def span(name: str, **attributes):
+    """Span on the process-wide tracer"""
+    return default_tracer().span(name, **attributes)
@@ -0,0 +1,235 @@
+"""Streaming interface analysis over model ensembles and MD trajectories."""
+
+import struct
+
+import numpy as np
+
+from .interface import DEFAULT_CUTOFF, interface_selections
+from .spatial import CellGrid
+from .structure import (
+    CIF_SUFFIXES,
+    PRIMARY_ALTLOCS,
+    Structure,
+    _atom_site_columns,
+    _cif_tokens,
+    _cif_value,
+    open_text,
+)
+
+DEFAULT_SKIN = 2.0
+DEFAULT_MIN_OCCUPANCY = 0.5
+
+
+def iter_pdb_models(path: str):
+    """Yield the coordinates of each MODEL in a PDB file, one frame at a time"""
+    frame = []
+    with open_text(path) as handle:
+        for line in handle:
+            record = line[:6]
+            if record == "ENDMDL":
+                if frame:
+                    yield np.array(frame, dtype=np.float32)
+                frame = []
+            elif (record == "ATOM  " or record == "HETATM") and line[16] in PRIMARY_ALTLOCS:
+                frame.append((float(line[30:38]), float(line[38:46]), float(line[46:54])))
+    if frame:
+        yield np.array(frame, dtype=np.float32)
+
+
+def iter_mmcif_models(path: str):
+    """Yield the coordinates of each model in an mmCIF _atom_site loop, one frame at a time"""
+    columns = []
+    c = None
+    model = None
+    frame = []
+    with open_text(path) as handle:
+        for line in handle:
+            if line.startswith("_atom_site."):
+                columns.append(line.split()[0][len("_atom_site."):])
+                continue
+            if not columns or not line.strip():
+                continue
+            if line.startswith(("loop_", "_", "#", "data_")):
+                break
+            row = _cif_tokens(line)
+            if len(row) < len(columns):
+                continue
+            if c is None:
+                c = _atom_site_columns(columns)
+            row_model = _cif_value(row, c["model"], "1")
+            if row_model != model:
+                if frame:
+                    yield np.array(frame, dtype=np.float32)
+                frame, model = [], row_model
+            if _cif_value(row, c["alt"]) in PRIMARY_ALTLOCS:
+                frame.append((float(row[c["x"]]), float(row[c["y"]]), float(row[c["z"]])))
+    if frame:
+        yield np.array(frame, dtype=np.float32)
+
+
+def _read_record(handle, endian: str) -> bytes:
+    """One Fortran unformatted record"""
+    marker = handle.read(4)
+    if len(marker) < 4:
+        raise EOFError
+    (size,) = struct.unpack(endian + "i", marker)
+    data = handle.read(size)
+    trailer = handle.read(4)
+    if len(data) < size or len(trailer) < 4:
+        raise EOFError
+    return data
+
+
+def iter_dcd_frames(path: str, n_atoms: int | None = None):
+    """Yield coordinates of each frame in a CHARMM/NAMD DCD file, one frame at a time"""
+    with open(path, "rb") as handle:
+        # The header record is 84 bytes long, its length marker gives the byte order
+        marker = handle.read(4)
+        if marker == struct.pack("<i", 84):
+            endian = "<"
+        elif marker == struct.pack(">i", 84):
+            endian = ">"
+        else:
+            raise ValueError(f"Not a DCD coordinate file: {path}")
+        handle.seek(0)
+
+        header = _read_record(handle, endian)
+        if header[:4] != b"CORD":
+            raise ValueError(f"Not a DCD coordinate file: {path}")
+        control = struct.unpack(endian + "20i", header[4:84])
+        charmm = control[19] != 0
+        has_cell = charmm and control[10] != 0
+        has_4d = charmm and control[11] != 0
+        if control[8]:
+            raise ValueError("DCD files with fixed atoms are not supported")
+
+        _read_record(handle, endian)  # title
+        (natom,) = struct.unpack(endian + "i", _read_record(handle, endian))
+        if n_atoms is not None and natom != n_atoms:
+            raise ValueError(f"Trajectory has {natom} atoms but the structure has {n_atoms}")
+
+        dtype = np.dtype(endian + "f4")
+        while True:
+            try:
+                if has_cell:
+                    _read_record(handle, endian)
+                axes = [np.frombuffer(_read_record(handle, endian), dtype=dtype, count=natom) for _ in range(3)]
+                if has_4d:
+                    _read_record(handle, endian)
+            except EOFError:
+                return
+            yield np.stack(axes, axis=1).astype(np.float32)
+
+
+def iter_frames(structure_path: str, trajectory: str | None = None, n_atoms: int | None = None):
+    """Frames of a trajectory file, or of every model in the structure file itself"""
+    if trajectory:
+        lower = trajectory.lower()
+        if lower.endswith(".dcd"):
+            return iter_dcd_frames(trajectory, n_atoms)
+        if lower.endswith(".xtc"):
+            raise ValueError("XTC trajectories are not supported, convert to DCD or multi-model PDB first")
+        structure_path = trajectory
+    if structure_path.lower().endswith(CIF_SUFFIXES):
+        return iter_mmcif_models(structure_path)
+    return iter_pdb_models(structure_path)
+
+
+class InterfaceNeighborList:
+    """Receptor-ligand Verlet list rebuilt only when atoms moved more than half the skin"""
+
+    def __init__(self, receptor_idx: np.ndarray, ligand_idx: np.ndarray, cutoff: float, skin: float):
+        self.receptor_idx = receptor_idx
+        self.ligand_idx = ligand_idx
+        self.cutoff = cutoff
+        self.skin = skin
+        self.rebuilds = 0
+        self._reference = None
+        self._pairs = None
+
+    def _rebuild(self, coords: np.ndarray) -> None:
+        grid = CellGrid(coords[self.ligand_idx], self.cutoff + self.skin)
+        rec, lig, _ = grid.query(coords[self.receptor_idx])
+        self._pairs = (self.receptor_idx[rec], self.ligand_idx[lig])
+        self._reference = coords[np.concatenate([self.receptor_idx, self.ligand_idx])].copy()
+        self.rebuilds += 1
+
+    def contacts(self, coords: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """Receptor and ligand atom indices of the pairs within cutoff in this frame"""
+        if self._reference is None:
+            self._rebuild(coords)
+        else:
+            moved = coords[np.concatenate([self.receptor_idx, self.ligand_idx])] - self._reference
+            if np.einsum("ij,ij->i", moved, moved).max() > (self.skin / 2) ** 2:
+                self._rebuild(coords)
+        rec, lig = self._pairs
+        delta = coords[rec] - coords[lig]
+        keep = np.einsum("ij,ij->i", delta, delta) <= self.cutoff ** 2
+        return rec[keep], lig[keep]
+
+
+def _occupancy_table(structure: Structure, counts: np.ndarray, first_atoms: np.ndarray, frames: int) -> list[dict]:
+    rows = []
+    for residue in np.nonzero(counts)[0]:
+        atom = structure.atom(first_atoms[residue])
+        del atom["name"]
+        atom["occupancy"] = round(float(counts[residue]) / frames, 4)
+        rows.append(atom)
+    rows.sort(key=lambda row: -row["occupancy"])
+    return rows
+
+
+def interface_occupancy(structure: Structure, frames, receptor_chains, ligand_chains,
+                        cutoff: float = DEFAULT_CUTOFF, skin: float = DEFAULT_SKIN, stride: int = 1,
+                        max_frames: int | None = None, min_occupancy: float = DEFAULT_MIN_OCCUPANCY,
+                        prefix: str = "") -> dict:
+    """Per-residue fraction of frames in which a residue is in receptor-ligand contact
+
+    prefix goes in front of the object and selection names in the commands, as in find_interface.
+    """
+    receptor_chains = list(receptor_chains)
+    ligand_chains = list(ligand_chains)
+    receptor_idx = structure.select_chains(receptor_chains)
+    ligand_idx = structure.select_chains(ligand_chains)
+    if not len(receptor_idx):
+        raise ValueError(f"No receptor atoms found on chains {'+'.join(receptor_chains)}")
+    if not len(ligand_idx):
+        raise ValueError(f"No ligand atoms found on chains {'+'.join(ligand_chains)}")
+
+    residue_of_atom, first_atoms = structure.residue_index()
+    counts = np.zeros(len(first_atoms), dtype=np.int64)
+    neighbors = InterfaceNeighborList(receptor_idx, ligand_idx, cutoff, skin)
+
+    analysed = 0
+    for number, coords in enumerate(frames):
+        if number % stride:
+            continue
+        if max_frames is not None and analysed >= max_frames:
+            break
+        if len(coords) != len(structure):
+            raise ValueError(f"Frame {number + 1} has {len(coords)} atoms but the structure has {len(structure)}")
+        rec, lig = neighbors.contacts(coords)
+        counts[np.unique(residue_of_atom[np.concatenate([rec, lig])])] += 1
+        analysed += 1
+    if not analysed:
+        raise ValueError("No frames found")
+
+    is_receptor = np.zeros(len(first_atoms), dtype=bool)
+    is_receptor[residue_of_atom[receptor_idx]] = True
+    receptor = _occupancy_table(structure, np.where(is_receptor, counts, 0), first_atoms, analysed)
+    ligand = _occupancy_table(structure, np.where(is_receptor, 0, counts), first_atoms, analysed)
+
+    persistent_receptor = [row for row in receptor if row["occupancy"] >= min_occupancy]
+    persistent_ligand = [row for row in ligand if row["occupancy"] >= min_occupancy]
+    commands = interface_selections(persistent_receptor, persistent_ligand, prefix)
+
+    return {
+        "frames": analysed,
+        "cutoff": cutoff,
+        "skin": skin,
+        "neighbor_list_rebuilds": neighbors.rebuilds,
+        "min_occupancy": min_occupancy,
+        "receptor_occupancy": receptor,
+        "ligand_occupancy": ligand,
+        "commands": commands,
+    }
@@ -0,0 +1,41 @@
+"""Shared fixtures: the server package on sys.path, a private cache directory and the test structures."""
+
+import importlib.util
+import os
+import sys
+import tempfile
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SERVER_DIR = os.path.join(ROOT, "server")
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+
+sys.path.insert(0, SERVER_DIR)
+# Caches are created lazily from the environment, keep them out of the user's cache
+os.environ["PYMOL_VIS_CACHE_DIR"] = tempfile.mkdtemp(prefix="pymolvis-tests-")
+
+
+def data_path(name: str) -> str:
+    return os.path.join(DATA_DIR, name)
+
+
+@pytest.fixture(scope="session")
+def trimer_path() -> str:
+    """Three copies of a 10-residue helix, B and C packed against A on opposite sides, and one water"""
+    return data_path("trimer.pdb")
+
+
+@pytest.fixture(scope="session")
+def renumbered_path() -> str:
+    """CA-only chain A numbered 1-5, 100, 6-10, 52, 52A, 53 in file order, and chain B 1-3"""
+    return data_path("renumbered.pdb")
+
+
+@pytest.fixture(scope="session")
+def vis():
+    """The MCP server module"""
+    spec = importlib.util.spec_from_file_location("vis", os.path.join(SERVER_DIR, "804vis_en.py"))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
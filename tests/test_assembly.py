@@ -0,0 +1,65 @@
+import numpy as np
+import pytest
+
+from pymolvis.assembly import chain_contacts, suggest_components
+from pymolvis.structure import WATER_RESIDUES, parse_structure
+
+
+def naive_contacts(structure, cutoff: float) -> dict:
+    """Atom contacts and interface residues per chain pair from the full distance matrix"""
+    chains = structure.decode("chain_codes")
+    resis = structure.decode("resi_codes")
+    atoms = np.flatnonzero(~np.isin(structure.decode("resn_codes"), list(WATER_RESIDUES)))
+    coords = structure.coords[atoms].astype(np.float64)
+    distances = np.sqrt(((coords[:, None] - coords[None]) ** 2).sum(axis=2))
+    pairs = {}
+    for i, j in zip(*np.nonzero(distances <= cutoff)):
+        first, second = chains[atoms[i]], chains[atoms[j]]
+        if first >= second:
+            continue
+        entry = pairs.setdefault((first, second), {"contacts": 0, first: set(), second: set()})
+        entry["contacts"] += 1
+        entry[first].add(resis[atoms[i]])
+        entry[second].add(resis[atoms[j]])
+    return pairs
+
+
+@pytest.fixture(scope="module")
+def trimer(trimer_path):
+    return parse_structure(trimer_path)
+
+
+@pytest.mark.parametrize("cutoff", [3.5, 4.0, 5.0])
+def test_chain_contacts_match_naive_reference(trimer, cutoff):
+    screen = chain_contacts(trimer, cutoff)
+    reference = naive_contacts(trimer, cutoff)
+    assert screen["chains"] == {"A": 73, "B": 73, "C": 73}
+    assert screen["atom_count"] == 219
+    found = {tuple(pair["chains"]): pair for pair in screen["pairs"]}
+    assert set(found) == set(reference)
+    for (first, second), expected in reference.items():
+        pair = found[(first, second)]
+        assert pair["contacts"] == expected["contacts"]
+        assert pair["residues"] == {first: len(expected[first]), second: len(expected[second])}
+
+
+def test_water_is_not_a_contact(trimer):
+    water = np.flatnonzero(trimer.decode("resn_codes") == "HOH")
+    assert len(water) == 1
+    for chain in ("A", "B"):
+        distances = np.linalg.norm(trimer.coords[trimer.select_chains([chain])] - trimer.coords[water], axis=1)
+        assert distances.min() <= 4.0
+    screen = chain_contacts(trimer, 4.0)
+    assert all("A" in pair["chains"] for pair in screen["pairs"])
+    assert sum(pair["contacts"] for pair in screen["pairs"]) == sum(
+        entry["contacts"] for entry in naive_contacts(trimer, 4.0).values())
+
+
+def test_suggest_components_separates_the_contacting_chains(trimer):
+    suggestions = suggest_components(chain_contacts(trimer, 4.0), min_contacts=1)
+    assert suggestions
+    for suggestion in suggestions:
+        receptor, ligand = suggestion["receptor_chains"], suggestion["ligand_chains"]
+        assert set(receptor).isdisjoint(ligand)
+        assert suggestion["components"] == f"receptor:{'+'.join(receptor)},ligand:{'+'.join(ligand)}"
+        assert suggestion["interface_contacts"] > 0
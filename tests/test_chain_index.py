@@ -0,0 +1,71 @@
+import gzip
+import shutil
+
+import numpy as np
+import pytest
+
+from pymolvis import chain_index
+from pymolvis.chain_index import LazyChainLoader, build_chain_index, load_chains
+from pymolvis.structure import parse_structure
+from pymolvis.structure_cache import load_structure_chains, structure_atom_count
+
+
+def atoms(structure) -> list[tuple]:
+    """Chain, residue, atom name and coordinates of every atom, in file order"""
+    return list(zip(structure.decode("chain_codes").tolist(), structure.decode("resi_codes").tolist(),
+                    structure.decode("name_codes").tolist(), map(tuple, structure.coords.tolist())))
+
+
+def subset(structure, chains) -> list[tuple]:
+    """Atoms of the given chains picked from a full parse"""
+    return [atom for atom in atoms(structure) if atom[0] in chains]
+
+
+@pytest.fixture(scope="module")
+def trimer(trimer_path):
+    return parse_structure(trimer_path)
+
+
+@pytest.fixture
+def gzipped(trimer_path, tmp_path):
+    path = str(tmp_path / "trimer.pdb.gz")
+    with open(trimer_path, "rb") as source, gzip.open(path, "wb") as target:
+        shutil.copyfileobj(source, target)
+    return path
+
+
+def test_index_counts_atoms_per_chain(trimer_path, trimer):
+    index = build_chain_index(trimer_path)
+    assert list(index.chains) == ["A", "B", "C"]
+    assert index.atom_count == len(trimer)
+    chains = trimer.decode("chain_codes")
+    assert {chain: entry.atom_count for chain, entry in index.chains.items()} == \
+        {chain: int(np.count_nonzero(chains == chain)) for chain in "ABC"}
+
+
+@pytest.mark.parametrize("chains", [["A"], ["C", "A"], ["B", "Z"]])
+def test_load_chains_matches_full_parse(trimer_path, trimer, chains):
+    assert atoms(load_chains(build_chain_index(trimer_path), chains)) == subset(trimer, chains)
+
+
+def test_gzipped_file_falls_back_to_full_parse(gzipped, trimer):
+    with pytest.raises(ValueError):
+        build_chain_index(gzipped)
+    loader = LazyChainLoader()
+    assert atoms(loader.load(gzipped, ["B"])) == subset(trimer, ["B"])
+    assert loader.summary()["misses"] == 1
+
+
+def test_tools_use_the_chain_index_above_the_threshold(trimer_path, gzipped, trimer, monkeypatch):
+    monkeypatch.setenv(chain_index.LAZY_BYTES_ENV, "0")
+    assert atoms(load_structure_chains(trimer_path, ["A", "C"])) == subset(trimer, ["A", "C"])
+    assert atoms(load_structure_chains(gzipped, ["A"])) == subset(trimer, ["A"])
+    assert structure_atom_count(trimer_path) == structure_atom_count(gzipped) == len(trimer)
+
+
+def test_default_loader_is_created_on_first_use(monkeypatch):
+    monkeypatch.setattr(chain_index, "_default_loader", None)
+    monkeypatch.setenv(chain_index.SUBSET_BYTES_ENV, "1234")
+    loader = chain_index.default_chain_loader()
+    assert loader.max_bytes == 1234
+    assert chain_index.default_chain_loader() is loader
@@ -0,0 +1,84 @@
+import numpy as np
+import pytest
+
+from pymolvis.distances import AtomIndex, AtomRef, measure_distances, parse_distance_pairs
+from pymolvis.structure import parse_structure
+
+
+def coordinates(structure, chain: str, resi: str, name: str) -> np.ndarray:
+    """Coordinates of one atom, found by a linear scan"""
+    for index in range(len(structure)):
+        atom = structure.atom(index)
+        if (atom["chain"], atom["resi"], atom["name"]) == (chain, resi, name):
+            return structure.coords[index].astype(np.float64)
+    raise KeyError((chain, resi, name))
+
+
+@pytest.fixture(scope="module")
+def trimer(trimer_path):
+    return parse_structure(trimer_path)
+
+
+@pytest.fixture(scope="module")
+def renumbered(renumbered_path):
+    return parse_structure(renumbered_path)
+
+
+def test_parse_plain_pair():
+    assert parse_distance_pairs("57:CA-102:CA") == [(AtomRef(None, "57", "CA"), AtomRef(None, "102", "CA"))]
+
+
+def test_parse_chain_qualified_pairs():
+    pairs = parse_distance_pairs("A:57:CA-B:102:CA, A:52A:OG1 - 7:N,")
+    assert pairs == [
+        (AtomRef("A", "57", "CA"), AtomRef("B", "102", "CA")),
+        (AtomRef("A", "52A", "OG1"), AtomRef(None, "7", "N")),
+    ]
+    assert [f"{first}-{second}" for first, second in pairs] == ["A:57:CA-B:102:CA", "A:52A:OG1-7:N"]
+
+
+@pytest.mark.parametrize("bad", ["57:CA", "57-102", "A:57:CA-B:102", "57:CA-102:CA-103:CA", "A:57:CA;B:102:CA"])
+def test_parse_rejects_malformed(bad):
+    with pytest.raises(ValueError):
+        parse_distance_pairs(bad)
+
+
+def test_resolve_qualified_unique_ambiguous_and_missing(renumbered):
+    refs = [AtomRef("A", "52A", "CA"), AtomRef(None, "100", "CA"), AtomRef(None, "1", "CA"),
+            AtomRef("B", "9", "CA"), AtomRef("Z", "1", "CA"), AtomRef(None, "1", "CB")]
+    indices, errors = AtomIndex(renumbered).resolve(refs)
+    assert [(renumbered.atom(index)["chain"], renumbered.atom(index)["resi"]) for index in indices[:2]] == \
+        [("A", "52A"), ("A", "100")]
+    assert errors[:2] == [None, None]
+    # Residue 1 exists on chains A and B
+    assert indices[2] == -1
+    assert "ambiguous across chains A/B" in errors[2]
+    assert indices[3:].tolist() == [-1, -1, -1]
+    assert all(error.startswith("No atom") for error in errors[3:])
+
+
+def test_measure_distances_against_coordinates(trimer):
+    result = measure_distances(trimer, "A:3:CA-B:7:CA,A:5:CB-C:5:CB", "trimer")
+    assert (result["measured"], result["failed"]) == (2, 0)
+    first, second = result["distances"]
+    expected = np.linalg.norm(coordinates(trimer, "A", "3", "CA") - coordinates(trimer, "B", "7", "CA"))
+    assert first["distance"] == pytest.approx(expected, abs=1e-3)
+    expected = np.linalg.norm(coordinates(trimer, "A", "5", "CB") - coordinates(trimer, "C", "5", "CB"))
+    assert second["distance"] == pytest.approx(expected, abs=1e-3)
+    assert result["commands"][0] == ("distance trimer_dist_1, trimer and chain A and resi 3 and name CA, "
+                                     "trimer and chain B and resi 7 and name CA")
+
+
+def test_measure_distances_reports_unresolved_pairs(trimer):
+    # Residue 3 exists on all three chains
+    result = measure_distances(trimer, "3:CA-B:7:CA,A:3:CA-B:99:CA,A:3:CA-B:7:CA")
+    assert (result["measured"], result["failed"]) == (1, 2)
+    assert "ambiguous" in result["distances"][0]["error"]
+    assert "No atom B:99:CA" in result["distances"][1]["error"]
+    assert result["distances"][2]["name"] == "dist_3"
+    assert len(result["commands"]) == 1
+
+
+def test_measure_distances_requires_pairs(trimer):
+    with pytest.raises(ValueError):
+        measure_distances(trimer, " , ")
@@ -0,0 +1,115 @@
+import asyncio
+import gzip
+import os
+import socket
+from contextlib import contextmanager
+
+import pytest
+
+from pymolvis import fetch
+from pymolvis.fetch import FetchCache
+
+
+def write_entry(path, content: bytes) -> str:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with (gzip.open if path.endswith(".gz") else open)(path, "wb") as handle:
+        handle.write(content)
+    return path
+
+
+@pytest.fixture
+def remote(tmp_path):
+    """Directory served through a file:// download URL"""
+    directory = tmp_path / "remote"
+    directory.mkdir()
+    return directory
+
+
+@contextmanager
+def unanswered_url():
+    """Download URL of a server that accepts the connection but never answers"""
+    with socket.socket() as server:
+        server.bind(("127.0.0.1", 0))
+        server.listen(1)
+        yield f"http://127.0.0.1:{server.getsockname()[1]}/{{pdb_id}}.cif"
+
+
+def remote_cache(tmp_path, remote, **options) -> FetchCache:
+    return FetchCache(str(tmp_path / "cache"), remote_url=f"file://{remote}/{{pdb_id}}.cif", **options)
+
+
+def test_mirror_flat_layout(tmp_path):
+    path = write_entry(str(tmp_path / "mirror" / "1abc.cif.gz"), b"data_1abc\n")
+    cache = FetchCache(str(tmp_path / "cache"), mirror_dir=str(tmp_path / "mirror"))
+    assert cache.resolve("1ABC") == path
+    assert cache.stats["mirror_hits"] == 1
+
+
+def test_mirror_divided_layout(tmp_path):
+    path = write_entry(str(tmp_path / "mirror" / "pdb" / "ab" / "pdb1abc.ent.gz"), b"HEADER\n")
+    cache = FetchCache(str(tmp_path / "cache"), mirror_dir=str(tmp_path / "mirror"))
+    assert cache.find_in_mirror("1abc") == path
+    assert cache.find_in_mirror("2xyz") is None
+
+
+def test_download_into_cache(tmp_path, remote):
+    (remote / "1abc.cif").write_bytes(b"data_1abc\n")
+    cache = remote_cache(tmp_path, remote)
+    path = cache.resolve("1abc")
+    assert path.startswith(cache.objects_dir) and path.endswith(".cif")
+    with open(path, "rb") as handle:
+        assert handle.read() == b"data_1abc\n"
+    # Served from the cache once downloaded, also to another instance on the same directory
+    (remote / "1abc.cif").unlink()
+    assert cache.resolve("1abc") == path
+    assert remote_cache(tmp_path, remote).resolve("1abc") == path
+    assert [name for name in os.listdir(cache.objects_dir) if name.endswith(".part")] == []
+
+
+def test_hit_and_miss_counters(tmp_path, remote):
+    (remote / "1abc.cif").write_bytes(b"data_1abc\n")
+    cache = remote_cache(tmp_path, remote)
+    for _ in range(3):
+        cache.resolve("1abc")
+    summary = cache.summary()
+    assert (summary["misses"], summary["hits"], summary["mirror_hits"]) == (1, 2, 0)
+    assert summary["hit_rate"] == round(2 / 3, 4)
+    assert summary["entries"] == 1
+    assert summary["bytes_stored"] == len(b"data_1abc\n")
+
+
+def test_lru_eviction_under_byte_budget(tmp_path, remote, monkeypatch):
+    for pdb_id in ("1aaa", "1bbb", "1ccc"):
+        (remote / f"{pdb_id}.cif").write_bytes(pdb_id.encode() * 100)
+    cache = remote_cache(tmp_path, remote, max_bytes=900)
+    clock = iter(range(1000, 100000, 1000))
+    monkeypatch.setattr(fetch.time, "time", lambda: next(clock))
+
+    first = cache.resolve("1aaa")
+    cache.resolve("1bbb")
+    # A hit refreshes 1aaa, so 1bbb is now the least recently used
+    assert cache.resolve("1aaa") == first
+    cache.resolve("1ccc")
+
+    assert cache.stats["evictions"] == 1
+    assert cache.summary()["entries"] == 2
+    assert cache.bytes_stored() <= 900
+    assert os.path.isfile(first)
+    assert sorted(cache._read_index()) == ["1aaa", "1ccc"]
+    assert len(os.listdir(cache.objects_dir)) == 2
+
+
+def test_download_timeout_leaves_no_partial_file(tmp_path):
+    with unanswered_url() as url:
+        cache = FetchCache(str(tmp_path / "cache"), remote_url=url, timeout=0.2)
+        with pytest.raises(OSError):
+            cache.resolve("1abc")
+    assert os.listdir(cache.objects_dir) == []
+    assert cache.stats["misses"] == 1
+
+
+def test_load_instruction_falls_back_to_pymol_fetch(vis, tmp_path, monkeypatch):
+    with unanswered_url() as url:
+        monkeypatch.setattr(fetch, "_default_cache", FetchCache(str(tmp_path / "cache"), remote_url=url, timeout=0.2))
+        text = asyncio.run(vis.load_instruction("1abc"))
+    assert "use fetch command" in text
@@ -0,0 +1,130 @@
+import numpy as np
+import pytest
+
+from pymolvis.interactions import HYDROPHOBIC_DISTANCE, HYDROPHOBIC_RESIDUES, INTERACTION_COLORS, classify_interactions
+from pymolvis.structure import parse_structure
+
+HEXAGON = [(1.39 * np.cos(np.radians(angle)), 1.39 * np.sin(np.radians(angle))) for angle in range(0, 360, 60)]
+
+# One site per interaction class, far enough apart that the sites do not touch
+COMPLEX = [
+    # Parallel stacked phenylalanine rings 3.8 A apart, also in hydrophobic contact
+    *[("A", 1, "PHE", name, (x, y, 0.0)) for name, (x, y) in zip(("CG", "CD1", "CE1", "CZ", "CE2", "CD2"), HEXAGON)],
+    ("A", 1, "PHE", "CB", (2.9, 0.0, 0.0)),
+    *[("B", 1, "PHE", name, (x, y, 3.8)) for name, (x, y) in zip(("CG", "CD1", "CE1", "CZ", "CE2", "CD2"), HEXAGON)],
+    ("B", 1, "PHE", "CB", (2.9, 0.0, 3.8)),
+    # Lysine under the receptor ring: cation-pi
+    ("B", 5, "LYS", "CE", (0.0, 0.0, -6.0)),
+    ("B", 5, "LYS", "NZ", (0.0, 0.0, -4.5)),
+    # Lysine-glutamate: salt bridge and hydrogen bond with the receptor donating
+    ("A", 2, "LYS", "CE", (18.6, 0.0, 0.0)),
+    ("A", 2, "LYS", "NZ", (20.0, 0.0, 0.0)),
+    ("B", 2, "GLU", "OE1", (23.0, 0.0, 0.0)),
+    ("B", 2, "GLU", "CD", (24.2, 0.0, 0.0)),
+    # Serine-asparagine hydrogen bond with linear antecedents
+    ("A", 3, "SER", "CB", (0.0, 21.5, 0.0)),
+    ("A", 3, "SER", "OG", (0.0, 20.0, 0.0)),
+    ("B", 3, "ASN", "OD1", (0.0, 17.1, 0.0)),
+    ("B", 3, "ASN", "CG", (0.0, 15.9, 0.0)),
+    # The same pair within hydrogen bond distance, but with the serine antecedent pointing at the acceptor
+    ("A", 4, "SER", "CB", (38.6, 0.6, 0.0)),
+    ("A", 4, "SER", "OG", (40.0, 0.0, 0.0)),
+    ("B", 4, "ASN", "OD1", (37.2, 0.0, 0.0)),
+    ("B", 4, "ASN", "CG", (35.9, 0.0, 0.0)),
+]
+
+
+def write_pdb(path, atoms) -> None:
+    lines = [f"ATOM  {serial:5d} {name:<4s} {resn} {chain}{resi:4d}    {x:8.3f}{y:8.3f}{z:8.3f}"
+             f"  1.00  0.00          {name[0]:>2s}\n"
+             for serial, (chain, resi, resn, name, (x, y, z)) in enumerate(atoms, start=1)]
+    path.write_text("".join(lines) + "END\n")
+
+
+@pytest.fixture(scope="module")
+def complex_structure(tmp_path_factory):
+    path = tmp_path_factory.mktemp("interactions") / "complex.pdb"
+    write_pdb(path, COMPLEX)
+    return parse_structure(str(path))
+
+
+@pytest.fixture(scope="module")
+def classified(complex_structure):
+    return classify_interactions(complex_structure, ["A"], ["B"])
+
+
+def by_type(result, kind: str) -> list[dict]:
+    return [row for row in result["interactions"] if row["type"] == kind]
+
+
+def residues(row) -> tuple:
+    return (row["receptor"]["resn"], row["receptor"]["resi"]), (row["ligand"]["resn"], row["ligand"]["resi"])
+
+
+def test_counts_per_class(classified):
+    assert classified["counts"] == {"hydrogen_bond": 2, "salt_bridge": 1, "hydrophobic": 1,
+                                    "pi_stacking": 1, "cation_pi": 1}
+
+
+def test_hydrogen_bonds_need_both_antecedent_angles(classified):
+    bonds = by_type(classified, "hydrogen_bond")
+    assert sorted(residues(row) for row in bonds) == [(("LYS", "2"), ("GLU", "2")), (("SER", "3"), ("ASN", "3"))]
+    assert all(row["donor"] == "receptor" for row in bonds)
+    assert sorted(row["distance"] for row in bonds) == [2.9, 3.0]
+
+
+def test_salt_bridge_and_hydrophobic_contact(classified):
+    (bridge,) = by_type(classified, "salt_bridge")
+    assert (bridge["receptor"]["name"], bridge["ligand"]["name"], bridge["distance"]) == ("NZ", "OE1", 3.0)
+    (contact,) = by_type(classified, "hydrophobic")
+    assert residues(contact) == (("PHE", "1"), ("PHE", "1"))
+    # Six ring atoms and CB face each other at 3.8 A
+    assert (contact["contacts"], contact["distance"]) == (7, 3.8)
+
+
+def test_ring_interactions(classified):
+    (stack,) = by_type(classified, "pi_stacking")
+    assert (stack["geometry"], stack["angle"], stack["offset"], stack["distance"]) == ("parallel", 0.0, 0.0, 3.8)
+    assert stack["receptor"]["ring"] and stack["ligand"]["ring"]
+    (cation,) = by_type(classified, "cation_pi")
+    assert (cation["cation"], cation["ligand"]["name"], cation["distance"]) == ("ligand", "NZ", 4.5)
+    assert cation["receptor"]["resn"] == "PHE"
+
+
+def test_script_draws_each_class(classified):
+    commands = classified["commands"]
+    # One centroid pseudoatom per ring taking part
+    assert sum(command.startswith("pseudoatom interaction_centroids") for command in commands) == 2
+    for kind, color in INTERACTION_COLORS.items():
+        assert f"set dash_color, {color}, interaction_{kind}" in commands
+    assert classified["script"] == "; ".join(commands)
+
+
+def test_prefixed_object_names(complex_structure):
+    commands = classify_interactions(complex_structure, ["A"], ["B"], prefix="complex_")["commands"]
+    drawn = [command for command in commands if command.startswith("distance ")]
+    assert all(command.startswith("distance complex_interaction_") for command in drawn)
+    assert all(" receptor and" not in command and " ligand and" not in command for command in drawn)
+
+
+def test_hydrophobic_contacts_match_brute_force(trimer_path):
+    structure = parse_structure(trimer_path)
+    result = classify_interactions(structure, ["A"], ["B", "C"])
+    receptor, ligand = structure.select_chains(["A"]), structure.select_chains(["B", "C"])
+
+    def apolar(indices):
+        resn = structure.decode("resn_codes", indices)
+        name = structure.decode("name_codes", indices)
+        element = structure.decode("element_codes", indices)
+        return indices[(element == "C") & np.isin(resn, list(HYDROPHOBIC_RESIDUES)) & ~np.isin(name, ["C", "CA"])]
+
+    receptor, ligand = apolar(receptor), apolar(ligand)
+    distances = np.linalg.norm(structure.coords[receptor][:, None] - structure.coords[ligand][None], axis=2)
+    expected = {}
+    for i, j in zip(*np.nonzero(distances <= HYDROPHOBIC_DISTANCE)):
+        key = tuple(structure.atom(index)["chain"] + structure.atom(index)["resi"] for index in (receptor[i], ligand[j]))
+        expected[key] = expected.get(key, 0) + 1
+    found = {(row["receptor"]["chain"] + row["receptor"]["resi"], row["ligand"]["chain"] + row["ligand"]["resi"]):
+             row["contacts"] for row in by_type(result, "hydrophobic")}
+    assert found == expected
+    assert result["counts"]["salt_bridge"] == result["counts"]["pi_stacking"] == 0
@@ -0,0 +1,85 @@
+import numpy as np
+import pytest
+
+from pymolvis.interface import atom_selection, find_interface, residue_selection
+from pymolvis.structure import parse_structure
+
+
+def brute_force_contacts(structure, receptor_chains, ligand_chains, cutoff: float):
+    """Every receptor-ligand atom pair within cutoff, from the full distance matrix"""
+    receptor = structure.select_chains(receptor_chains)
+    ligand = structure.select_chains(ligand_chains)
+    distances = np.linalg.norm(structure.coords[receptor][:, None] - structure.coords[ligand][None], axis=2)
+    rec, lig = np.nonzero(distances <= cutoff)
+    return receptor[rec], ligand[lig], distances[rec, lig]
+
+
+def residue_keys(structure, atoms) -> set:
+    return {(structure.atom(index)["chain"], structure.atom(index)["resi"]) for index in atoms}
+
+
+def blank_chain_copy(source: str, destination, chain: str) -> None:
+    """PDB file with the chain identifier of one chain removed"""
+    lines = []
+    with open(source) as handle:
+        for line in handle:
+            if line.startswith(("ATOM", "HETATM")) and line[21] == chain:
+                line = f"{line[:21]} {line[22:]}"
+            lines.append(line)
+    destination.write_text("".join(lines))
+
+
+@pytest.fixture(scope="module")
+def trimer(trimer_path):
+    return parse_structure(trimer_path)
+
+
+@pytest.mark.parametrize("cutoff", [3.5, 4.0, 5.0])
+def test_find_interface_matches_brute_force(trimer, cutoff):
+    rec, lig, distances = brute_force_contacts(trimer, ["A"], ["B", "C"], cutoff)
+    result = find_interface(trimer, ["A"], ["B", "C"], cutoff=cutoff, top_k=5)
+    assert result["contact_count"] == len(distances)
+    assert {(row["chain"], row["resi"]) for row in result["receptor_interface"]} == residue_keys(trimer, rec)
+    assert {(row["chain"], row["resi"]) for row in result["ligand_interface"]} == residue_keys(trimer, lig)
+    np.testing.assert_allclose([pair["distance"] for pair in result["closest_pairs"]],
+                               np.sort(distances)[:5], atol=1e-3)
+
+
+def test_chains_without_contacts(trimer):
+    result = find_interface(trimer, ["B"], ["C"])
+    assert result["contact_count"] == 0
+    assert result["closest_pairs"] == []
+    assert result["commands"] == ["select receptor_interface, none", "select ligand_interface, none"]
+
+
+def test_selections_of_atoms_without_chain():
+    atom = {"chain": "", "resi": "52A", "name": "CA"}
+    assert atom_selection(atom, "receptor") == 'receptor and chain "" and resi 52A and name CA'
+    assert residue_selection([atom, {"chain": "B", "resi": "7"}]) == '(chain "" and resi 52A) or (chain B and resi 7)'
+
+
+def test_interface_selections_select_the_contact_residues(trimer_path, trimer, tmp_path):
+    pymol2 = pytest.importorskip("pymol2")
+    blank = tmp_path / "blank.pdb"
+    blank_chain_copy(trimer_path, blank, "A")
+    structure = parse_structure(str(blank))
+    rec, lig, _ = brute_force_contacts(structure, [""], ["B"], 4.0)
+    result = find_interface(structure, [""], ["B"], cutoff=4.0, top_k=3)
+    assert all("chain  " not in command for command in result["commands"])
+
+    pymol = pymol2.PyMOL()
+    pymol.start()
+    try:
+        cmd = pymol.cmd
+        cmd.load(str(blank), "complex")
+        cmd.create("receptor", 'complex and chain ""')
+        cmd.create("ligand", "complex and chain B")
+        for command in result["commands"]:
+            cmd.do(command, echo=0)
+        for name, atoms in (("receptor_interface", rec), ("ligand_interface", lig)):
+            selected = set()
+            cmd.iterate(name, "selected.add((chain, resi))", space={"selected": selected})
+            assert selected == residue_keys(structure, atoms)
+        assert "interface_dist_1" in cmd.get_names("all")
+    finally:
+        pymol.stop()
@@ -0,0 +1,89 @@
+import asyncio
+import json
+
+import pytest
+
+from pymolvis.arguments import CONTINUE_SUFFIX, MULTI_COMPONENT, SINGLE_COMPONENT
+from pymolvis.presets import switch_preset_commands
+
+
+def get_prompt(vis, name: str, arguments: dict):
+    result = asyncio.run(vis.get_prompt(name, arguments))
+    assert len(result.messages) == 1
+    return result.description, result.messages[0].content.text
+
+
+@pytest.fixture
+def single_arguments(trimer_path):
+    return {"structure": trimer_path, "key_residues": "A:3,A:4,B:7", "distance_pairs": "A:3:CA-B:7:CA"}
+
+
+@pytest.fixture
+def multi_arguments(trimer_path):
+    return {"structure": trimer_path, "components": "receptor:A,ligand:B+C", "key_residues": "A:3"}
+
+
+def test_single_component_main(vis, single_arguments, trimer_path):
+    description, text = get_prompt(vis, SINGLE_COMPONENT, single_arguments)
+    assert trimer_path in description
+    for phase in range(1, 5):
+        assert f"## Phase {phase}:" in text
+    assert "## Phase 5:" not in text
+    assert f"load {trimer_path}" in text
+    assert "resi 3-4" in text
+    assert f'continue_visualization(template="{SINGLE_COMPONENT}"' in text
+
+
+def test_single_component_continue(vis, single_arguments):
+    description, text = get_prompt(vis, SINGLE_COMPONENT + CONTINUE_SUFFIX, single_arguments)
+    assert description.endswith("(Phases 5-7)")
+    for phase in range(5, 8):
+        assert f"## Phase {phase}:" in text
+    assert "## Phase 1:" not in text
+
+
+def test_multi_component_main(vis, multi_arguments):
+    description, text = get_prompt(vis, MULTI_COMPONENT, multi_arguments)
+    for phase in range(1, 5):
+        assert f"## Phase {phase}:" in text
+    assert 'components="receptor:A,ligand:B+C"' in text
+
+
+def test_multi_component_continue(vis, multi_arguments):
+    description, text = get_prompt(vis, MULTI_COMPONENT + CONTINUE_SUFFIX, multi_arguments)
+    assert description.endswith("(Phases 5-7)")
+    for phase in range(5, 8):
+        assert f"## Phase {phase}:" in text
+
+
+def test_multi_component_requires_components(vis, trimer_path):
+    with pytest.raises(ValueError):
+        get_prompt(vis, MULTI_COMPONENT, {"structure": trimer_path})
+
+
+def test_prompts_listed_for_both_stages(vis):
+    names = {prompt.name for prompt in asyncio.run(vis.list_prompts())}
+    assert names == {SINGLE_COMPONENT, MULTI_COMPONENT,
+                     SINGLE_COMPONENT + CONTINUE_SUFFIX, MULTI_COMPONENT + CONTINUE_SUFFIX}
+
+
+def test_draft_settings_are_restored_before_the_session_is_saved(vis, single_arguments, tmp_path, monkeypatch):
+    policy = tmp_path / "policy.json"
+    policy.write_text(json.dumps([{"max_atoms": None, "max_pixels": None,
+                                   "draft": {"preset": "draft", "scale": 0.5, "ray": True}}]))
+    monkeypatch.setenv("PYMOL_VIS_LOD_POLICY", str(policy))
+    _, text = get_prompt(vis, SINGLE_COMPONENT, single_arguments)
+    restore = text.index('run_pymol_command("' + "; ".join(switch_preset_commands("draft")) + '")')
+    save = text.index('run_pymol_command("save ')
+    assert text.index("render_scene(input_session=") > save > restore > text.index("set antialias, 0")
+
+
+def test_selections_are_named_per_structure(vis, multi_arguments, renumbered_path):
+    _, text = get_prompt(vis, MULTI_COMPONENT, multi_arguments)
+    assert "select trimer_key_residues," in text
+    assert "Name the component objects exactly trimer_receptor and trimer_ligand" in text
+    assert 'prefix="trimer_"' in text
+    _, other = get_prompt(vis, SINGLE_COMPONENT, {"structure": renumbered_path, "key_residues": "A:3"})
+    assert "select renumbered_key_residues," in other
+    assert "trimer_" not in other
+
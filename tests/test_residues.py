@@ -0,0 +1,88 @@
+import re
+
+import pytest
+
+from pymolvis.residues import compile_key_residues, merge_ranges, parse_key_residues, resi_expression
+from pymolvis.structure import parse_structure
+
+
+def number_of(resi: str) -> int:
+    return int(re.match(r"-?\d+", resi).group())
+
+
+def selected(structure, selection: str) -> set[tuple[str, str]]:
+    """(chain, resi) pairs a compiled selection picks, reading resi a-b numerically as PyMOL does"""
+    residues = set(zip(structure.decode("chain_codes").tolist(), structure.decode("resi_codes").tolist()))
+    picked = set()
+    for chain, expression in re.findall(r"chain (\S+) and resi (\S+)\)", selection):
+        for token in expression.split("+"):
+            first, _, last = token.partition("-")
+            low, high = number_of(first), number_of(last or first)
+            picked |= {(c, resi) for c, resi in residues
+                       if c == chain and (resi == token if not last and not token.isdigit()
+                                          else low <= number_of(resi) <= high)}
+    return picked
+
+
+@pytest.fixture(scope="module")
+def renumbered(renumbered_path):
+    return parse_structure(renumbered_path)
+
+
+def test_parse_plain_and_chain_qualified():
+    parsed = parse_key_residues("57, 102,A:7,A:3,B:3")
+    assert parsed[None].numbers.tolist() == [57, 102]
+    assert parsed["A"].numbers.tolist() == [3, 7]
+    assert parsed["B"].numbers.tolist() == [3]
+
+
+def test_parse_ranges_and_insertion_codes():
+    parsed = parse_key_residues("A:10-12,A:52A,A:11")
+    assert parsed["A"].numbers.tolist() == [10, 11, 12]
+    assert parsed["A"].coded == ["52A"]
+
+
+@pytest.mark.parametrize("bad", ["A:", "A:12-10", "A:5x-7", "57;102", "A:52A-53"])
+def test_parse_rejects_malformed(bad):
+    with pytest.raises(ValueError):
+        parse_key_residues(bad)
+
+
+def test_merge_ranges():
+    assert merge_ranges([7, 3, 4, 5, 9, 8, 12]) == [(3, 5), (7, 9), (12, 12)]
+    assert resi_expression(merge_ranges([-2, -1, 0, 4])) == "\\-2-0+4"
+
+
+def test_in_order_residues_merge(renumbered):
+    result = compile_key_residues("A:1,A:2,A:3,A:7,A:8", renumbered)
+    assert result["selection"] == "(chain A and resi 1-3+7-8)"
+
+
+def test_out_of_order_numbering_is_not_bridged(renumbered):
+    result = compile_key_residues("A:5,A:100", renumbered)
+    assert result["selection"] == "(chain A and resi 5+100)"
+    assert selected(renumbered, result["selection"]) == {("A", "5"), ("A", "100")}
+
+
+@pytest.mark.parametrize("key_residues", [
+    "A:5,A:100", "A:4,A:5,A:100", "A:1-10", "A:1-10,A:100", "A:100,A:6", "A:5,A:100,A:6",
+    "A:52,A:52A", "A:52,A:52A,A:53", "A:53,A:10", "A:1-5,B:1-3",
+])
+def test_selection_picks_exactly_the_requested_residues(renumbered, key_residues):
+    result = compile_key_residues(key_residues, renumbered)
+    requested = {(chain, resi) for chain, residues in parse_key_residues(key_residues).items()
+                 for resi in residues.labels()}
+    assert result["missing_count"] == 0
+    assert selected(renumbered, result["selection"]) == requested
+
+
+def test_missing_residues_are_reported(renumbered):
+    result = compile_key_residues("A:5,A:11,C:1", renumbered)
+    assert result["selection"] == "(chain A and resi 5)"
+    assert sorted(result["missing"]) == ["A:11", "C:1"]
+
+
+def test_object_scope(renumbered):
+    result = compile_key_residues("B:1-3", renumbered, "renumbered")
+    assert result["selection"] == "renumbered and ((chain B and resi 1-3))"
+    assert result["commands"][0] == f"select key_residues, {result['selection']}"
@@ -0,0 +1,74 @@
+import numpy as np
+import pytest
+
+from pymolvis.sasa import PROBE_RADIUS, atom_radii, buried_surface, shrake_rupley, sphere_points
+from pymolvis.structure import parse_structure
+
+N_POINTS = 100
+
+
+def naive_sasa(coords: np.ndarray, radii: np.ndarray, probe: float = PROBE_RADIUS) -> np.ndarray:
+    """Shrake-Rupley atom by atom, testing every point against every other atom, on the same sphere points"""
+    coords = coords.astype(np.float64)
+    radii = radii.astype(np.float64) + probe
+    points = sphere_points(N_POINTS).astype(np.float64)
+    areas = np.zeros(len(coords))
+    for i in range(len(coords)):
+        others = np.arange(len(coords)) != i
+        surface = coords[i] + radii[i] * points
+        distances_sq = ((surface[:, None, :] - coords[None, others]) ** 2).sum(axis=2)
+        exposed = np.count_nonzero(~np.any(distances_sq < radii[others] ** 2, axis=1))
+        areas[i] = 4 * np.pi * radii[i] ** 2 * exposed / N_POINTS
+    return areas
+
+
+@pytest.fixture(scope="module")
+def trimer(trimer_path):
+    return parse_structure(trimer_path)
+
+
+@pytest.fixture(scope="module")
+def chains_ab(trimer):
+    indices = trimer.select_chains(["A", "B"])
+    coords, radii = trimer.coords[indices], atom_radii(trimer, indices)
+    return indices, coords, radii, naive_sasa(coords, radii)
+
+
+def test_single_sphere_is_fully_exposed():
+    areas, _ = shrake_rupley([[0.0, 0.0, 0.0]], [1.7], n_points=N_POINTS)
+    assert areas[0] == pytest.approx(4 * np.pi * (1.7 + PROBE_RADIUS) ** 2)
+
+
+def test_sasa_matches_naive_reference(chains_ab):
+    _, coords, radii, reference = chains_ab
+    areas, _ = shrake_rupley(coords, radii, n_points=N_POINTS)
+    # Points exactly on a neighbour's surface may round either way, allow one point per atom
+    point_area = 4 * np.pi * (radii + PROBE_RADIUS) ** 2 / N_POINTS
+    assert np.all(np.abs(areas - reference) <= point_area + 1e-6)
+    assert areas.sum() == pytest.approx(reference.sum(), rel=1e-3)
+
+
+def test_grouped_sasa_matches_chains_in_isolation(trimer, chains_ab):
+    indices, coords, radii, reference = chains_ab
+    groups = trimer.chain_codes[indices] == trimer.codes_for("chain_table", ["B"])[0]
+    complex_sasa, isolated = shrake_rupley(coords, radii, n_points=N_POINTS, groups=groups)
+    alone = np.concatenate([naive_sasa(coords[~groups], radii[~groups]), naive_sasa(coords[groups], radii[groups])])
+    order = np.concatenate([np.flatnonzero(~groups), np.flatnonzero(groups)])
+    assert isolated[order].sum() == pytest.approx(alone.sum(), rel=1e-3)
+    assert complex_sasa.sum() == pytest.approx(reference.sum(), rel=1e-3)
+
+
+def test_buried_surface(trimer):
+    result = buried_surface(trimer, ["A"], ["B"], n_points=N_POINTS)
+    assert result["buried_surface_area"] > 0
+    assert result["buried_surface_area"] == pytest.approx(
+        result["receptor_sasa"] + result["ligand_sasa"] - result["complex_sasa"], abs=0.2)
+    assert result["receptor_interface"] and result["ligand_interface"]
+    assert {residue["chain"] for residue in result["ligand_interface"]} == {"B"}
+    # B and C sit on opposite sides of A and never touch
+    assert buried_surface(trimer, ["B"], ["C"], n_points=N_POINTS)["buried_surface_area"] == 0
+
+
+def test_buried_surface_rejects_empty_chains(trimer):
+    with pytest.raises(ValueError):
+        buried_surface(trimer, ["A"], ["Z"])
@@ -0,0 +1,106 @@
+import os
+import shutil
+import subprocess
+import sys
+
+import pytest
+
+from pymolvis import structure_cache
+from pymolvis.shared_store import REGISTRY_NAME
+from pymolvis.structure_cache import StructureCache, content_digest
+
+from .conftest import SERVER_DIR
+
+HOLDER = """
+import sys
+from pymolvis.structure_cache import StructureCache
+StructureCache(sys.argv[1]).load(sys.argv[2])
+print("ready", flush=True)
+sys.stdin.read()
+"""
+
+
+@pytest.fixture
+def sources(trimer_path, renumbered_path, tmp_path):
+    """Private copies of the fixtures, so their digests are not held by other tests"""
+    copies = []
+    for path in (trimer_path, renumbered_path):
+        copy = tmp_path / os.path.basename(path)
+        shutil.copyfile(path, copy)
+        copies.append(str(copy))
+    return copies
+
+
+@pytest.fixture
+def directory(tmp_path):
+    return str(tmp_path / "structures")
+
+
+def cached_files(directory: str) -> set:
+    return {name for name in os.listdir(directory) if name.endswith(".soa")}
+
+
+def test_instances_share_one_registry(directory, sources, monkeypatch):
+    first = StructureCache(directory)
+    loaded = first.load(sources[0])
+    digest = content_digest(sources[0])
+    assert list(first.registry._read()["files"].values()) == [digest]
+
+    # A second instance maps the stored arrays without hashing or parsing the file again
+    def unexpected(*args):
+        raise AssertionError("file was hashed or parsed again")
+
+    monkeypatch.setattr(structure_cache, "content_digest", unexpected)
+    monkeypatch.setattr(structure_cache, "parse_structure", unexpected)
+    second = StructureCache(directory)
+    assert len(second.load(sources[0])) == len(loaded)
+    assert second.loaded() == {digest: sources[0]}
+    assert second.source(digest) == os.path.realpath(sources[0])
+    assert os.path.isfile(os.path.join(directory, REGISTRY_NAME))
+
+
+def test_held_structures_survive_eviction(directory, sources):
+    cache = StructureCache(directory, max_bytes=0)
+    for source in sources:
+        cache.load(source)
+    assert len(cached_files(directory)) == 2
+    assert cache.evict() == []
+    assert all(cache.registry.holders(digest) == 1 for digest in cache.loaded())
+
+    # Released structures are removed, with their summaries and registry entries
+    cache.release()
+    assert sorted(cache.evict()) == sorted(cache.loaded())
+    assert cached_files(directory) == set()
+    assert not [name for name in os.listdir(directory) if name.endswith(".summary.json")]
+    assert cache.registry._read() == {"files": {}, "structures": {}}
+
+
+def test_unmapped_structures_are_released(directory, sources, tmp_path):
+    cache = StructureCache(directory, max_bytes=0, max_mapped_bytes=1)
+    first = content_digest(sources[0])
+    cache.load(sources[0])
+    cache.load(sources[1])
+    # Only the most recent structure stays mapped and held
+    assert list(cache.loaded()) == [content_digest(sources[1])]
+    assert cache.registry.holders(first) == 0
+    assert cache.evict() == [first]
+    assert cached_files(directory) == {f"{content_digest(sources[1])}.soa"}
+
+
+def test_other_processes_hold_until_they_exit(directory, sources):
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join([SERVER_DIR, os.environ.get("PYTHONPATH", "")]))
+    holder = subprocess.Popen([sys.executable, "-c", HOLDER, directory, sources[0]], env=env,
+                              stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True)
+    try:
+        assert holder.stdout.readline().strip() == "ready"
+        cache = StructureCache(directory, max_bytes=0)
+        digest = content_digest(sources[0])
+        assert cache.registry.holders(digest) == 1
+        assert cache.evict() == []
+    finally:
+        # Killed without releasing, as a crashed worker would be
+        holder.kill()
+        holder.wait()
+    assert cache.registry.holders(digest) == 0
+    assert cache.evict() == [digest]
+    assert cached_files(directory) == set()
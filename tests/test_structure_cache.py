@@ -0,0 +1,27 @@
+import os
+
+from pymolvis import structure_cache
+from pymolvis.structure_cache import content_digest, file_digest
+
+
+def test_content_digest_memo_is_bounded(tmp_path, monkeypatch):
+    monkeypatch.setattr(structure_cache, "DIGEST_MEMO_SIZE", 3)
+    monkeypatch.setattr(structure_cache, "_digests", type(structure_cache._digests)())
+    paths = []
+    for number in range(5):
+        path = tmp_path / f"{number}.pdb"
+        path.write_text(f"REMARK {number}\n")
+        paths.append(str(path))
+        assert content_digest(str(path)) == file_digest(str(path))
+    assert len(structure_cache._digests) == 3
+    # Least recently used first, a hit moves a file to the end
+    content_digest(paths[2])
+    assert [key[0] for key in structure_cache._digests] == [os.path.realpath(paths[number]) for number in (3, 4, 2)]
+
+
+def test_content_digest_follows_changes(tmp_path):
+    path = tmp_path / "model.pdb"
+    path.write_text("REMARK 1\n")
+    before = content_digest(str(path))
+    path.write_text("REMARK 22\n")
+    assert content_digest(str(path)) != before
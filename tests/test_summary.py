@@ -0,0 +1,84 @@
+import pytest
+
+from pymolvis.structure import parse_structure
+from pymolvis.summary import structure_summary
+
+# record, chain, resi, resn, atom names
+MIXED = [
+    *[("ATOM", "A", resi, "GLY", ("N", "CA", "C", "O")) for resi in ("1", "2", "3")],
+    # Selenomethionine: a HETATM residue with a backbone, part of the polymer
+    ("HETATM", "A", "4", "MSE", ("N", "CA", "C", "O", "SE")),
+    # Residues 5-6 are missing, 9A follows 9 without a gap
+    *[("ATOM", "A", resi, "ALA", ("N", "CA", "C", "O", "CB")) for resi in ("7", "8", "9", "9A", "10")],
+    ("HETATM", "A", "301", "HEM", ("FE", "NA", "NB", "NC", "ND")),
+    ("HETATM", "A", "302", "SO4", ("S", "O1", "O2", "O3", "O4")),
+    ("HETATM", "A", "401", "HOH", ("O",)),
+    ("HETATM", "A", "402", "HOH", ("O",)),
+    ("HETATM", "B", "1", "SO4", ("S", "O1", "O2", "O3", "O4")),
+    ("HETATM", "B", "2", "HOH", ("O",)),
+]
+
+
+def write_pdb(path, residues) -> None:
+    lines, serial = [], 0
+    for record, chain, resi, resn, names in residues:
+        number, insertion = (resi[:-1], resi[-1]) if resi[-1].isalpha() else (resi, " ")
+        for name in names:
+            serial += 1
+            element = name[:2] if name in ("FE", "SE") else name[0]
+            lines.append(f"{record:<6s}{serial:5d} {name:<4s} {resn} {chain}{int(number):4d}{insertion}   "
+                         f"{serial:8.3f}{-serial / 2:8.3f}{2.0:8.3f}  1.00  0.00          {element:>2s}\n")
+    path.write_text("".join(lines) + "END\n")
+
+
+@pytest.fixture(scope="module")
+def mixed(tmp_path_factory):
+    path = tmp_path_factory.mktemp("summary") / "mixed.pdb"
+    write_pdb(path, MIXED)
+    return structure_summary(parse_structure(str(path)))
+
+
+def test_counts(mixed):
+    assert mixed["atom_count"] == sum(len(names) for *_, names in MIXED)
+    assert mixed["hetatm_count"] == 5 + 5 + 5 + 1 + 1 + 5 + 1
+    assert mixed["residue_count"] == 9
+    assert mixed["water_count"] == 3
+    assert mixed["hetero_group_count"] == 3
+    assert mixed["hetero_residue_names"] == {"HEM": 1, "SO4": 2}
+    assert [(group["chain"], group["resi"], group["resn"], group["atoms"]) for group in mixed["hetero_groups"]] == \
+        [("A", "301", "HEM", 5), ("A", "302", "SO4", 5), ("B", "1", "SO4", 5)]
+
+
+def test_chains(mixed):
+    chain_a, chain_b = mixed["chains"]["A"], mixed["chains"]["B"]
+    assert (chain_a["residues"], chain_a["first"], chain_a["last"]) == (9, "1", "10")
+    assert (chain_a["modified_residues"], chain_a["hetero_groups"], chain_a["waters"]) == (1, 2, 2)
+    assert chain_a["gaps"] == [{"after": "4", "before": "7", "missing": 2}]
+    # A chain of only ligands and water has no polymer range
+    assert (chain_b["residues"], chain_b["first"], chain_b["last"], chain_b["gaps"]) == (0, None, None, [])
+    assert (chain_b["hetero_groups"], chain_b["waters"], chain_b["atoms"]) == (1, 1, 6)
+
+
+def test_bounding_box(mixed):
+    box = mixed["bounding_box"]
+    count = mixed["atom_count"]
+    assert box["min"] == [1.0, -count / 2, 2.0]
+    assert box["max"] == [float(count), -0.5, 2.0]
+    assert box["size"] == [count - 1.0, count / 2 - 0.5, 0.0]
+
+
+def test_gaps_follow_file_order(renumbered_path):
+    chains = structure_summary(parse_structure(renumbered_path))["chains"]
+    # 100 between 5 and 6 is an out-of-order insertion, not a gap after 100
+    assert chains["A"]["gaps"] == [{"after": "5", "before": "100", "missing": 94},
+                                   {"after": "10", "before": "52", "missing": 41}]
+    assert chains["B"]["gaps"] == []
+
+
+def test_trimer_water(trimer_path):
+    summary = structure_summary(parse_structure(trimer_path))
+    assert summary["water_count"] == 1
+    assert summary["hetero_group_count"] == 0
+    assert summary["residue_count"] == 30
+    assert {chain: info["residues"] for chain, info in summary["chains"].items()} == {"A": 10, "B": 10, "C": 10}
+    assert summary["chains"]["A"]["waters"] == 1
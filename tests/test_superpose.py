@@ -0,0 +1,103 @@
+import numpy as np
+import pytest
+
+from pymolvis.superpose import kabsch, superpose_models
+
+
+def rotation_about(axis, degrees: float) -> np.ndarray:
+    """Rotation matrix from an axis and angle (Rodrigues)"""
+    axis = np.asarray(axis, dtype=np.float64) / np.linalg.norm(axis)
+    angle = np.radians(degrees)
+    cross = np.array([[0, -axis[2], axis[1]], [axis[2], 0, -axis[0]], [-axis[1], axis[0], 0]])
+    return np.eye(3) + np.sin(angle) * cross + (1 - np.cos(angle)) * cross @ cross
+
+
+def transformed_copy(source: str, destination, rotation: np.ndarray, translation: np.ndarray) -> None:
+    """PDB file with every atom moved by rotation then translation"""
+    lines = []
+    with open(source) as handle:
+        for line in handle:
+            if line.startswith(("ATOM", "HETATM")):
+                x, y, z = rotation @ [float(line[30:38]), float(line[38:46]), float(line[46:54])] + translation
+                line = f"{line[:30]}{x:8.3f}{y:8.3f}{z:8.3f}{line[54:]}"
+            lines.append(line)
+    destination.write_text("".join(lines))
+
+
+@pytest.fixture
+def points():
+    return np.random.default_rng(7).normal(scale=8.0, size=(40, 3))
+
+
+def test_recovers_a_known_rotation(points):
+    rotation = rotation_about([1, 2, 3], 73)
+    translation = np.array([4.0, -2.5, 10.0])
+    rotations, translations, rmsd = kabsch(points, points @ rotation.T + translation, np.array([len(points)]))
+    np.testing.assert_allclose(rotations[0], rotation, atol=1e-9)
+    np.testing.assert_allclose(translations[0], translation, atol=1e-9)
+    assert rmsd[0] == pytest.approx(0, abs=1e-6)
+
+
+def test_batched_models_are_fitted_independently(points):
+    rng = np.random.default_rng(11)
+    cases = [(rotation_about([0, 0, 1], 30), np.zeros(3)), (rotation_about([1, -1, 0], 170), np.array([1.0, 2.0, 3.0])),
+             (np.eye(3), np.array([-5.0, 0.0, 0.0]))]
+    noise = rng.normal(scale=0.5, size=points.shape)
+    mobile = np.concatenate([points, points, points[:25]])
+    target = np.concatenate([points @ rotation.T + translation for rotation, translation in cases[:2]]
+                            + [points[:25] + noise[:25] + cases[2][1]])
+    rotations, translations, rmsd = kabsch(mobile, target, np.array([40, 40, 25]))
+    for model, (rotation, translation) in enumerate(cases[:2]):
+        np.testing.assert_allclose(rotations[model], rotation, atol=1e-9)
+        np.testing.assert_allclose(translations[model], translation, atol=1e-9)
+        assert rmsd[model] == pytest.approx(0, abs=1e-6)
+    # With noise, the reported RMSD is the RMSD of the fitted coordinates
+    fitted = points[:25] @ rotations[2].T + translations[2]
+    expected = np.sqrt(((fitted - target[80:]) ** 2).sum(axis=1).mean())
+    assert rmsd[2] == pytest.approx(expected, rel=1e-9)
+    assert 0 < rmsd[2] < 1
+
+
+def test_never_returns_a_reflection(points):
+    mirrored = points * [1, 1, -1]
+    rotations, _, rmsd = kabsch(points, mirrored, np.array([len(points)]))
+    assert np.linalg.det(rotations[0]) == pytest.approx(1)
+    assert rmsd[0] > 1
+
+
+def test_superpose_models_undoes_a_rigid_motion(trimer_path, tmp_path):
+    rotation = rotation_about([0.3, -1, 0.5], 120)
+    translation = np.array([12.0, -7.0, 3.0])
+    model = tmp_path / "moved.pdb"
+    transformed_copy(trimer_path, model, rotation, translation)
+
+    result = superpose_models(trimer_path, [str(model)], ["A", "B"], atom_set="backbone", workers=1)
+    assert result["superposed"] == 1
+    fit = result["models"][0]
+    assert fit["matched_atoms"] == 80
+    # Coordinates are written with 3 decimals
+    assert fit["rmsd"] < 0.005
+    matrix = np.array(fit["matrix"]).reshape(4, 4)
+    np.testing.assert_allclose(matrix[:3, :3], rotation.T, atol=1e-4)
+    np.testing.assert_allclose(matrix[:3, 3], -rotation.T @ translation, atol=1e-2)
+
+
+def test_superpose_models_reports_unmatched_chains(trimer_path):
+    result = superpose_models(trimer_path, [trimer_path], ["A"], model_chains=["Z"], workers=1)
+    assert result["failed"] == 1
+    assert "error" in result["models"][0]
+
+
+def test_concurrent_parallel_loads_share_the_loader_pool(trimer_path):
+    from concurrent.futures import ThreadPoolExecutor
+
+    from pymolvis.superpose import PARALLEL_MIN_MODELS, load_models
+
+    models = [trimer_path] * PARALLEL_MIN_MODELS
+    # Different worker counts used to replace the pool under the other call
+    with ThreadPoolExecutor(max_workers=2) as threads:
+        calls = [threads.submit(load_models, models, ["A"], "backbone", workers) for workers in (2, 4)]
+        results = [call.result() for call in calls]
+    for loaded in results:
+        assert len(loaded) == len(models)
+        assert not any(isinstance(entry, str) for entry in loaded)
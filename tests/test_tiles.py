@@ -0,0 +1,110 @@
+import math
+
+import numpy as np
+import pytest
+
+from pymolvis.tiles import read_ppm, stitch, tile_camera, tile_count, tile_grid, write_png
+
+# Rotation, camera-space origin offset (x, y, distance), rotation origin, clipping planes, field of view
+VIEW = [0.6, -0.8, 0.0, 0.8, 0.6, 0.0, 0.0, 0.0, 1.0,
+        1.5, -2.0, -60.0, 3.0, 4.0, 5.0, 40.0, 80.0, 20.0]
+
+
+def project(view, width: int, height: int, points: np.ndarray) -> np.ndarray:
+    """Pixel coordinates (x right, y down) of world points through an orthoscopic PyMOL camera"""
+    rotation = np.array(view[:9]).reshape(3, 3)
+    camera = (points - view[12:15]) @ rotation + view[9:12]
+    pixel = 2 * abs(view[11]) * math.tan(math.radians(view[17]) / 2) / height
+    return np.stack([width / 2 + camera[:, 0] / pixel, height / 2 - camera[:, 1] / pixel], axis=1)
+
+
+@pytest.mark.parametrize("width, height, count", [(1200, 900, 4), (1001, 333, 6), (640, 480, 1), (50, 7000, 5)])
+def test_tile_cores_cover_the_image_exactly_once(width, height, count):
+    tiles = tile_grid(width, height, count)
+    assert len(tiles) == count
+    covered = np.zeros((height, width), dtype=np.int64)
+    for tile in tiles:
+        x0, y0, x1, y1 = tile["core"]
+        covered[y0:y1, x0:x1] += 1
+        # The rendered region holds the core plus the margin, clipped to the image
+        assert tile["x"] == max(x0 - 8, 0) and tile["y"] == max(y0 - 8, 0)
+        assert tile["x"] + tile["width"] == min(x1 + 8, width)
+        assert tile["y"] + tile["height"] == min(y1 + 8, height)
+    assert (covered == 1).all()
+
+
+def test_tile_grid_prefers_square_tiles():
+    tiles = tile_grid(4000, 500, 8)
+    assert {tile["row"] for tile in tiles} == {0} and len({tile["column"] for tile in tiles}) == 8
+    tiles = tile_grid(2000, 2000, 4)
+    assert {(tile["row"], tile["column"]) for tile in tiles} == {(0, 0), (0, 1), (1, 0), (1, 1)}
+
+
+def test_tile_grid_rejects_impossible_splits():
+    with pytest.raises(ValueError):
+        tile_grid(100, 100, 0)
+    with pytest.raises(ValueError):
+        tile_grid(3, 3, 16)
+
+
+def test_tile_count_limits_tile_size():
+    assert tile_count(1000, 1000, 4) == 4
+    assert tile_count(10000, 10000, 2) == math.ceil(10000 * 10000 / (2048 * 2048))
+
+
+@pytest.mark.parametrize("width, height, count", [(1200, 900, 4), (1001, 333, 6), (300, 3000, 3)])
+def test_tile_cameras_stitch_into_the_full_view(width, height, count):
+    points = np.random.default_rng(11).uniform(-30, 30, size=(500, 3)) + VIEW[12:15]
+    full = project(VIEW, width, height, points)
+    for tile in tile_grid(width, height, count):
+        view, field_of_view = tile_camera(VIEW, width, height, tile)
+        assert view[17] == field_of_view
+        # Rotation, distance, origin and clipping planes are shared with the full camera
+        assert view[:9] == VIEW[:9] and view[11:17] == VIEW[11:17]
+        local = project(view, tile["width"], tile["height"], points)
+        np.testing.assert_allclose(local + [tile["x"], tile["y"]], full, atol=1e-6)
+
+
+def test_png_and_ppm_round_trip(tmp_path):
+    image = np.random.default_rng(5).integers(0, 256, size=(37, 53, 3), dtype=np.uint8)
+    ppm = tmp_path / "image.ppm"
+    ppm.write_bytes(b"P6\n53 37\n255\n" + image.tobytes())
+    np.testing.assert_array_equal(read_ppm(str(ppm)), image)
+    png = tmp_path / "image.png"
+    write_png(str(png), image)
+    assert png.read_bytes().startswith(b"\x89PNG\r\n\x1a\n")
+
+
+def test_stitch_reports_seams_of_shifted_tiles():
+    width, height = 64, 48
+    image = np.random.default_rng(2).integers(0, 256, size=(height, width, 3), dtype=np.uint8)
+    tiles = tile_grid(width, height, 4)
+    crops = [image[tile["y"]:tile["y"] + tile["height"], tile["x"]:tile["x"] + tile["width"]] for tile in tiles]
+    stitched, seams = stitch(tiles, crops, width, height)
+    np.testing.assert_array_equal(stitched, image)
+    assert len(seams) == 4 and all(seam["difference"] == 0 for seam in seams)
+
+    crops[1] = np.roll(crops[1], 3, axis=1)
+    _, seams = stitch(tiles, crops, width, height)
+    assert max(seam["difference"] for seam in seams) > 8
+
+
+def test_tiled_render_matches_untiled_render(trimer_path, tmp_path):
+    pytest.importorskip("pymol2")
+    from pymolvis import render_pool
+
+    render_pool.init_worker()
+    width, height = 160, 120
+    scene = {"structure": trimer_path, "commands": ["hide everything", "show spheres", "set orthoscopic, 1"],
+             "preset": "draft", "width": width, "height": height, "threads": 1}
+    whole = render_pool.render_job(dict(scene, output=str(tmp_path / "whole.ppm")))
+    tiles = tile_grid(width, height, 4)
+    outputs = [str(tmp_path / f"{index}.ppm") for index in range(len(tiles))]
+    for tile, output in zip(tiles, outputs):
+        render_pool.render_job(dict(scene, tile=tile, output=output))
+    stitched, seams = stitch(tiles, [read_ppm(output) for output in outputs], width, height)
+    reference = read_ppm(whole["image"])
+    # The structure covers part of the image, not only background
+    assert (reference != 255).any(axis=2).mean() > 0.05
+    assert np.abs(stitched.astype(np.int16) - reference.astype(np.int16)).mean() < 2.0
+    assert all(seam["difference"] < 8 for seam in seams)
@@ -0,0 +1,188 @@
+import struct
+
+import numpy as np
+import pytest
+
+from pymolvis.structure import parse_structure
+from pymolvis.trajectory import (
+    InterfaceNeighborList,
+    interface_occupancy,
+    iter_dcd_frames,
+    iter_frames,
+    iter_mmcif_models,
+    iter_pdb_models,
+)
+
+CUTOFF = 4.0
+
+
+def write_dcd(path, frames, endian: str = "<", charmm: bool = True, cell: bool = False) -> None:
+    """Minimal CHARMM/NAMD DCD file, optionally with a unit cell record before each frame"""
+    def record(data: bytes) -> bytes:
+        marker = struct.pack(endian + "i", len(data))
+        return marker + data + marker
+
+    control = [0] * 20
+    control[0] = len(frames)
+    control[10] = int(cell)
+    control[19] = 24 if charmm else 0
+    natom = len(frames[0])
+    title = b"REMARKS written by the test suite".ljust(80)
+    content = [record(b"CORD" + struct.pack(endian + "20i", *control)),
+               record(struct.pack(endian + "i", 1) + title),
+               record(struct.pack(endian + "i", natom))]
+    for frame in frames:
+        if cell:
+            content.append(record(struct.pack(endian + "6d", 40.0, 90.0, 40.0, 90.0, 90.0, 40.0)))
+        for axis in range(3):
+            content.append(record(np.asarray(frame[:, axis], dtype=endian + "f4").tobytes()))
+    path.write_bytes(b"".join(content))
+
+
+def write_pdb_models(source: str, path, frames) -> None:
+    """Multi-model PDB file with the atom lines of source and the coordinates of each frame"""
+    with open(source) as handle:
+        atom_lines = [line for line in handle if line.startswith(("ATOM", "HETATM"))]
+    lines = []
+    for number, frame in enumerate(frames, start=1):
+        lines.append(f"MODEL     {number:4d}\n")
+        for line, (x, y, z) in zip(atom_lines, frame):
+            lines.append(f"{line[:30]}{x:8.3f}{y:8.3f}{z:8.3f}{line[54:]}")
+        lines.append("ENDMDL\n")
+    path.write_text("".join(lines) + "END\n")
+
+
+def brute_force_pairs(coords, receptor_idx, ligand_idx, cutoff: float = CUTOFF) -> set:
+    delta = coords[receptor_idx][:, None] - coords[ligand_idx][None]
+    rec, lig = np.nonzero(np.einsum("ijk,ijk->ij", delta, delta) <= cutoff ** 2)
+    return set(zip(receptor_idx[rec].tolist(), ligand_idx[lig].tolist()))
+
+
+@pytest.fixture(scope="module")
+def trimer(trimer_path):
+    return parse_structure(trimer_path)
+
+
+@pytest.fixture(scope="module")
+def drifting_frames(trimer):
+    """Chain B moving away from chain A in steps, with small random jitter on every atom"""
+    rng = np.random.default_rng(3)
+    ligand = trimer.select_chains(["B"])
+    direction = trimer.coords[ligand].mean(axis=0) - trimer.coords[trimer.select_chains(["A"])].mean(axis=0)
+    direction /= np.linalg.norm(direction)
+    frames = []
+    for step in np.linspace(0.0, 3.0, 9):
+        coords = trimer.coords.astype(np.float64) + rng.normal(scale=0.03, size=trimer.coords.shape)
+        coords[ligand] += step * direction
+        frames.append(coords.astype(np.float32))
+    return frames
+
+
+@pytest.mark.parametrize("endian", ["<", ">"])
+@pytest.mark.parametrize("cell", [False, True])
+def test_dcd_round_trip(tmp_path, drifting_frames, endian, cell):
+    path = tmp_path / "run.dcd"
+    write_dcd(path, drifting_frames[:4], endian=endian, cell=cell)
+    frames = list(iter_dcd_frames(str(path), len(drifting_frames[0])))
+    assert len(frames) == 4
+    for read, written in zip(frames, drifting_frames):
+        assert read.dtype == np.float32
+        np.testing.assert_array_equal(read, written)
+
+
+def test_dcd_without_charmm_flag_has_no_cell_records(tmp_path, drifting_frames):
+    path = tmp_path / "run.dcd"
+    write_dcd(path, drifting_frames[:2], charmm=False)
+    assert len(list(iter_dcd_frames(str(path)))) == 2
+
+
+def test_dcd_atom_count_mismatch(tmp_path, drifting_frames):
+    path = tmp_path / "run.dcd"
+    write_dcd(path, drifting_frames[:1])
+    with pytest.raises(ValueError, match="atoms"):
+        next(iter_dcd_frames(str(path), len(drifting_frames[0]) + 1))
+
+
+def test_dcd_rejects_other_files(trimer_path):
+    with pytest.raises(ValueError, match="Not a DCD"):
+        next(iter_dcd_frames(trimer_path))
+
+
+def test_pdb_models(tmp_path, trimer_path, drifting_frames):
+    path = tmp_path / "ensemble.pdb"
+    write_pdb_models(trimer_path, path, drifting_frames[:3])
+    frames = list(iter_pdb_models(str(path)))
+    assert len(frames) == 3
+    for read, written in zip(frames, drifting_frames):
+        np.testing.assert_allclose(read, written, atol=1e-3)
+    assert len(list(iter_frames(str(path)))) == 3
+
+
+def test_mmcif_models(tmp_path):
+    path = tmp_path / "ensemble.cif"
+    rows = [f"ATOM {serial} C CA . ALA A 1 {resi} ? {x:.3f} 0.000 0.000 1.00 0.00 C {model}"
+            for model, x0 in ((1, 0.0), (2, 5.0)) for serial, (resi, x) in
+            enumerate(((1, x0), (2, x0 + 3.8)), start=1)]
+    columns = ["group_PDB", "id", "type_symbol", "label_atom_id", "label_alt_id", "label_comp_id",
+               "label_asym_id", "label_entity_id", "label_seq_id", "pdbx_PDB_ins_code", "Cartn_x", "Cartn_y",
+               "Cartn_z", "occupancy", "B_iso_or_equiv", "auth_atom_id", "pdbx_PDB_model_num"]
+    path.write_text("data_test\nloop_\n" + "".join(f"_atom_site.{column}\n" for column in columns)
+                    + "\n".join(rows) + "\n#\n")
+    frames = list(iter_mmcif_models(str(path)))
+    assert len(frames) == 2
+    np.testing.assert_allclose([frame[:, 0] for frame in frames], [[0.0, 3.8], [5.0, 8.8]], atol=1e-5)
+    assert len(list(iter_frames(str(path)))) == 2
+
+
+def test_xtc_is_refused(trimer_path):
+    with pytest.raises(ValueError):
+        iter_frames(trimer_path, "run.xtc")
+
+
+def test_neighbor_list_rebuilds_only_after_half_skin(trimer):
+    receptor, ligand = trimer.select_chains(["A"]), trimer.select_chains(["B"])
+    neighbors = InterfaceNeighborList(receptor, ligand, CUTOFF, skin=2.0)
+    coords = trimer.coords.astype(np.float64)
+    moves = [(0.0, 1), (0.9, 1), (0.5, 1), (1.1, 2), (1.9, 2), (2.2, 3)]
+    for shift, rebuilds in moves:
+        # One ligand atom moves along x, measured from the original coordinates
+        moved = coords.copy()
+        moved[ligand[0], 0] += shift
+        rec, lig = neighbors.contacts(moved)
+        assert neighbors.rebuilds == rebuilds, shift
+        assert set(zip(rec.tolist(), lig.tolist())) == brute_force_pairs(moved, receptor, ligand)
+
+
+def test_neighbor_list_matches_brute_force_every_frame(trimer, drifting_frames):
+    receptor, ligand = trimer.select_chains(["A"]), trimer.select_chains(["B"])
+    neighbors = InterfaceNeighborList(receptor, ligand, CUTOFF, skin=2.0)
+    for coords in drifting_frames:
+        rec, lig = neighbors.contacts(coords)
+        assert set(zip(rec.tolist(), lig.tolist())) == brute_force_pairs(coords, receptor, ligand)
+    assert 1 < neighbors.rebuilds < len(drifting_frames)
+
+
+@pytest.mark.parametrize("stride", [1, 2])
+def test_occupancy_matches_brute_force(trimer, drifting_frames, stride):
+    receptor, ligand = trimer.select_chains(["A"]), trimer.select_chains(["B"])
+    residue_of, _ = trimer.residue_index()
+    analysed = drifting_frames[::stride]
+    counts = {}
+    for coords in analysed:
+        pairs = brute_force_pairs(coords, receptor, ligand)
+        for residue in {residue_of[atom] for pair in pairs for atom in pair}:
+            atom = trimer.atom(int(np.flatnonzero(residue_of == residue)[0]))
+            key = (atom["chain"], atom["resi"])
+            counts[key] = counts.get(key, 0) + 1
+
+    result = interface_occupancy(trimer, iter(drifting_frames), ["A"], ["B"], cutoff=CUTOFF, stride=stride)
+    assert result["frames"] == len(analysed)
+    reported = {(row["chain"], row["resi"]): row["occupancy"]
+                for row in result["receptor_occupancy"] + result["ligand_occupancy"]}
+    assert reported == {key: round(count / len(analysed), 4) for key, count in counts.items()}
+    assert 0 < min(reported.values()) < 1
+
+
+def test_occupancy_frame_atom_mismatch(trimer):
+    with pytest.raises(ValueError, match="atoms"):
+        interface_occupancy(trimer, [trimer.coords[:-1]], ["A"], ["B"])